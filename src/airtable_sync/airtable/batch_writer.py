@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+import requests
+from pyairtable import Table
+from ..custom_logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket limiting the rate of requests, shared by all the threads sending them."""
+
+    def __init__(self, rate: float, capacity: float = 1, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the bucket, full.
+        Args:
+            rate (float): Tokens added per second, i.e. the sustained requests per second.
+            capacity (float, optional): Maximum tokens, i.e. the burst size. Defaults to 1, evenly spaced requests.
+            clock (callable, optional): Monotonic clock in seconds, replaceable in tests.
+            sleep (callable, optional): Sleep function, replaceable in tests.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting until one is available."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+
+
+class BatchWriter:
+    """
+    Writes record updates to an Airtable table in chunks sent concurrently.
+    Requests are throttled by a token bucket to stay within Airtable's per-base rate limit,
+    and each chunk is retried on its own on rate limit and server errors.
+    """
+
+    """Maximum number of records in one update request, imposed by Airtable"""
+    CHUNK_SIZE = 10
+    """HTTP status codes of the responses retried"""
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    def __init__(self, table: Table, rate_limiter: TokenBucket, workers: int = 4,
+                 max_retries: int = 3, backoff: float = 1.0, sleep=time.sleep):
+        """
+        Initialize the writer.
+        Args:
+            table (Table): The Airtable table to update.
+            rate_limiter (TokenBucket): Token bucket shared by all requests to the base.
+            workers (int, optional): Number of chunks in flight at a time. Defaults to 4.
+            max_retries (int, optional): Retries of a failed chunk. Defaults to 3.
+            backoff (float, optional): Seconds before the first retry, doubled on each retry. Defaults to 1.
+            sleep (callable, optional): Sleep function, replaceable in tests.
+        """
+        self.table = table
+        self.rate_limiter = rate_limiter
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._sleep = sleep
+
+    def write(self, update_dict_list: list[dict]) -> Iterator[tuple]:
+        """
+        Send the updates and yield the outcome of each chunk as soon as it completes.
+        Args:
+            update_dict_list (list): Updates with the record's `id` and `fields`.
+        Yields:
+            tuple: The chunk of updates, the updated records returned by Airtable or None,
+                   and the exception if the chunk failed or None.
+        """
+        return self._write(update_dict_list, self.table.batch_update)
+
+    def upsert(self, records: list[dict], key_fields: list[str]) -> Iterator[tuple]:
+        """
+        Send the records to be updated, or created if no record matches their key fields,
+        and yield the outcome of each chunk as soon as it completes.
+        Args:
+            records (list): Records with their `fields`, including the key fields.
+            key_fields (list[str]): Names of the fields matching the records with the existing ones.
+        Yields:
+            tuple: The chunk of records, the upsert result returned by Airtable or None,
+                   and the exception if the chunk failed or None.
+        """
+        return self._write(records, lambda chunk: self.table.batch_upsert(chunk, key_fields=key_fields))
+
+    def _write(self, records: list[dict], send) -> Iterator[tuple]:
+        """Send the records in concurrent chunks with the given function, yielding the outcome of each chunk."""
+        chunks = [records[start:start + self.CHUNK_SIZE]
+                  for start in range(0, len(records), self.CHUNK_SIZE)]
+        if not chunks:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch_writer') as executor:
+            futures = {executor.submit(self._write_chunk, chunk, send): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+
+    def _write_chunk(self, chunk: list[dict], send) -> list[dict]:
+        """Send one chunk, retrying on rate limit and server errors."""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return send(chunk)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in self.RETRY_STATUS_CODES or attempt == self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logger.warning(f"Airtable update failed with {status}, retrying chunk in {delay:.1f}s")
+                self._sleep(delay)
@@ -1,62 +1,316 @@
+import functools
+import math
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+import requests
 from pyairtable import Api
 from pyairtable.models.schema import FieldSchema, TableSchema
+from .batch_writer import BatchWriter, TokenBucket
 from .config import AirtableConfig
+from .normalizer import ValueNormalizer
 from .update_result import UpdateResult
 from ..custom_logger import CustomLogger
+from ..disk_cache import DiskCache
 from .record import AirtableRecord
+from .schema_index import TableSchemaIndex
 
 logger = CustomLogger(__name__)
 
 
+class _RateLimitedAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter taking a token from the rate limiter right before each request it sends."""
+
+    def __init__(self, adapter: requests.adapters.BaseAdapter, rate_limiter: TokenBucket):
+        """
+        Args:
+            adapter (BaseAdapter): The adapter sending the requests, with its retry strategy.
+            rate_limiter (TokenBucket): Token bucket shared by all requests to the base.
+        """
+        super().__init__()
+        self.adapter = adapter
+        self.rate_limiter = rate_limiter
+
+    def send(self, request, **kwargs):
+        self.rate_limiter.acquire()
+        return self.adapter.send(request, **kwargs)
+
+    def close(self):
+        self.adapter.close()
+
+
 class AirtableClient:
     """Client for interacting with an Airtable table."""
 
-    def __init__(self, config: AirtableConfig):
+    """Maximum number of issue numbers in one filter formula, to keep the request size reasonable."""
+    ISSUE_NUMBERS_PER_FORMULA = 50
+
+    """Fields matching the upserted records with the existing ones: the issue link carries the repo"""
+    UPSERT_KEY_FIELDS = ['Issue Number', 'Issue Link']
+
+    """Typical seconds taken by a request for a page of records, to tell how many partitions keep the rate limit busy"""
+    PAGE_LATENCY = 0.5
+
+    """Error types of the writes rejected against the table schema, e.g. after a field or a select option is renamed"""
+    SCHEMA_ERROR_TYPES = ('UNKNOWN_FIELD_NAME', 'INVALID_VALUE_FOR_COLUMN', 'INVALID_MULTIPLE_CHOICE_OPTIONS')
+
+    def __init__(self, config: AirtableConfig, cache: DiskCache = None):
+        """
+        Initialize the client.
+        Args:
+            config (AirtableConfig): The Airtable configuration.
+            cache (DiskCache, optional): Cache of the table schema between runs, not cached if omitted.
+        """
         self.config = config
+        self._cache = cache
+        self.schema_cached = False
+        self.rate_limiter = TokenBucket(self.config.requests_per_second)
         self.api = Api(self.config.token)
+        # The reads, sequential or partitioned, take a token when a request is sent, not per page asked for
+        self.api.session.mount('https://', _RateLimitedAdapter(self.api.session.get_adapter('https://'), self.rate_limiter))
         self.table = self.api.table(self.config.app_id, self.config.table_id)
+        # The writes go through a session without the retry strategy of pyairtable, which would retry
+        # rate limited requests at its own pace: the batch writer retries them, spaced by the rate limiter
+        self.write_table = Api(self.config.token, retry_strategy=None).table(self.config.app_id, self.config.table_id)
         self._records = []
         self._current_repo = None
         self._table_schema = None
+        self._schema_index = None
+        self._records_in_current_repo = []
+        self._records_by_id = {}
+        self._records_by_issue_number = {}
+
+    def reset(self):
+        """
+        Drop the records read and the table schema of the previous run, keeping the connections.
+        The schema is fetched again by the next run, from the cache while it holds a valid one.
+        """
+        self.records = []
+        self.schema_cached = False
+        self._table_schema = None
+        self._schema_index = None
 
     @property
     def table_schema(self) -> TableSchema:
-        """Schema of the Airtable table."""
+        """Schema of the Airtable table, from the cache if it holds a valid one."""
         if not self._table_schema:
-            self._table_schema = self.table.schema()
+            cached = self._cache.get(self._schema_cache_key) if self._cache else None
+            self.schema_cached = cached is not None
+            if self.schema_cached:
+                self._table_schema = TableSchema.parse_obj(cached)
+            else:
+                self._table_schema = self.table.schema(force=True)
+                if self._cache:
+                    self._cache.set(self._schema_cache_key, self._table_schema.dict(by_alias=True))
         return self._table_schema
 
+    def refresh_schema(self):
+        """Drop the cached table schema, so that it is fetched again on next access."""
+        if self._cache:
+            self._cache.invalidate(self._schema_cache_key)
+        self._table_schema = None
+        self._schema_index = None
+
     @property
-    def table_fields_schema(self) -> dict:
-        """Schema of the Airtable table fields, name-type pairs."""
-        return {field_schema.name: field_schema.type for field_schema in self._schema_fields}
+    def _schema_cache_key(self) -> str:
+        """Key of the table schema in the cache."""
+        return f"tableSchema:{self.config.app_id}/{self.config.table_id}"
+
+    @property
+    def schema_index(self) -> TableSchemaIndex:
+        """Index of the Airtable table schema fields, built once per fetched schema."""
+        if not self._schema_index:
+            self._schema_index = TableSchemaIndex(self.table_schema)
+        return self._schema_index
 
     @property
-    def _schema_fields(self) -> list[FieldSchema]:
-        """List of field schemas in the Airtable schema."""
-        return self.table_schema.fields
+    def table_fields_schema(self) -> dict:
+        """Schema of the Airtable table fields, name-type pairs."""
+        return self.schema_index.field_types
 
     def field_in_schema(self, field_name) -> bool:
         """Check if a field is in the Airtable schema"""
-        return any(field_schema.name == field_name for field_schema in self._schema_fields)
+        return field_name in self.schema_index
+
+    def field_schema(self, field_name) -> FieldSchema:
+        """Schema of the field with the given name, or None if it is not in the Airtable schema."""
+        return self.schema_index.field_by_name(field_name)
 
-    def read_records(self):
+    def read_records(self, stop_event: threading.Event = None, formula: str = None, fields: list[str] = None):
         """
         Reads all records from the Airtable table and stores them in the `records` attribute.
-        This method fetches all entries from the Airtable table and creates a list of
+        This method fetches all entries from the Airtable table page by page and creates a list of
         `AirtableRecord` objects by reading each entry. The resulting list is then
         assigned to the `records` attribute of the instance.
+        Only the records of the current repository are requested, with the filter applied by Airtable.
+        Args:
+            stop_event (threading.Event, optional): When set, paging stops before the next request.
+            formula (str, optional): Airtable formula to read only the matching records.
+            fields (list[str], optional): Names of the fields to read, all fields if omitted.
         Returns:
             None
         """
+        formula = self.and_formula(self.repo_formula(self.current_repo), formula)
+        logger.verbose(
+            f"Reading Airtable records from base: {self.config.app_id} table: {self.config.table_id} view: '{self.config.view_name}'"
+            + (f" formula: {formula}" if formula else ""))
+        if self.config.read_partitions > 1:
+            records = self._read_partitioned(formula, fields, stop_event)
+        else:
+            records = self._read_partition(formula, fields, stop_event)
+        if records is None:
+            logger.verbose("Reading Airtable records cancelled")
+            return
+        self.records = records
+
+        logger.debug(lambda: "all records: \n" + "\n".join(
+            f'    {record.issue_number} {record.title}' for record in self.records))
+
+    def _read_partition(self, formula: str, fields: list[str], stop_event: threading.Event = None,
+                        cancel_event: threading.Event = None) -> list[AirtableRecord]:
+        """
+        Read the records matching the formula page by page.
+        Args:
+            formula (str): Airtable formula to read only the matching records.
+            fields (list[str]): Names of the fields to read, all fields if None.
+            stop_event (threading.Event, optional): When set, paging stops before the next request.
+            cancel_event (threading.Event, optional): Same as `stop_event`, set when another partition fails.
+        Returns:
+            list[AirtableRecord]: The records read, or None if stopped.
+        """
+        pages = iter(self.table.iterate(view=self.config.view_name, **self._read_options(formula, fields)))
+        records = []
+        while True:
+            page = next(pages, None)
+            if page is None:
+                return records
+            records.extend(AirtableRecord(entry) for entry in page)
+            if any(event and event.is_set() for event in (stop_event, cancel_event)):
+                return None
+
+    @property
+    def max_read_partitions(self) -> int:
+        """
+        Number of partitions beyond which reading in more does not help: with a page request taking up to
+        `PAGE_LATENCY` seconds, that many partitions keep the rate limit busy and more only wait for it,
+        while each of them costs a request for its last, partial page.
+        """
+        return max(1, math.ceil(self.config.requests_per_second * self.PAGE_LATENCY))
+
+    def _read_partitioned(self, formula: str, fields: list[str],
+                          stop_event: threading.Event = None) -> list[AirtableRecord]:
+        """
+        Read the records matching the formula in disjoint partitions by issue number, concurrently.
+        The page requests of all partitions are throttled by the rate limiter shared with the writes.
+        If a partition fails, the others are stopped before their next page and the error is re-raised.
+        Returns:
+            list[AirtableRecord]: The records of all partitions, each once, or None if stopped.
+        """
+        partitions = min(self.config.read_partitions, self.max_read_partitions)
+        if partitions < self.config.read_partitions:
+            logger.verbose(f"Reading in {partitions} partitions, more would only wait for the rate limit")
+        cancel_event = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=partitions, thread_name_prefix='read_partition') as executor:
+            futures = [executor.submit(
+                self._read_partition, self.and_formula(self.partition_formula(partition, partitions), formula),
+                fields, stop_event, cancel_event) for partition in range(partitions)]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            error = next((future.exception() for future in done if future.exception()), None)
+            if error:
+                cancel_event.set()
+        if error:
+            raise error
+
+        results = [future.result() for future in futures]
+        if any(result is None for result in results):
+            return None
+        # Merge the partitions, a record matching more than one partition is kept once
+        records_by_id = {}
+        for records in results:
+            for record in records:
+                records_by_id.setdefault(record.id, record)
         logger.verbose(
-            f"Reading Airtable records from base: {self.config.app_id} table: {self.config.table_id} view: '{self.config.view_name}'")
-        self._records = [AirtableRecord(entry)
-                         for entry in self.table.all(view=self.config.view_name)]
+            f"Read {len(records_by_id)} record(s) in {partitions} partitions of "
+            f"{', '.join(str(len(records)) for records in results)} record(s)")
+        return list(records_by_id.values())
+
+    def read_records_by_issue_numbers(self, issue_numbers: list[int], fields: list[str] = None) -> int:
+        """
+        Read the records with the given issue numbers that are not loaded yet, and add them to the records.
+        Args:
+            issue_numbers (list[int]): The issue numbers of the records to read.
+            fields (list[str], optional): Names of the fields to read, all fields if omitted.
+        Returns:
+            int: The number of records of the current repository added.
+        """
+        missing = [n for n in dict.fromkeys(issue_numbers)
+                   if n not in self._records_by_issue_number]
+        added = 0
+        for start in range(0, len(missing), self.ISSUE_NUMBERS_PER_FORMULA):
+            formula = self.and_formula(
+                self.repo_formula(self.current_repo),
+                self.issue_numbers_formula(missing[start:start + self.ISSUE_NUMBERS_PER_FORMULA]))
+            entries = self.table.all(view=self.config.view_name, **self._read_options(formula, fields))
+            added += self._add_records([AirtableRecord(entry) for entry in entries])
+        return added
+
+    @staticmethod
+    def _read_options(formula: str, fields: list[str]) -> dict:
+        """Options of the list records request, omitting those not set."""
+        options = {}
+        if formula:
+            options['formula'] = formula
+        if fields:
+            options['fields'] = fields
+        return options
+
+    def _add_records(self, records: list[AirtableRecord]) -> int:
+        """Add records to the loaded records and index those in the current repository."""
+        added = 0
+        for record in records:
+            if record.id in self._records_by_id:
+                continue
+            self._records.append(record)
+            if self.current_repo is not None and record.repo_name == self.current_repo:
+                self._add_to_index(record)
+                added += 1
+        return added
 
-        records = "\n".join(
-            [f'    {record.issue_number} {record.title}' for record in self.records])
-        logger.debug(f"all records: \n{records}")
+    @staticmethod
+    def modified_since_formula(timestamp: str) -> str:
+        """Airtable formula matching the records modified after the given ISO 8601 time."""
+        return f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{timestamp}'))"
+
+    @staticmethod
+    def repo_formula(repo_name: str) -> str:
+        """Airtable formula matching the records whose issue link is in the given repository, None for any repository."""
+        if not repo_name:
+            return None
+        return f"FIND('/{repo_name}/issues/', {{Issue Link}})"
+
+    @staticmethod
+    def partition_formula(partition: int, partitions: int) -> str:
+        """
+        Airtable formula matching one of `partitions` disjoint partitions of the records by issue number.
+        The records without an issue number are in the first partition.
+        """
+        formula = f"MOD({{Issue Number}}, {partitions}) = {partition}"
+        if partition == 0:
+            return f"OR({formula}, {{Issue Number}} = BLANK())"
+        return formula
+
+    @staticmethod
+    def and_formula(*formulas: str) -> str:
+        """Airtable formula matching the records that match all the given formulas, ignoring those not set."""
+        formulas = [formula for formula in formulas if formula]
+        if len(formulas) <= 1:
+            return formulas[0] if formulas else None
+        return f"AND({', '.join(formulas)})"
+
+    @staticmethod
+    def issue_numbers_formula(issue_numbers: list[int]) -> str:
+        """Airtable formula matching the records with any of the given issue numbers."""
+        return f"OR({', '.join(f'{{Issue Number}} = {int(n)}' for n in issue_numbers)})"
 
     @property
     def current_repo(self):
@@ -66,17 +320,51 @@ class AirtableClient:
     @current_repo.setter
     def current_repo(self, new_repo):
         self._current_repo = new_repo
+        self._build_index()
 
     @property
     def records(self) -> list[AirtableRecord]:
         """List of all Airtable records in the table."""
         return self._records
 
+    @records.setter
+    def records(self, new_records: list[AirtableRecord]):
+        self._records = new_records
+        self._build_index()
+
     @property
     def records_in_current_repo(self) -> list[AirtableRecord]:
         """List of Airtable records that belong to the current repository."""
-        return [
-            record for record in self.records if record.repo_name == self.current_repo]
+        return self._records_in_current_repo
+
+    def _build_index(self):
+        """
+        Build the list of records in the current repository and index them by record ID and issue number.
+        Called whenever the records or the current repository change, so that lookups are constant-time.
+        """
+        self._records_in_current_repo = []
+        self._records_by_id = {}
+        self._records_by_issue_number = {}
+        if self.current_repo is None:
+            return
+        for record in self._records:
+            if record.repo_name == self.current_repo:
+                self._add_to_index(record)
+
+    def _add_to_index(self, record: AirtableRecord):
+        """Add a record in the current repository to the indexes."""
+        self._records_in_current_repo.append(record)
+        self._records_by_id[record.id] = record
+        self._records_by_issue_number.setdefault(record.issue_number, []).append(record)
+
+    def _reindex_record(self, record: AirtableRecord, old_issue_number: int):
+        """Move a record to its new issue number key after its fields have changed."""
+        records = self._records_by_issue_number.get(old_issue_number, [])
+        if record in records:
+            records.remove(record)
+            if not records:
+                self._records_by_issue_number.pop(old_issue_number)
+        self._records_by_issue_number.setdefault(record.issue_number, []).append(record)
 
     def get_record_by_id(self, id: str) -> AirtableRecord:
         """
@@ -84,36 +372,146 @@ class AirtableClient:
         Args:
             id (str): The ID of the record.
         Returns:
-            AirtableRecord or None: The record with the specified issue number if found,
+            AirtableRecord or None: The record with the specified ID if found,
                           otherwise None.
         """
-        return next((r for r in self.records_in_current_repo if r.id == id), None)
+        return self._records_by_id.get(id)
 
-    def batch_update(self, update_dict_list) -> UpdateResult:
+    def get_records_by_issue_number(self, issue_number: int) -> list[AirtableRecord]:
+        """
+        Find all the records in the current repository with an issue number.
+        Args:
+            issue_number (int): The GitHub issue number of the records.
+        Returns:
+            list[AirtableRecord]: The records with the specified issue number, empty if none.
+        """
+        return self._records_by_issue_number.get(issue_number, [])
+
+    def batch_update(self, update_dict_list, sync_result: UpdateResult = None) -> UpdateResult:
         """
         Process the batch updates and commit changes.
+        The updates are sent in concurrent, rate-limited chunks, and the outcome of each chunk is added
+        to the result as soon as it completes. A chunk that fails marks only its own records as failed.
         Args:
             update_dict_list (list): A list of dictionaries containing the updates to be applied.
+            sync_result (UpdateResult, optional): Result to add the record statuses to, e.g. across several batches.
         Returns:
             UpdateResult: An object containing the result of the batch update operation, including the status of each record update.
         """
-        updated_record_list = self.table.batch_update(update_dict_list)
+        if sync_result is None:
+            sync_result = UpdateResult()
 
-        sync_result = UpdateResult()
+        writer = BatchWriter(self.write_table, self.rate_limiter, workers=self.config.write_workers)
+        for chunk, updated_record_list, chunk_error in self._write_conforming(writer.write, update_dict_list):
+            if chunk_error:
+                logger.error(f"Failed to update {len(chunk)} record(s): {chunk_error}")
+                for update_dict in chunk:
+                    record = self.get_record_by_id(update_dict.get('id'))
+                    context = {'id': update_dict.get('id'),
+                               'issue_number': record.issue_number if record else None,
+                               'changes': None, 'error': f"record {update_dict.get('id')} update failed: {chunk_error}"}
+                    sync_result.add_record_status(context, UpdateResult.Status.FAILED)
+                continue
 
-        for updated_record in updated_record_list:
-            record_id = updated_record.get("id")
-            record = self.get_record_by_id(record_id)
-            issue_number = record.issue_number if record else None
-            context = {'id': record_id, 'issue_number': issue_number}
-            changes, error = None, None
-            if not record:
-                error = f"record {record_id} not found"
-                status = UpdateResult.Status.FAILED
-            else:
-                changes, error = record.commit_changes(updated_record)
-                status = UpdateResult.Status.UPDATED if changes else UpdateResult.Status.FAILED if error else UpdateResult.Status.UNCHANGED
-            context.update({'changes': changes, 'error': error})
-            sync_result.add_record_status(context, status)
+            for updated_record in updated_record_list:
+                self._commit_updated_record(updated_record, sync_result)
+
+        return sync_result
+
+    def batch_upsert(self, records: list[dict], sync_result: UpdateResult = None) -> UpdateResult:
+        """
+        Update the records matching the upserted ones by `UPSERT_KEY_FIELDS`, and create the others.
+        The records are sent in concurrent, rate-limited chunks like the updates, without reading the
+        table first. The records returned by Airtable are added to the loaded records.
+        Args:
+            records (list): Records with their `fields`, including the key fields.
+            sync_result (UpdateResult, optional): Result to add the record statuses to.
+        Returns:
+            UpdateResult: The result with each record created, updated or failed.
+        """
+        if sync_result is None:
+            sync_result = UpdateResult()
+
+        writer = BatchWriter(self.write_table, self.rate_limiter, workers=self.config.write_workers)
+        upsert = functools.partial(writer.upsert, key_fields=self.UPSERT_KEY_FIELDS)
+        for chunk, upsert_result, chunk_error in self._write_conforming(upsert, records):
+            if chunk_error:
+                logger.error(f"Failed to upsert {len(chunk)} record(s): {chunk_error}")
+                for upserted in chunk:
+                    issue_number = upserted.get('fields', {}).get('Issue Number')
+                    context = {'id': None, 'issue_number': issue_number, 'changes': None,
+                               'error': f"issue {issue_number} upsert failed: {chunk_error}"}
+                    sync_result.add_record_status(context, UpdateResult.Status.FAILED)
+                continue
+
+            created_ids = set(upsert_result.get('createdRecords', []))
+            upserted_fields = {upserted['fields'].get('Issue Number'): upserted['fields'] for upserted in chunk}
+            for record in (AirtableRecord(entry) for entry in upsert_result.get('records', [])):
+                self._add_records([record])
+                sent = upserted_fields.get(record.issue_number, {})
+                # The previous values are not known, only the values written are reported
+                changes = {field: {'new': record.fields.get(field)} for field in sent}
+                context = {'id': record.id, 'issue_number': record.issue_number, 'changes': changes, 'error': None}
+                status = UpdateResult.Status.CREATED if record.id in created_ids else UpdateResult.Status.UPDATED
+                sync_result.add_record_status(context, status)
 
         return sync_result
+
+    def _write_conforming(self, write, records: list[dict]):
+        """
+        Write the records with a batch writer method, yielding the outcome of each chunk.
+        The chunks rejected against the table schema, which may be a stale cached one, are written once more
+        after the schema is fetched again and their records are fitted to it.
+        """
+        rejected = []
+        for chunk, result, error in write(records):
+            if error is not None and self._is_schema_error(error):
+                rejected.extend(chunk)
+            else:
+                yield chunk, result, error
+        if rejected:
+            logger.warning(f"Airtable rejected {len(rejected)} record(s) against the table schema, "
+                           f"fetching it again and retrying them")
+            self.refresh_schema()
+            self._conform_to_schema(rejected)
+            yield from write(rejected)
+
+    @classmethod
+    def _is_schema_error(cls, error: Exception) -> bool:
+        """Check if a write was rejected for a field or a value not matching the table schema."""
+        response = getattr(error, 'response', None)
+        return (response is not None and response.status_code == 422
+                and any(error_type in str(error) for error_type in cls.SCHEMA_ERROR_TYPES))
+
+    def _conform_to_schema(self, records: list[dict]):
+        """
+        Fit the fields of the records to the table schema, in place so that the records staging them follow:
+        the fields no longer in the schema are dropped, and the values normalized to the current field types.
+        """
+        for record in records:
+            fields = record['fields']
+            for name, value in list(fields.items()):
+                field_schema = self.field_schema(name)
+                if field_schema is None:
+                    logger.warning(f"Field '{name}' is no longer in the Airtable table schema, not written")
+                    del fields[name]
+                else:
+                    fields[name] = ValueNormalizer.for_field(field_schema)(value)
+
+    def _commit_updated_record(self, updated_record: dict, sync_result: UpdateResult):
+        """Commit the changes of a record returned by Airtable and add its status to the result."""
+        record_id = updated_record.get("id")
+        record = self.get_record_by_id(record_id)
+        issue_number = record.issue_number if record else None
+        context = {'id': record_id, 'issue_number': issue_number}
+        changes, error = None, None
+        if not record:
+            error = f"record {record_id} not found"
+            status = UpdateResult.Status.FAILED
+        else:
+            changes, error = record.commit_changes(updated_record)
+            if changes and record.issue_number != issue_number:
+                self._reindex_record(record, issue_number)
+            status = UpdateResult.Status.UPDATED if changes else UpdateResult.Status.FAILED if error else UpdateResult.Status.UNCHANGED
+        context.update({'changes': changes, 'error': error})
+        sync_result.add_record_status(context, status)
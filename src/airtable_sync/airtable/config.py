@@ -12,6 +12,12 @@ class AirtableConfig:
     table_id: str
     """Airtable view name"""
     view_name: str
+    """Maximum requests per second sent to the base"""
+    requests_per_second: float
+    """Number of update requests in flight at a time"""
+    write_workers: int
+    """Number of partitions of the table read concurrently, 1 reads the table sequentially"""
+    read_partitions: int
 
     def __init__(self, config_json: dict):
         # Define the names of the environment variables and configuration keys for the token
@@ -33,3 +39,6 @@ class AirtableConfig:
         self.app_id = config_json.get('baseId')
         self.table_id = config_json.get('tableId')
         self.view_name = config_json.get('viewName')
+        self.requests_per_second = config_json.get('requestsPerSecond', 5)
+        self.write_workers = config_json.get('writeWorkers', 4)
+        self.read_partitions = config_json.get('readPartitions', 1)
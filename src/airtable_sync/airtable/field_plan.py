@@ -0,0 +1,100 @@
+from datetime import datetime
+from pyairtable.models.schema import FieldSchema
+from .normalizer import ValueNormalizer
+from .record import AirtableRecord
+
+
+class FieldStep:
+    """One field of the field plan: where the value comes from, where it goes, and how it is converted."""
+    __slots__ = ('source', 'target', 'field_type', 'convert')
+
+    def __init__(self, source: str, target: str, field_type: str, convert):
+        """
+        Args:
+            source (str): Name of the GitHub issue field.
+            target (str): Name of the Airtable field.
+            field_type (str): Type of the Airtable field in the table schema.
+            convert (callable): Normalizes a GitHub or Airtable value to the Airtable field type.
+        """
+        self.source = source
+        self.target = target
+        self.field_type = field_type
+        self.convert = convert
+
+
+class FieldPlan:
+    """
+    The field map compiled against the table schema, once per run.
+    Each step holds a converter chosen by the schema of its Airtable field,
+    so applying the plan to a record is a loop over the steps without schema lookups or type dispatch.
+    Both sides are normalized to the field type before they are compared, see `ValueNormalizer`, and
+    the plan counts the writes this avoids: the record's values that differ from the normalized GitHub value
+    but not once normalized themselves.
+    """
+
+    def __init__(self, field_map: dict, field_schemas: dict):
+        """
+        Compile the plan.
+        Args:
+            field_map (dict): Map of the GitHub fields to the Airtable fields, all in the table schema.
+            field_schemas (dict): Schemas of the Airtable fields by field name.
+        """
+        self.steps = [self._compile(source, target, field_schemas.get(target))
+                      for source, target in field_map.items()]
+        # The steps unpacked for the per-record loop of `apply`
+        self._step_tuples = [(step.source, step.target, step.convert) for step in self.steps]
+        self.avoided_fields = 0
+        self.avoided_records = 0
+
+    @staticmethod
+    def _compile(source: str, target: str, field_schema: FieldSchema) -> FieldStep:
+        """Compile the step of a field, with the normalizer of its Airtable field as converter."""
+        return FieldStep(source, target, getattr(field_schema, 'type', None), ValueNormalizer.for_field(field_schema))
+
+    def convert(self, source_fields: dict) -> dict:
+        """The Airtable values of the GitHub fields set, by Airtable field name."""
+        return {step.target: step.convert(value)
+                for step in self.steps if (value := source_fields.get(step.source))}
+
+    def apply(self, record: AirtableRecord, source_fields: dict) -> dict:
+        """
+        Set the converted GitHub values that differ from the record's to the record.
+        Each value is normalized at most once: the GitHub value when it differs from the record's as it is,
+        the record's value only when it also differs from the normalized GitHub value.
+        Args:
+            record (AirtableRecord): The Airtable record to be updated.
+            source_fields (dict): The GitHub issue fields.
+        Returns:
+            dict: The record's ID and updated fields.
+        """
+        fields = record.fields
+        staged, avoided = False, 0
+        for source, target, convert in self._step_tuples:
+            value = source_fields.get(source)
+            if not value:
+                continue
+            current_value = fields.get(target)
+            if current_value == value:
+                # Equal as they are, so also once normalized
+                continue
+            converted = convert(value)
+            if current_value == converted:
+                # Written if compared as they are, but a datetime is formatted to its date then too
+                avoided += not isinstance(value, datetime)
+                continue
+            if convert(current_value) != converted:
+                record.stage_field(target, converted, current_value)
+                staged = True
+            else:
+                # Equal only once the record's value is normalized too
+                avoided += 1
+        if avoided:
+            self.avoided_fields += avoided
+            self.avoided_records += not staged
+        return record.updated_fields
+
+    @property
+    def report(self) -> str:
+        """Report of the writes avoided by normalizing the values."""
+        return (f"Avoided {self.avoided_records} record write(s) and {self.avoided_fields} field write(s) "
+                f"by normalizing the values to the Airtable field types")
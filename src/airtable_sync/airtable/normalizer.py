@@ -0,0 +1,110 @@
+import re
+from datetime import datetime, timezone
+from pyairtable.models.schema import FieldSchema
+from .record import AirtableRecord
+
+
+class ValueNormalizer:
+    """
+    Normalizers of the field values by Airtable field type, driven by the field schema.
+    A normalizer turns a value into the canonical form Airtable returns for the field, e.g. a number
+    rounded to the field precision, so that a GitHub value and an Airtable value can be compared as equal
+    when writing the one would not change the other.
+    """
+
+    """Airtable field types of numbers with a precision"""
+    NUMBER_TYPES = ('number', 'currency', 'percent')
+
+    """Airtable field types of text"""
+    TEXT_TYPES = ('singleLineText', 'multilineText', 'richText', 'email', 'url', 'phoneNumber')
+
+    """Format of the date times returned by Airtable"""
+    DATE_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.000Z'
+
+    """Pattern of the date at the start of an ISO 8601 date or date time string"""
+    _DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+    @staticmethod
+    def for_field(field_schema: FieldSchema):
+        """
+        The normalizer of the values of a field.
+        Args:
+            field_schema (FieldSchema): The schema of the Airtable field, None if unknown.
+        Returns:
+            callable: The normalizer, the generic record formatting for the other field types.
+        """
+        field_type = getattr(field_schema, 'type', None)
+        options = getattr(field_schema, 'options', None)
+        if field_type in ValueNormalizer.NUMBER_TYPES:
+            precision = getattr(options, 'precision', None)
+            if precision is not None and field_type == 'percent':
+                # Percentages are stored as fractions, the precision is of the percentage shown
+                precision += 2
+            return lambda value: ValueNormalizer.number(value, precision)
+        if field_type == 'rating':
+            return lambda value: ValueNormalizer.number(value, 0)
+        if field_type == 'date':
+            return ValueNormalizer.date
+        if field_type == 'dateTime':
+            return ValueNormalizer.date_time
+        if field_type == 'singleSelect':
+            return ValueNormalizer.single_select
+        if field_type in ValueNormalizer.TEXT_TYPES:
+            return ValueNormalizer.text
+        if field_type == 'checkbox':
+            return ValueNormalizer.checkbox
+        return AirtableRecord._format
+
+    @staticmethod
+    def number(value, precision: int = None):
+        """A number rounded to the precision, an int if it has no fraction, e.g. 5.0 -> 5."""
+        if value is None or isinstance(value, bool):
+            return value
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return value
+        if precision is not None:
+            number = round(number, precision)
+        return int(number) if number.is_integer() else number
+
+    @staticmethod
+    def date(value):
+        """A date as "YYYY-MM-DD", from a datetime or an ISO 8601 date or date time string."""
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, str) and ValueNormalizer._DATE_PATTERN.match(value):
+            return value[:10]
+        return value
+
+    @staticmethod
+    def date_time(value):
+        """A date time in UTC as Airtable returns it, from a datetime or an ISO 8601 string, naive ones in UTC."""
+        if isinstance(value, str):
+            try:
+                # fromisoformat only takes a "Z" offset from Python 3.11
+                value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                return value
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return value.astimezone(timezone.utc).strftime(ValueNormalizer.DATE_TIME_FORMAT)
+        return value
+
+    @staticmethod
+    def single_select(value):
+        """The name of a choice, without surrounding whitespace."""
+        return value.strip() if isinstance(value, str) else value
+
+    @staticmethod
+    def text(value):
+        """Text with "\\n" line endings, and a datetime as "YYYY-MM-DD" as in the generic formatting."""
+        if isinstance(value, str):
+            return value.replace('\r\n', '\n')
+        return AirtableRecord._format(value)
+
+    @staticmethod
+    def checkbox(value):
+        """A checkbox value, unchecked if missing as Airtable omits unchecked boxes."""
+        return bool(value)
@@ -1,3 +1,4 @@
+import sys
 from datetime import datetime
 from urllib.parse import urlparse
 from pyairtable.api.types import RecordDict
@@ -7,7 +8,11 @@ logger = CustomLogger(__name__)
 
 
 class AirtableRecord:
-    """Class to represent a record in Airtable."""
+    """
+    Class to represent a record in Airtable.
+    Slotted, as a sync holds one per row: the issue number and repo name are parsed once from the fields.
+    """
+    __slots__ = ('_record_dict', '_updated_fields', '_issue_number', '_repo_name')
 
     """List of compulsory fields for the record."""
     _required_fields = ["Title", "Issue Link", "Issue Number"]
@@ -21,12 +26,30 @@ class AirtableRecord:
     def __init__(self, record_dict: RecordDict):
         self._record_dict = record_dict
         self._updated_fields = {}
+        self._parse_keys()
+
+    def _parse_keys(self):
+        """Parse the issue number and repo name of the record, when created and when its fields change."""
+        fields = self.fields
+        try:
+            self._issue_number = int(fields.get("Issue Number"))
+        except (TypeError, ValueError):
+            self._issue_number = None
+        link = fields.get("Issue Link")
+        path_parts = urlparse(link).path.split('/') if isinstance(link, str) else []
+        # The repo name is the same for most records, share one string
+        self._repo_name = sys.intern(path_parts[path_parts.index("issues") - 1]) if "issues" in path_parts else None
 
     @property
     def id(self) -> str:
         """ID of the record."""
         return self._record_dict.get("id")
 
+    @property
+    def fields(self) -> dict:
+        """Fields of the record, by field name."""
+        return self._record_dict.get("fields", {})
+
     @property
     def title(self) -> str:
         """Title of the record."""
@@ -35,7 +58,7 @@ class AirtableRecord:
     @property
     def issue_number(self) -> int:
         """Issue number in the record, corresponds to the GitHub issue number."""
-        return int(self._record_dict.get("fields", {}).get("Issue Number"))
+        return self._issue_number
 
     @property
     def issue_link(self) -> str:
@@ -45,12 +68,10 @@ class AirtableRecord:
     @property
     def repo_name(self) -> str:
         """Repository name extracted from the issue link."""
-        path_parts = urlparse(self.issue_link).path.split('/')
-        if "issues" in path_parts:
-            return path_parts[path_parts.index("issues") - 1]
-        else:
+        if self._repo_name is None:
             raise ValueError(
                 "Invalid issue link format: {}".format(self.issue_link))
+        return self._repo_name
 
     @property
     def updated_fields(self) -> dict:
@@ -101,6 +122,8 @@ class AirtableRecord:
             # Remove marked fields
             for field in committed_fields:
                 self._updated_fields.pop(field, None)
+            if committed_fields:
+                self._parse_keys()
 
             if len(mismatch_fields) > 0:
                 mismatches = ', '.join(
@@ -110,6 +133,11 @@ class AirtableRecord:
                 error = f"Failed to update fields: {', '.join(self._updated_fields.keys())}."
         return (changes, error)
 
+    @staticmethod
+    def required_fields() -> list[str]:
+        """Names of the fields every record must have."""
+        return list(AirtableRecord._required_fields)
+
     @staticmethod
     def validate_schema(schema: dict) -> tuple:
         """
@@ -173,16 +201,35 @@ class AirtableRecord:
         if current_value == value:
             return
 
+        self.stage_field(field, value, current_value)
+
+    def stage_field(self, field: str, value, current_value):
+        """
+        Mark a formatted value that differs from the current value of a field for update.
+        Args:
+            field (str): The name of the field to set.
+            value: The formatted value to set for the field.
+            current_value: The current value of the field.
+        Notes:
+            - The value is not set if its type doesn't match the current value's.
+        """
         logger.debug(
-            f"Record {self.issue_number} fields '{field}': {current_value} -> {value}")
+            lambda: f"Record {self.issue_number} fields '{field}': {current_value} -> {value}")
 
-        if current_value is not None and not isinstance(current_value, type(value)):
+        if current_value is not None and not self._same_type(current_value, value):
             logger.warning(
                 f"Field type mismatch: {field} - {current_value} != {type(value)}")
             return
 
         self._updated_fields[field] = value
 
+    @staticmethod
+    def _same_type(current_value, value) -> bool:
+        """If a value has the type of the current value, ints and floats being both numbers."""
+        if isinstance(current_value, (int, float)) and isinstance(value, (int, float)):
+            return isinstance(current_value, bool) == isinstance(value, bool)
+        return isinstance(current_value, type(value))
+
     @staticmethod
     def _format(value):
         """
@@ -195,5 +242,5 @@ class AirtableRecord:
             - Otherwise, it returns the string representation of `value`.
         """
         if isinstance(value, datetime):
-            return value.strftime("%Y-%m-%d")
+            return value.date().isoformat()
         return value
@@ -0,0 +1,33 @@
+from pyairtable.models.schema import FieldSchema, TableSchema
+
+
+class TableSchemaIndex:
+    """Index of the fields in an Airtable table schema, by field name and by field ID."""
+
+    def __init__(self, table_schema: TableSchema):
+        """
+        Build the index once from a fetched table schema.
+        Args:
+            table_schema (TableSchema): The schema of the Airtable table.
+        """
+        fields = table_schema.fields
+        self._fields_by_name = {field.name: field for field in fields}
+        self._fields_by_id = {field.id: field for field in fields}
+        self._field_types = {field.name: field.type for field in fields}
+
+    def __contains__(self, field_name: str) -> bool:
+        """Check if a field with the given name is in the schema."""
+        return field_name in self._fields_by_name
+
+    @property
+    def field_types(self) -> dict:
+        """Field name to field type pairs."""
+        return self._field_types
+
+    def field_by_name(self, field_name: str) -> FieldSchema:
+        """Field schema with the given name, or None if not found."""
+        return self._fields_by_name.get(field_name)
+
+    def field_by_id(self, field_id: str) -> FieldSchema:
+        """Field schema with the given ID, or None if not found."""
+        return self._fields_by_id.get(field_id)
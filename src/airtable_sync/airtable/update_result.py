@@ -6,6 +6,7 @@ class UpdateResult:
     """Class to store the result of a batch update operation."""
     class Status(Enum):
         """Enumeration of the possible status values."""
+        CREATED = "created"
         UPDATED = "updated"
         UNCHANGED = "unchanged"
         FAILED = "failed"
@@ -18,6 +19,11 @@ class UpdateResult:
         """String representation, a summary of the update result."""
         return self.summary
 
+    @property
+    def created(self) -> list[dict]:
+        """List of created records."""
+        return self._result.get(UpdateResult.Status.CREATED)
+
     @property
     def updated(self) -> list[dict]:
         """List of updated records."""
@@ -43,8 +49,10 @@ class UpdateResult:
 
     @property
     def summary(self) -> str:
-        """Summary of the update result, including counts of updated, unchanged, and failed records."""
+        """Summary of the update result, including counts of created, updated, unchanged, and failed records."""
         result = []
+        if len(self.created) > 0:
+            result.append(f"created: {len(self.created)}")
         if len(self.updated) > 0:
             result.append(f"updated: {len(self.updated)}")
         if len(self.unchanged) > 0:
@@ -56,14 +64,16 @@ class UpdateResult:
 
     @property
     def updates(self) -> str:
-        """Detailed list of updated records, including record ID, issue number and old vs new values."""
+        """Detailed list of created and updated records, including record ID, issue number and old vs new values."""
         updates = []
-        for update in self.updated:
+        for update in self.created + self.updated:
             changes = update.get('changes')
             change_list = []
             for field, change in changes.items():
+                # The old value is not known when the record was upserted without reading it
                 change_list.append(
-                    f"    {field}: {change.get('old')} -> {change.get('new')}")
+                    f"    {field}: {change.get('old')} -> {change.get('new')}" if 'old' in change
+                    else f"    {field}: {change.get('new')}")
             change_str = '\n'.join(change_list)
             updates.append(
                 f"  Record - id:{update.get('id')} issue_number:{update.get('issue_number')} \n{change_str}")
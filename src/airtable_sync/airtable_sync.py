@@ -1,11 +1,23 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 from .github.config import GitHubConfig
 from .github.client import GitHubClient
 from .github.issue import GitHubIssue
 from .airtable.config import AirtableConfig
+from .airtable.batch_writer import BatchWriter
 from .airtable.client import AirtableClient
+from .airtable.field_plan import FieldPlan
 from .airtable.record import AirtableRecord
 from .airtable.update_result import UpdateResult
 from .custom_logger import CustomLogger
+from .disk_cache import DiskCache
+from .pipeline import Prefetcher
+from .snapshot_store import SnapshotStore
+from .sync_config import SyncConfig
+from .watermark import Watermark
 
 logger = CustomLogger(__name__)
 
@@ -13,37 +25,107 @@ logger = CustomLogger(__name__)
 class AirtableSync:
     """Class to synchronize records between Airtable and GitHub."""
     _field_map = None
+    _sync_field_map = None
+    _field_plan = None
+    _field_plan_schema = None
 
-    def __init__(self, airtable_config: AirtableConfig, github_config: GitHubConfig):
+    """Number of GitHub project pages fetched ahead of the comparison in a streaming sync"""
+    STREAM_BUFFER_PAGES = 2
+
+    def __init__(self, airtable_config: AirtableConfig, github_config: GitHubConfig,
+                 sync_config: SyncConfig = None):
         """
         Initialize the AirtableSync class with the provided Airtable and GitHub configurations.
         Args:
             airtable_config (AirtableConfig): Configuration object for Airtable.
             github_config (GitHubConfig): Configuration object for GitHub.
+            sync_config (SyncConfig, optional): Configuration object for the sync run, defaults apply if omitted.
         """
         self.airtable_config = airtable_config
-        self.airtable = AirtableClient(airtable_config)
-        self.github = GitHubClient(github_config)
+        self.sync_config = sync_config or SyncConfig({})
+        sync_key = (f"{github_config.repo_owner}/{github_config.repo_name}/{github_config.project_name}"
+                    f":{airtable_config.app_id}/{airtable_config.table_id}")
+        self.watermark = Watermark(
+            os.path.join(self.sync_config.state_dir, 'watermark.json'), key=sync_key)
+        self._incremental = False
+        self._read_started_at = None
+        self._github_counters = None
+        self.cache = DiskCache(
+            os.path.join(self.sync_config.state_dir, 'cache.json'), self.sync_config.cache_ttl)
+        self.airtable = AirtableClient(airtable_config, self.cache)
+        self.github = GitHubClient(github_config, self.cache)
         if self._field_map is None:
             self._field_map = {GitHubIssue._map_field_name(
                 k): v for k, v in github_config.field_map.items()}
+        self.snapshot = SnapshotStore(
+            os.path.join(self.sync_config.state_dir, 'snapshot.db'), key=sync_key,
+            field_map=self.field_map) if self.sync_config.snapshot else None
+        if self.snapshot and self.sync_config.rebuild_snapshot:
+            # Once before the first run, not on every run of a daemon
+            logger.info("Rebuilding the snapshot store, every record is compared")
+            self.snapshot.rebuild()
         # Ensure only the records in the relevant repository are synced
         self.airtable.current_repo = github_config.repo_name
 
-    def read_records(self):
-        """Read all records in Airtable"""
-        self.airtable.read_records()
+    def read_records(self, stop_event: threading.Event = None):
+        """
+        Read all records in Airtable, or only those modified since the last sync if incremental.
+        Only the fields used by the sync are read.
+        """
+        formula = AirtableClient.modified_since_formula(
+            self.watermark.airtable_modified_at) if self._incremental else None
+        self.airtable.read_records(stop_event=stop_event, formula=formula, fields=self.read_fields)
+
+    @property
+    def read_fields(self) -> list[str]:
+        """The Airtable fields read: the fields required in every record and the fields synced."""
+        return list(dict.fromkeys([*AirtableRecord.required_fields(), *self.sync_field_map.values()]))
 
-    def read_issues(self):
+    def read_issues(self, stop_event: threading.Event = None):
         """Read all issues in GitHub"""
         self.github.fetch_project_id()
-        self.github.fetch_project_items()
+        self.github.fetch_project_items(stop_event=stop_event)
 
     @property
     def field_map(self) -> dict:
         """Map the fields from GitHub to Airtable"""
         return self._field_map
 
+    @property
+    def sync_field_map(self) -> dict:
+        """
+        The subset of the field map whose Airtable fields exist in the table schema.
+        Resolved once per run, so the per-record field filtering does no schema lookups.
+        """
+        if self._sync_field_map is None:
+            self._sync_field_map = {
+                github_field: airtable_field
+                for github_field, airtable_field in self.field_map.items()
+                if self.airtable.field_in_schema(airtable_field)
+            }
+        return self._sync_field_map
+
+    @property
+    def field_plan(self) -> FieldPlan:
+        """
+        The syncable fields compiled against the table schema, once per run.
+        Compiled again if the schema is fetched again during the run, e.g. after a write rejected against it.
+        """
+        schema_index = self.airtable.schema_index
+        previous_plan = self._field_plan
+        if previous_plan is not None and self._field_plan_schema is not schema_index:
+            self._sync_field_map = None
+            self._field_plan = None
+        if self._field_plan is None:
+            self._field_plan = FieldPlan(self.sync_field_map, {
+                airtable_field: self.airtable.field_schema(airtable_field)
+                for airtable_field in self.sync_field_map.values()})
+            self._field_plan_schema = schema_index
+            if previous_plan is not None:
+                self._field_plan.avoided_fields = previous_plan.avoided_fields
+                self._field_plan.avoided_records = previous_plan.avoided_records
+        return self._field_plan
+
     def _verify_sync_fields(self) -> bool:
         """
         Verify the fields to be synced are in the Airtable table schema.
@@ -80,45 +162,359 @@ class AirtableSync:
 
     def sync(self):
         """Reconcile the records in Airtable with the issues in GitHub"""
+        if self.sync_config.upsert:
+            update_result, snapshot_hashes = self._sync_upsert()
+        elif self.sync_config.streaming:
+            update_result, snapshot_hashes = self._sync_streaming()
+        else:
+            update_result, snapshot_hashes = self._sync_batch()
+
+        # Log the final sync result
+        self._log_sync_result(update_result, logger)
+        if self._field_plan:
+            logger.verbose(self._field_plan.report)
+        # Only the requests of this run, the clients count those of all the runs of a daemon
+        rate_limit_counters, transport_counters = self._github_counters or (None, None)
+        logger.verbose(f"GitHub requests: {self.github.transport_stats.summary(since=transport_counters)}")
+        logger.info(f"GitHub rate limit: {self.github.rate_limit.summary(since=rate_limit_counters)}")
+
+        self._save_watermark(update_result)
+        self._save_snapshots(update_result, snapshot_hashes)
+
+    def _sync_batch(self) -> tuple:
+        """
+        Read all the records and issues, then compare them and write the updates at once.
+        Returns:
+            tuple: The update result and the snapshot hashes of the records compared.
+        """
         self._prep_sync()
 
         update_dict_list = []
 
         logger.verbose(
-            f"Syncing {len(self.airtable.records_in_current_repo)} record(s) from current_repo: {self.airtable.current_repo}, of total {len(self.airtable.records)} record(s).")
+            f"Syncing {len(self.airtable.records_in_current_repo)} record(s) from current_repo: {self.airtable.current_repo}.")
 
+        snapshots = self.snapshot.load() if self.snapshot else {}
+        snapshot_hashes = {}
         for record in self.airtable.records_in_current_repo:
             issue = self._get_issue(record)
-            update_dict = self._update_fields(record, issue)
+            if issue is None:
+                continue
+            update_dict = self._diff_record(record, issue, snapshots, snapshot_hashes)
             if update_dict:
                 update_dict_list.append(update_dict)
+        self._log_skipped(snapshots, snapshot_hashes)
 
         # Perform the batch update and handle the result
-        update_result = self.airtable.batch_update(update_dict_list)
+        return self.airtable.batch_update(update_dict_list), snapshot_hashes
 
-        # Log the final sync result
-        self._log_sync_result(update_result, logger)
+    def _sync_streaming(self) -> tuple:
+        """
+        Compare and write the records page by page as the GitHub project is fetched.
+        The project pages are fetched and parsed in the background, at most `STREAM_BUFFER_PAGES` ahead,
+        while the issues of each page are matched with the Airtable records, compared, and the updates
+        written out in batches. The project issues are not kept in memory, and the first writes go out
+        before the last page is fetched. The Airtable records are read in full, while the first pages are
+        fetched, as the issues are matched with them by issue number, each issue with all of its records.
+        Returns:
+            tuple: The update result and the snapshot hashes of the records compared.
+        """
+        self._start_run()
+        self.github.fetch_project_id()
+
+        update_result = UpdateResult()
+        snapshots = self.snapshot.load() if self.snapshot else {}
+        snapshot_hashes = {}
+        matched = set()
+        changed_issues = {}
+        pending = []
+        batch_size = BatchWriter.CHUNK_SIZE * self.airtable_config.write_workers
+        pages, first_write_page = 0, None
+
+        def diff(record, issue):
+            matched.add(record.id)
+            update_dict = self._diff_record(record, issue, snapshots, snapshot_hashes)
+            if update_dict:
+                pending.append(update_dict)
+
+        def write(final=False):
+            nonlocal first_write_page
+            if pending and (final or len(pending) >= batch_size):
+                first_write_page = first_write_page or pages
+                self.airtable.batch_update(list(pending), update_result)
+                pending.clear()
+
+        with Prefetcher(self.github.iter_project_issues, maxsize=self.STREAM_BUFFER_PAGES,
+                        name='github_pages') as issue_pages:
+            self.read_records()
+            for issues in issue_pages:
+                pages += 1
+                for issue in issues:
+                    records = self.airtable.get_records_by_issue_number(issue.issue_number)
+                    if not records:
+                        if self._incremental and issue.updated_at and issue.updated_at > self.watermark.github_updated_at:
+                            # Changed in GitHub but its record was not modified in Airtable, read below
+                            changed_issues[issue.issue_number] = issue
+                    for record in records:
+                        if record.id not in matched:
+                            diff(record, issue)
+                write()
+        logger.verbose(
+            f"Streamed {pages} page(s) of the GitHub project, first write after page {first_write_page or pages}")
+
+        if changed_issues:
+            self.airtable.read_records_by_issue_numbers(list(changed_issues), fields=self.read_fields)
+            for issue_number, issue in changed_issues.items():
+                for record in self.airtable.get_records_by_issue_number(issue_number):
+                    if record.id not in matched:
+                        diff(record, issue)
+
+        # The records of issues not in the project, or not epics, are fetched and compared last
+        unmatched = [record for record in self.airtable.records_in_current_repo
+                     if record.id not in matched]
+        self.github.fetch_issues([record.issue_number for record in unmatched])
+        for record in unmatched:
+            issue = self._get_issue(record)
+            if issue is not None:
+                diff(record, issue)
+                write()
+        write(final=True)
+
+        self._log_skipped(snapshots, snapshot_hashes)
+        return update_result, snapshot_hashes
+
+    def _sync_upsert(self) -> tuple:
+        """
+        Write the epics of the GitHub project to Airtable without reading the table first.
+        Each epic is upserted by issue number and link, which updates its record or creates it if missing.
+        As the records are not read, every epic is written unless its GitHub values are unchanged since the
+        last sync according to the snapshot, or, in an incremental sync, it is not updated since the last sync.
+        Changes made in Airtable are not detected, and the records of issues not in the project are left as is.
+        Returns:
+            tuple: The update result and the snapshot hashes of the records written or skipped.
+        """
+        self._start_run()
+        self.read_issues()
+
+        update_result = UpdateResult()
+        snapshots = self.snapshot.load() if self.snapshot else {}
+        snapshot_hashes = {}
+        upserts = []
+        for issue in self.github.epic_issues:
+            if self._incremental and not (issue.updated_at and issue.updated_at > self.watermark.github_updated_at):
+                continue
+            if self.snapshot:
+                github_hash = self._github_hash(issue)
+                previous = snapshots.get(issue.issue_number)
+                if previous and previous[0] == github_hash:
+                    snapshot_hashes[issue.issue_number] = previous
+                    update_result.add_record_status(
+                        {'id': None, 'issue_number': issue.issue_number, 'changes': None, 'error': None},
+                        UpdateResult.Status.UNCHANGED)
+                    continue
+                snapshot_hashes[issue.issue_number] = (github_hash, None)
+            upserts.append(self._upsert_fields(issue))
+        logger.verbose(f"Upserting {len(upserts)} of {len(self.github.epic_issues)} epic(s)")
+
+        return self.airtable.batch_upsert(upserts, update_result), snapshot_hashes
+
+    def _upsert_fields(self, issue: GitHubIssue) -> dict:
+        """The record of an issue to upsert: the key fields, the title and the mapped values set in GitHub."""
+        fields = {'Title': issue.title, 'Issue Link': issue.url, 'Issue Number': issue.issue_number}
+        fields.update(self.field_plan.convert(issue.fields))
+        return {'fields': fields}
+
+    def _diff_record(self, record: AirtableRecord, issue: GitHubIssue, snapshots: dict, snapshot_hashes: dict) -> dict:
+        """
+        Compare a record with its issue, unless both are unchanged since the last sync.
+        Args:
+            record (AirtableRecord): The Airtable record.
+            issue (GitHubIssue): The GitHub issue of the record.
+            snapshots (dict): The snapshot hashes of the last sync by issue number, empty without snapshots.
+            snapshot_hashes (dict): The snapshot hashes of this sync by issue number, the record's are added.
+        Returns:
+            dict: The record's ID and updated fields, None if the record is skipped.
+        """
+        if self.snapshot:
+            # Skip the records unchanged on both sides since the last sync
+            snapshot_hashes[record.issue_number] = self._snapshot_hashes(record, issue)
+            if snapshots.get(record.issue_number) == snapshot_hashes[record.issue_number]:
+                return None
+        return self._update_fields(record, issue)
+
+    def _log_skipped(self, snapshots: dict, snapshot_hashes: dict):
+        """Log the number of records skipped as unchanged since the last sync."""
+        if self.snapshot:
+            skipped = sum(snapshots.get(issue_number) == hashes
+                          for issue_number, hashes in snapshot_hashes.items())
+            logger.verbose(f"Skipped {skipped} record(s) unchanged since the last sync")
+
+    def _start_run(self):
+        """
+        Reset the state of the previous run and verify the fields to be synced.
+        Raises:
+            Exception: If the necessary fields for synchronization are missing in the Airtable table schema.
+        """
+        # Keep the clients and their connections of a previous run in the same process
+        self.airtable.reset()
+        self.github.reset()
+        self._github_counters = (self.github.rate_limit.counters(), self.github.transport_stats.counters())
+        # Resolve and compile the syncable fields against the current schema on every run
+        self._sync_field_map = None
+        self._field_plan = None
+        self._incremental = self._incremental_sync_due()
+        self._read_started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+        # Verify the fields to be synced, against the current schema if the cached one doesn't match
+        valid = self._verify_sync_fields() and self._verify_record_field()
+        if not valid and self.airtable.schema_cached:
+            logger.warning("Cached Airtable table schema is missing fields, fetching it again")
+            self.airtable.refresh_schema()
+            self._sync_field_map = None
+            self._field_plan = None
+            valid = self._verify_sync_fields() and self._verify_record_field()
+        if not valid:
+            raise Exception(
+                "Sync aborted due to missing fields in Airtable table schema.")
 
     def _prep_sync(self):
         """
         Prepare the synchronization process between Airtable and GitHub.
         This method performs the following steps:
         1. Verifies that the necessary fields for synchronization are present in the Airtable table schema.
-        2. Reads the records from Airtable.
-        3. Reads the issues from GitHub.
+           A cached schema that fails the verification is fetched again before giving up.
+        2. Reads the records from Airtable and the issues from GitHub concurrently.
+           In an incremental sync only the records modified since the last sync are read from Airtable,
+           then the records of the issues changed in GitHub since the last sync are read in addition.
+        3. Fetches, in bulk, the issues of the records that are not in the GitHub project.
         Raises:
             Exception: If the necessary fields for synchronization are missing in the Airtable table schema.
         """
-        # Verify the fields to be synced
-        if not (self._verify_sync_fields() and self._verify_record_field()):
-            raise Exception(
-                "Sync aborted due to missing fields in Airtable table schema.")
+        self._start_run()
 
-        # Read the records from Airtable
-        self.read_records()
+        # Read the records from Airtable and the issues from GitHub in parallel
+        self._read_concurrently()
 
-        # Read the issues from GitHub
-        self.read_issues()
+        if self._incremental:
+            self._read_changed_records()
+
+        # Fetch the issues not found in the project, in batches instead of one by one
+        self._fetch_missing_issues()
+
+    def _read_concurrently(self):
+        """
+        Read the Airtable records and the GitHub issues in parallel, overlapping the paging of both services.
+        If either read fails, the other one is stopped before its next page request and the error is re-raised.
+        """
+        stop_event = threading.Event()
+        durations = {}
+
+        def timed(name, read):
+            start = time.perf_counter()
+            try:
+                read(stop_event=stop_event)
+            finally:
+                durations[name] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='prep_sync') as executor:
+            futures = [executor.submit(timed, 'Airtable', self.read_records),
+                       executor.submit(timed, 'GitHub', self.read_issues)]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            error = next((future.exception()
+                         for future in done if future.exception()), None)
+            if error:
+                stop_event.set()
+                for future in futures:
+                    future.cancel()
+        elapsed = time.perf_counter() - start
+
+        if error:
+            raise error
+
+        logger.verbose(
+            f"Read Airtable in {durations['Airtable']:.2f}s and GitHub in {durations['GitHub']:.2f}s, "
+            f"took {elapsed:.2f}s in total, {sum(durations.values()) - elapsed:.2f}s overlapped")
+
+    def _incremental_sync_due(self) -> bool:
+        """Check if this run can be incremental, otherwise it falls back to a full sync."""
+        if not self.sync_config.incremental:
+            return False
+        if self.watermark.full_sync_due(self.sync_config.full_sync_interval):
+            logger.verbose(
+                "Full sync: no watermark from a previous sync or the full sync interval has elapsed")
+            return False
+        logger.verbose(
+            f"Incremental sync since GitHub: {self.watermark.github_updated_at} Airtable: {self.watermark.airtable_modified_at}")
+        return True
+
+    def _read_changed_records(self):
+        """Read the records of the issues changed in GitHub since the last sync, if not read already."""
+        changed_issue_numbers = self.github.issue_numbers_updated_since(
+            self.watermark.github_updated_at)
+        added = self.airtable.read_records_by_issue_numbers(changed_issue_numbers, fields=self.read_fields)
+        logger.verbose(
+            f"{len(changed_issue_numbers)} issue(s) changed in GitHub, {added} record(s) read in addition to those modified in Airtable")
+
+    def _save_watermark(self, update_result: UpdateResult):
+        """
+        Advance the watermark after a sync so that the next incremental sync starts from here.
+        The watermark is kept if any record failed, so the failed records are retried next time.
+        """
+        if not self.sync_config.incremental:
+            return
+        if update_result.failed:
+            logger.warning("Watermark not advanced due to failed record(s)")
+            return
+        watermark = self.watermark
+        watermark.github_updated_at = max(
+            filter(None, [self.github.latest_update, watermark.github_updated_at]), default=None)
+        watermark.airtable_modified_at = self._read_started_at
+        if not self._incremental:
+            watermark.full_sync_at = self._read_started_at
+        watermark.save()
+
+    def _snapshot_hashes(self, record: AirtableRecord, issue: GitHubIssue) -> tuple:
+        """Hashes of the mapped GitHub field values of the issue and of the synced Airtable values of the record."""
+        return self._github_hash(issue), self._airtable_hash(record)
+
+    def _github_hash(self, issue: GitHubIssue) -> str:
+        """Hash of the mapped GitHub field values of the issue."""
+        return SnapshotStore.hash_values(
+            {github_field: issue.fields.get(github_field) for github_field in self.sync_field_map})
+
+    def _airtable_hash(self, record: AirtableRecord) -> str:
+        """Hash of the synced Airtable values of the record."""
+        return SnapshotStore.hash_values(
+            {airtable_field: record.fields.get(airtable_field) for airtable_field in self.sync_field_map.values()})
+
+    def _save_snapshots(self, update_result: UpdateResult, snapshot_hashes: dict):
+        """
+        Save the snapshots of the records synced, except those that failed so they are compared next time.
+        After a full sync the snapshots of the records no longer in the table are deleted.
+        """
+        if not self.snapshot:
+            return
+        failed_ids = {failed.get('id') for failed in update_result.failed}
+        for record in self.airtable.records_in_current_repo:
+            if record.id in failed_ids or record.issue_number not in snapshot_hashes:
+                continue
+            github_hash, _ = snapshot_hashes[record.issue_number]
+            self.snapshot.put(record.issue_number, github_hash, self._airtable_hash(record))
+        self.snapshot.commit()
+
+        if not self._incremental:
+            deleted = self.snapshot.compact(set(snapshot_hashes))
+            if deleted:
+                logger.verbose(f"Deleted {deleted} snapshot(s) of records no longer synced")
+
+    def _fetch_missing_issues(self):
+        """Fetch the issues of the records in the current repo that were not loaded from the project."""
+        missing_issue_numbers = [
+            record.issue_number for record in self.airtable.records_in_current_repo
+            if not self.github.has_issue(record.issue_number)]
+        if missing_issue_numbers:
+            self.github.fetch_issues(missing_issue_numbers)
 
     def _get_issue(self, record: AirtableRecord) -> GitHubIssue:
         """
@@ -126,9 +522,13 @@ class AirtableSync:
         Args:
             record: An object representing an Airtable record. It should have an attribute `issue_number`.
         Returns:
-            The GitHub issue corresponding to the `issue_number` in the record.
+            The GitHub issue corresponding to the `issue_number` in the record, None if the issue is not found,
+            e.g. deleted or transferred, in which case the record is skipped.
         """
-        return self.github.fetch_issue(record.issue_number)
+        issue = self.github.fetch_issue(record.issue_number)
+        if issue is None:
+            logger.warning(f"Skipping record {record.id}: issue {record.issue_number} not found")
+        return issue
 
     def _log_sync_result(self, sync_result: UpdateResult, logger):
         """
@@ -155,11 +555,4 @@ class AirtableSync:
         Returns:
             dict: A dictionary containing the record's ID and updated fields.
         """
-        updated_fields = {
-            airtable_field: value
-            for github_field, airtable_field in self.field_map.items()
-            if (value := issue.fields.get(github_field)) and self.airtable.field_in_schema(airtable_field)
-        }
-
-        # Set the filtered fields to the record
-        return record.set_fields(updated_fields)
+        return self.field_plan.apply(record, issue.fields)
@@ -1,5 +1,9 @@
+import atexit
 import logging
-import inspect
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
 
 
 class CustomLogger:
@@ -12,6 +16,8 @@ class CustomLogger:
     Methods:
         verbose(message, *args, **kwargs):
             Logs a message with the custom verbose level, including caller information.
+    The message can be a callable returning the message, which is only called if the level is enabled,
+    for messages that are expensive to build, e.g. `logger.debug(lambda: dump(records))`.
     """
     # Define a verbose level
     VERBOSE = 15  # Between INFO (20) and DEBUG (10)
@@ -42,24 +48,37 @@ class CustomLogger:
         """Passthrough error logging method."""
         self._log_with_caller_info(logging.ERROR, message, *args, **kwargs)
 
-    def _log_with_caller_info(self, level: int, message: str, *args, **kwargs):
-        """Log a message with caller information."""
-        # Get the calling function's frame
-        frame = inspect.stack()[2]
-        filename = frame.filename.split('/')[-1]  # Get the filename
-        lineno = frame.lineno  # Get the line number
-        method_name = frame.function  # Get the method name
-        class_name = frame.frame.f_locals.get(
-            'self', None).__class__.__name__ if 'self' in frame.frame.f_locals else ''  # Get the class name
-        class_name = f"{class_name}." if class_name else ''
+    def _log_with_caller_info(self, level: int, message, *args, **kwargs):
+        """Log a message with caller information, if the level is enabled."""
+        if not self.logger.isEnabledFor(level):
+            return
+
+        # Get the calling function's frame, skipping this method and the level method
+        frame = sys._getframe(2)
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)  # Get the filename
+        method_name = code.co_name  # Get the method name
+        caller = frame.f_locals.get('self') if 'self' in code.co_varnames else None
+        class_name = f"{caller.__class__.__name__}." if caller is not None else ''  # Get the class name
+
+        if callable(message):
+            message = message()
 
         # Log the message with the correct filename and line number
         self.logger.log(
-            level, f"{filename}:{lineno} {class_name}{method_name}() - {message}", *args, **kwargs)
+            level, f"{filename}:{frame.f_lineno} {class_name}{method_name}() - {message}", *args, **kwargs)
 
     @staticmethod
-    def setup_logging(level: str):
-        """Set up the root logger with the specified logging level."""
+    def setup_logging(level: str, queued: bool = False, queue_size: int = 10000):
+        """
+        Set up the root logger with the specified logging level.
+        Args:
+            level (str): The logging level name, ERROR if unknown.
+            queued (bool, optional): Hand the records over to a background thread that writes them out,
+                so that the log output does not block the sync. Defaults to False.
+            queue_size (int, optional): Maximum number of records waiting to be written out when queued,
+                logging blocks until there is room rather than dropping records. Defaults to 10000.
+        """
         log_levels = {
             'debug': logging.DEBUG,
             'verbose': CustomLogger.VERBOSE,
@@ -68,8 +87,24 @@ class CustomLogger:
             'error': logging.ERROR
         }
         mapped_level = log_levels.get(level, logging.ERROR)
-        logging.basicConfig(
-            level=mapped_level,
-            format='%(asctime)s %(levelname)-3.3s %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        log_format = '%(asctime)s %(levelname)-3.3s %(message)s'
+        date_format = '%Y-%m-%d %H:%M:%S'
+        if not queued:
+            logging.basicConfig(level=mapped_level, format=log_format, datefmt=date_format)
+            return
+
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(log_format, datefmt=date_format))
+        log_queue = queue.Queue(maxsize=queue_size)
+        listener = QueueListener(log_queue, handler)
+        logging.basicConfig(level=mapped_level, handlers=[_BlockingQueueHandler(log_queue)])
+        listener.start()
+        # Write out the records still in the queue on exit
+        atexit.register(listener.stop)
+
+
+class _BlockingQueueHandler(QueueHandler):
+    """Queue handler that waits for room in a full queue instead of failing to log the record."""
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.put(record)
@@ -0,0 +1,86 @@
+import random
+import signal
+import threading
+import time
+from typing import Callable
+from .custom_logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+
+class SyncDaemon:
+    """
+    Runs the sync repeatedly in one long-running process, so the clients and their connections are kept
+    between the runs. The project ID and the table schema are reused while the cache holds them.
+    - The runs start on a fixed schedule of ticks `interval` seconds apart, each delayed by a random
+      jitter of up to `jitter` times the interval, so that daemons started together spread their requests.
+    - A run that takes longer than the interval does not overlap the next one: the ticks it overran are
+      skipped and the next run starts at the following tick.
+    - A failed run is logged and the next run starts at the next tick.
+    - SIGTERM or SIGINT stops the daemon once the current run is over, a second signal interrupts the run.
+    """
+
+    def __init__(self, run: Callable[[], None], interval: float, jitter: float = 0.1,
+                 clock=time.monotonic, rand=random.random):
+        """
+        Initialize the daemon.
+        Args:
+            run (callable): The sync run.
+            interval (float): Seconds between the starts of the runs.
+            jitter (float, optional): Maximum random delay of a run, as a fraction of the interval. Defaults to 0.1.
+            clock (callable, optional): Monotonic clock in seconds, replaceable in tests.
+            rand (callable, optional): Random number in [0, 1), replaceable in tests.
+        """
+        if interval <= 0:
+            raise Exception(f"Invalid daemon interval: {interval}, must be positive")
+        self.run = run
+        self.interval = interval
+        self.jitter = jitter
+        self.stop_event = threading.Event()
+        self.runs = 0
+        self._clock = clock
+        self._rand = rand
+
+    def stop(self, signum=None, frame=None):
+        """Stop the daemon once the current run is over, interrupt the run if already stopping."""
+        if self.stop_event.is_set():
+            raise KeyboardInterrupt
+        logger.info("Stopping after the current run")
+        self.stop_event.set()
+
+    def run_forever(self):
+        """Run the sync on every tick until stopped."""
+        handlers = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        logger.info(f"Syncing every {self.interval:g}s")
+        try:
+            tick = self._clock()
+            while not self.stop_event.is_set():
+                self._run_once()
+                if self.stop_event.is_set():
+                    break
+                now = self._clock()
+                tick = self._next_tick(tick, now)
+                self.stop_event.wait(tick - now + self._rand() * self.jitter * self.interval)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        logger.info(f"Stopped after {self.runs} run(s)")
+
+    def _run_once(self):
+        """Run the sync once, logging the error if it fails."""
+        start = self._clock()
+        try:
+            self.run()
+        except Exception as e:
+            logger.error(f"Sync run failed: {e}")
+        self.runs += 1
+        logger.verbose(f"Run {self.runs} took {self._clock() - start:.2f}s")
+
+    def _next_tick(self, tick: float, now: float) -> float:
+        """The first tick after the given one that is not yet past, skipping the ticks overrun."""
+        tick += self.interval
+        if tick <= now:
+            skipped = int((now - tick) // self.interval) + 1
+            logger.warning(f"Run overran the {self.interval:g}s interval, skipping {skipped} tick(s)")
+            tick += skipped * self.interval
+        return tick
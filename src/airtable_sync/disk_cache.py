@@ -0,0 +1,67 @@
+import json
+import os
+import time
+from .custom_logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+
+class DiskCache:
+    """
+    Persisted cache of values that rarely change between runs, e.g. the GitHub project ID.
+    Each value expires after the TTL, and can be invalidated explicitly when it turns out to be stale.
+    """
+
+    def __init__(self, path: str, ttl_hours: float, clock=time.time):
+        """
+        Initialize the cache.
+        Args:
+            path (str): Path of the cache file.
+            ttl_hours (float): Hours a value stays valid, 0 disables the cache.
+            clock (callable, optional): Clock returning the epoch time in seconds, replaceable in tests.
+        """
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self._clock = clock
+
+    def get(self, key: str):
+        """Get the value stored under the key, or None if it is missing or has expired."""
+        if not self.ttl:
+            return None
+        entry = self._read_file().get(key)
+        if not entry or self._clock() - entry.get('storedAt', 0) >= self.ttl:
+            return None
+        return entry.get('value')
+
+    def set(self, key: str, value):
+        """Store a JSON serializable value under the key, keeping the other entries."""
+        if not self.ttl:
+            return
+        entries = self._read_file()
+        entries[key] = {'value': value, 'storedAt': self._clock()}
+        self._write_file(entries)
+
+    def invalidate(self, key: str):
+        """Remove the value stored under the key, so that it is fetched again."""
+        entries = self._read_file()
+        if entries.pop(key, None) is not None:
+            self._write_file(entries)
+
+    def _read_file(self) -> dict:
+        """Read all the entries in the cache file."""
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache file {self.path}: {e}")
+            return {}
+
+    def _write_file(self, entries: dict):
+        """Write all the entries to the cache file."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(entries, file, indent=2)
+        os.replace(temp_path, self.path)
@@ -1,8 +1,14 @@
-from python_graphql_client import GraphqlClient
+import contextlib
+import threading
+import time
 from .config import GitHubConfig
 from .graphqlquery import GraphQLQuery
+from .rate_limit import RateLimitScheduler
+from .transport import GraphQLTransport, TransportStats
 from .issue import GitHubIssue
 from ..custom_logger import CustomLogger
+from ..disk_cache import DiskCache
+from ..pipeline import Prefetcher
 
 logger = CustomLogger(__name__)
 
@@ -10,12 +16,39 @@ logger = CustomLogger(__name__)
 class GitHubClient:
     """Client for interacting with a GitHub repository."""
 
-    def __init__(self, github_config: GitHubConfig):
-        """Initializes the GitHub client with the given configuration."""
+    def __init__(self, github_config: GitHubConfig, cache: DiskCache = None):
+        """
+        Initializes the GitHub client with the given configuration.
+        Args:
+            github_config (GitHubConfig): The GitHub configuration.
+            cache (DiskCache, optional): Cache of the project ID between runs, not cached if omitted.
+        """
         self.github_config = github_config
+        self._cache = cache
+        self._project_id_cached = False
         self._query = GraphQLQuery(github_config)
-        self._client = GraphqlClient(endpoint="https://api.github.com/graphql")
-        self.epic_issues = []
+        transport = GraphQLTransport(
+            endpoint="https://api.github.com/graphql",
+            headers=self._query.headers(),
+            pool_size=github_config.pool_size,
+            connect_timeout=github_config.connect_timeout,
+            read_timeout=github_config.read_timeout)
+        self._client = RateLimitScheduler(
+            transport,
+            reserve=github_config.rate_limit_reserve,
+            min_interval=github_config.min_request_interval)
+        self._issue_index = {}
+        self._issues_not_found = set()
+        self._streamed_latest_update = None
+
+    def reset(self):
+        """
+        Drop the issues loaded by the previous run, keeping the connections.
+        The project ID is fetched again by the next run, from the cache while it holds a valid one.
+        """
+        self._issue_index = {}
+        self._issues_not_found = set()
+        self._streamed_latest_update = None
 
     @property
     def config(self):
@@ -27,13 +60,76 @@ class GitHubClient:
         """GitHub GraphQL query."""
         return self._query
 
-    def fetch_project_id(self):
+    @property
+    def transport_stats(self) -> TransportStats:
+        """Request, connection and transfer counters of the GitHub transport."""
+        return self._client.stats
+
+    @property
+    def rate_limit(self) -> RateLimitScheduler:
+        """Scheduler tracking the GitHub rate limit budget of the run."""
+        return self._client
+
+    @property
+    def epic_issues(self) -> list[GitHubIssue]:
+        """List of epic issues loaded from the project."""
+        return [issue for issue in self._issue_index.values() if issue.is_epic]
+
+    @property
+    def latest_update(self) -> str:
+        """Latest `updatedAt` of the loaded or streamed issues and their project items, ISO 8601 string."""
+        return max(filter(None, [self._streamed_latest_update,
+                                 *(issue.updated_at for issue in self._issue_index.values())]),
+                   default=None)
+
+    def issue_numbers_updated_since(self, timestamp: str) -> list[int]:
+        """
+        Numbers of the loaded issues changed after the given time.
+        Args:
+            timestamp (str): ISO 8601 time, as returned by GitHub in `updatedAt`.
+        Returns:
+            list[int]: The numbers of the issues, or their project items, updated after the timestamp.
+        """
+        return [issue_number for issue_number, issue in self._issue_index.items()
+                if issue.updated_at and issue.updated_at > timestamp]
+
+    def has_issue(self, issue_number: int) -> bool:
+        """Check if an issue has already been loaded, either from the project or fetched individually."""
+        return issue_number in self._issue_index
+
+    def add_issue(self, issue: GitHubIssue) -> bool:
+        """
+        Add an issue to the issue index, keyed by its issue number.
+        Args:
+            issue (GitHubIssue): The issue to add.
+        Returns:
+            bool: True if the issue was added, False if an issue with the same number is already indexed.
+        """
+        issue_number = issue.issue_number
+        if issue_number is None:
+            return False
+        if issue_number in self._issue_index:
+            logger.debug(f"Duplicate issue {issue_number} ignored: {issue.url}")
+            return False
+        self._issue_index[issue_number] = issue
+        return True
+
+    def fetch_project_id(self, refresh: bool = False):
         """
         Fetch the project ID for the given project name.
         If the project name is found, it will be set to configuration, otherwise an exception is raised.
+        The ID is taken from the cache if it holds a valid one, unless `refresh` is set.
         """
-        response = self._client.execute(
-            query=self._query.project(), headers=self._query.headers())
+        cache_key = f"projectId:{self.github_config.repo_owner}/{self.github_config.repo_name}/{self.github_config.project_name}"
+        if refresh and self._cache:
+            self._cache.invalidate(cache_key)
+        project_id = self._cache.get(cache_key) if self._cache and not refresh else None
+        self._project_id_cached = project_id is not None
+        if project_id:
+            self.github_config.project_id = project_id
+            return
+
+        response = self._client.execute(query=self._query.project())
 
         if 'errors' in response:
             raise Exception(f"Error fetching project ID: {response['errors']}")
@@ -43,55 +139,189 @@ class GitHubClient:
             (p for p in projects if p['title'] == self.github_config.project_name), None)
         if project:
             self.github_config.project_id = project['id']
+            if self._cache:
+                self._cache.set(cache_key, project['id'])
             return
 
         raise Exception(
             f"Failed to fetch project ID for project: {self.github_config.project_name}")
 
-    def fetch_project_items(self):
-        """Fetch items from the GitHub project and their field values."""
-        after_cursor = None
-        has_next_page = True
+    def fetch_project_items(self, stop_event: threading.Event = None):
+        """
+        Fetch items from the GitHub project and their field values, and add the epics to the issue index.
+        With `prefetchPages` configured, the next page is requested in the background as soon as a page
+        arrives, so parsing the page overlaps with the request of the next one.
+        Args:
+            stop_event (threading.Event, optional): When set, paging stops before the next request.
+        """
         total_items = 0
-        page_size = 50
+        pages = 0
+        response_bytes = self.transport_stats.response_bytes
+        page_time, parse_time = 0.0, 0.0
+
+        def timed_pages(prefetch_stop_event: threading.Event = None):
+            """Project pages, accounting for the time spent on requesting each page."""
+            nonlocal page_time
+            page_iterator = self.iter_project_pages(stop_event=prefetch_stop_event or stop_event)
+            while not (stop_event and stop_event.is_set()):
+                start = time.perf_counter()
+                items = next(page_iterator, None)
+                page_time += time.perf_counter() - start
+                if items is None:
+                    return
+                yield items
 
         logger.verbose(
             f"Fetching issues for project: {self.github_config.project_name} ({self.github_config.project_id})")
+        start = time.perf_counter()
+        with (Prefetcher(timed_pages, maxsize=1, name='github_prefetch') if self.github_config.prefetch_pages
+              else contextlib.nullcontext(timed_pages())) as page_items:
+            for items in page_items:
+                parse_start = time.perf_counter()
+                total_items += self._handle_issues_data(items)
+                parse_time += time.perf_counter() - parse_start
+                pages += 1
+                if stop_event and stop_event.is_set():
+                    break
+        elapsed = time.perf_counter() - start
+        if stop_event and stop_event.is_set():
+            return
+
+        response_bytes = self.transport_stats.response_bytes - response_bytes
+        logger.verbose(
+            f"Found {len(self.epic_issues)} epic issues out of {total_items} items, "
+            f"{pages} page(s) of {response_bytes // max(pages, 1)} bytes on average")
+        # Parse time hidden behind the page requests, 0 when the pages are fetched and parsed in turn
+        hidden = max(0.0, min(parse_time, page_time + parse_time - elapsed))
+        logger.verbose(
+            f"Requested pages in {page_time:.2f}s and parsed them in {parse_time:.2f}s, "
+            f"took {elapsed:.2f}s in total, {hidden:.2f}s of parsing hidden by prefetching")
+        logger.debug(lambda: "\n".join(
+            f"{issue.issue_number} - {issue.title}" for issue in self.epic_issues))
+
+    def iter_project_pages(self, stop_event: threading.Event = None):
+        """
+        Fetch the GitHub project items page by page.
+        Args:
+            stop_event (threading.Event, optional): When set, paging stops before the next request.
+        Yields:
+            list: The item nodes of each page.
+        """
+        after_cursor = None
+        has_next_page = True
         while has_next_page:
+            if stop_event and stop_event.is_set():
+                logger.verbose("Fetching project items cancelled")
+                return
+            page_size = self._client.page_size(self.github_config.page_size)
             response = self._client.execute(
                 query=self._query.issues(
-                    page_size=page_size, after_cursor=after_cursor),
-                headers=self._query.headers())
+                    page_size=page_size, after_cursor=after_cursor))
+
+            if self._project_id_cached and not (response.get('data') or {}).get('node'):
+                # The cached project ID no longer resolves, e.g. the project was recreated
+                logger.warning(
+                    f"Cached project ID {self.github_config.project_id} not found, fetching it again")
+                self.fetch_project_id(refresh=True)
+                continue
 
             if 'errors' in response:
                 raise Exception(f"Error fetching items: {response['errors']}")
 
             response_items = response['data']['node']['items']
-            total_items += self._handle_issues_data(response_items['nodes'])
+            items = response_items['nodes']
+            self._client.record_page(len(items))
 
             page_info = response_items['pageInfo']
             has_next_page = page_info['hasNextPage']
             after_cursor = page_info['endCursor']
+            yield items
 
-        logger.verbose(
-            f"Found {len(self.epic_issues)} epic issues out of {total_items} items")
-        for issue in self.epic_issues:
-            logger.debug(f"{issue.issue_number} - {issue.title}")
+    def iter_project_issues(self, stop_event: threading.Event = None):
+        """
+        Fetch the epics in the GitHub project page by page, without adding them to the issue index,
+        so that the memory used doesn't grow with the project.
+        Args:
+            stop_event (threading.Event, optional): When set, paging stops before the next request.
+        Yields:
+            list[GitHubIssue]: The epics in each page.
+        """
+        for items in self.iter_project_pages(stop_event=stop_event):
+            issues = self._parse_issues(items)
+            self._streamed_latest_update = max(
+                filter(None, [self._streamed_latest_update, *(issue.updated_at for issue in issues)]),
+                default=None)
+            yield issues
 
     def fetch_issue(self, issue_number: int) -> GitHubIssue:
-        """Fetch the issue details from GitHub and return the issue object."""
+        """
+        Fetch the issue details from GitHub and return the issue object.
+        Returns None without a request for an issue already found missing, e.g. deleted or transferred.
+        """
         issue = self.get_issue(issue_number)
-        if issue:
+        if issue or self.issue_not_found(issue_number):
             return issue
 
         query = self.query.issue(issue_number)
-        response = self._client.execute(
-            query=query, headers=self.query.headers())
+        response = self._client.execute(query=query)
+        repository = (response.get('data') or {}).get('repository')
+        if repository and not repository.get('issue'):
+            # Reported with a NOT_FOUND error, e.g. deleted or transferred
+            logger.warning(f"Issue {issue_number} not found")
+            self._issues_not_found.add(issue_number)
+            return None
         if 'errors' in response:
             logger.error(f"Errors in response: {response}")
             raise Exception(f"Error fetching items: {response['errors']}")
 
-        item = response['data']['repository']['issue']
+        issue = self._load_issue(repository['issue'])
+        self.add_issue(issue)
+        return issue
+
+    def fetch_issues(self, issue_numbers: list[int]) -> int:
+        """
+        Fetch issues that are not yet loaded in bulk and add them to the issue index.
+        The issues are fetched with aliased multi-issue queries, `issue_batch_size` issues per request.
+        Args:
+            issue_numbers (list[int]): The numbers of the issues to fetch.
+        Returns:
+            int: The number of issues fetched and added to the index.
+        """
+        missing = list(dict.fromkeys(
+            n for n in issue_numbers if n is not None and not self.has_issue(n) and not self.issue_not_found(n)))
+        batch_size = max(1, self.github_config.issue_batch_size)
+        fetched = 0
+
+        if missing:
+            logger.verbose(
+                f"Fetching {len(missing)} issue(s) missing from the project in batches of {batch_size}")
+
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            response = self._client.execute(
+                query=self.query.issues_by_number(batch))
+
+            repository = (response.get('data') or {}).get('repository')
+            if not repository:
+                logger.error(f"Errors in response: {response}")
+                raise Exception(f"Error fetching issues: {response.get('errors')}")
+            if 'errors' in response:
+                # Partial result, e.g. some of the issues don't exist
+                logger.warning(f"Errors fetching issues: {response['errors']}")
+
+            for issue_number in batch:
+                item = repository.get(self.query.issue_alias(issue_number))
+                if not item:
+                    logger.warning(f"Issue {issue_number} not found")
+                    self._issues_not_found.add(issue_number)
+                    continue
+                fetched += self.add_issue(self._load_issue(item))
+
+        return fetched
+
+    @staticmethod
+    def _load_issue(item: dict) -> GitHubIssue:
+        """Create an issue from an issue node with its project items."""
         fields = item.get('projectItems', {}).get('nodes')
         first_issue_fields = (fields[0] if fields else {})
         issue = GitHubIssue(url=item.get('url'))
@@ -99,20 +329,31 @@ class GitHubClient:
         return issue
 
     def get_issue(self, issue_number: int) -> GitHubIssue:
-        """Get the issue details from loaded epic issue list."""
-        return next((issue for issue in self.epic_issues if issue.issue_number == issue_number), None)
+        """Get the issue details from the loaded issue index."""
+        return self._issue_index.get(issue_number)
+
+    def issue_not_found(self, issue_number: int) -> bool:
+        """Check if an issue was fetched and found missing, e.g. deleted or transferred, so not to query it again."""
+        return issue_number in self._issues_not_found
 
     def _handle_issues_data(self, items) -> int:
         """
         Extract and process issue data from the provided items.
-        Look for issues marked as epics and append them to the `epic_issues` list.
+        Look for issues marked as epics and add them to the issue index.
         Args:
             items (list): A list of dictionaries containing issue data.
         Returns:
             int: The number of items processed.
         """
+        for issue in self._parse_issues(items):
+            self.add_issue(issue)
 
-        epic_issues = []
+        return len(items)
+
+    @staticmethod
+    def _parse_issues(items) -> list[GitHubIssue]:
+        """Create the issues marked as epics from project item nodes."""
+        issues = []
         for item in items:
             content = item.get('content')
             if not content:
@@ -121,7 +362,5 @@ class GitHubClient:
             issue.load_fields(base_data=content, fields=item)
 
             if (issue.is_epic):
-                epic_issues.append(issue)
-
-        self.epic_issues.extend(epic_issues)
-        return len(items)
+                issues.append(issue)
+        return issues
@@ -16,6 +16,26 @@ class GitHubConfig:
     repo_name: str
     """Mapping of Airtable field names to GitHub issue field names"""
     field_map: dict
+    """Number of issues fetched per request when fetching issues missing from the project"""
+    issue_batch_size: int
+    """Maximum number of keep-alive connections to the GitHub API"""
+    pool_size: int
+    """Timeout in seconds for connecting to the GitHub API"""
+    connect_timeout: float
+    """Timeout in seconds for reading a response from the GitHub API"""
+    read_timeout: float
+    """Number of project items fetched per page, at most 100"""
+    page_size: int
+    """Rate limit points left untouched by the sync"""
+    rate_limit_reserve: int
+    """Minimum seconds between two requests to the GitHub API"""
+    min_request_interval: float
+    """Select only the mapped project fields and the issue type field by name, instead of the first field values"""
+    field_values_by_name: bool
+    """Exact name of the project field holding the issue type, e.g. 'Issue Type' or 'Issue type'"""
+    issue_type_field: str
+    """Request the next page of project items while the current page is parsed"""
+    prefetch_pages: bool
 
     def __init__(self, config_json: dict):
         # Define the names of the environment variables and configuration keys for the token
@@ -33,3 +53,13 @@ class GitHubConfig:
         self.repo_owner = config_json.get('owner')
         self.repo_name = config_json.get('repo')
         self.field_map = config_json.get('fieldMap', {})
+        self.issue_batch_size = config_json.get('issueBatchSize', 50)
+        self.pool_size = config_json.get('poolSize', 4)
+        self.connect_timeout = config_json.get('connectTimeout', 5)
+        self.read_timeout = config_json.get('readTimeout', 30)
+        self.page_size = min(config_json.get('pageSize', 100), 100)
+        self.rate_limit_reserve = config_json.get('rateLimitReserve', 100)
+        self.min_request_interval = config_json.get('minRequestInterval', 0)
+        self.field_values_by_name = config_json.get('fieldValuesByName', False)
+        self.issue_type_field = config_json.get('issueTypeField', 'Issue Type')
+        self.prefetch_pages = config_json.get('prefetchPages', False)
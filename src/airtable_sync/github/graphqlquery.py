@@ -1,10 +1,15 @@
 
+import json
 from .config import GitHubConfig
+from .issue import GitHubIssue
 
 
 class GraphQLQuery:
     """Class that constructs GraphQL queries for fetching data from a GitHub repository."""
 
+    """Selection of the rate limit budget, added to every query"""
+    RATE_LIMIT = "rateLimit { limit cost remaining resetAt }"
+
     def __init__(self, github_config: GitHubConfig):
         self.github_config = github_config
 
@@ -14,74 +19,40 @@ class GraphQLQuery:
         query {{
         repository(owner: "{self.github_config.repo_owner}", name: "{self.github_config.repo_name}") {{
             issue(number: {issue_number}) {{
-            title
-            body
-            assignees(first: 10) {{
-                nodes {{
-                    login
-                }}
-            }}
-            labels(first: 10) {{
-                nodes {{
-                    name
-                    color
-                }}
-            }}
-            projectItems(first: 1) {{
-                nodes {{
-                fieldValues(first: 10) {{
-                    nodes {{
-                    ... on ProjectV2ItemFieldSingleSelectValue {{
-                        name
-                        field {{
-                            ... on ProjectV2FieldCommon {{
-                                name
-                            }}
-                        }}
-                    }}
-                    ... on ProjectV2ItemFieldTextValue {{
-                        text
-                        field {{
-                            ... on ProjectV2FieldCommon {{
-                                name
-                            }}
-                        }}
-                    }}
-                    ... on ProjectV2ItemFieldDateValue {{
-                        date
-                        field {{
-                        ... on ProjectV2FieldCommon {{
-                            name
-                            }}
-                        }}
-                    }}
-                    ... on ProjectV2ItemFieldNumberValue {{
-                        number
-                        field {{
-                            ... on ProjectV2FieldCommon {{
-                                name
-                            }}
-                        }}
-                    }}
-                    ... on ProjectV2ItemFieldIterationValue {{
-                        duration
-                        startDate
-                        title
-                        field {{
-                        ... on ProjectV2FieldCommon {{
-                            name
-                        }}
-                        }}
-                    }}
-                    }}
-                }}
-                }}
-            }}
+            {self._issue_fields()}
             }}
         }}
+        {self.RATE_LIMIT}
         }}
         """
 
+    def issues_by_number(self, issue_numbers: list[int]) -> str:
+        """
+        GraphQL query to fetch multiple issues by number in a single request.
+        Each issue is selected under an alias, see `issue_alias`.
+        Args:
+            issue_numbers (list[int]): The numbers of the issues to fetch.
+        Returns:
+            str: The constructed GraphQL query string.
+        """
+        issues = "\n".join(f"""
+            {self.issue_alias(issue_number)}: issue(number: {issue_number}) {{
+            {self._issue_fields()}
+            }}""" for issue_number in issue_numbers)
+        return f"""
+        query {{
+        repository(owner: "{self.github_config.repo_owner}", name: "{self.github_config.repo_name}") {{
+            {issues}
+        }}
+        {self.RATE_LIMIT}
+        }}
+        """
+
+    @staticmethod
+    def issue_alias(issue_number: int) -> str:
+        """Alias of an issue in the multi-issue query, GraphQL aliases can't start with a digit."""
+        return f"issue_{issue_number}"
+
     def issues(self, after_cursor: int, page_size: int = 20) -> str:
         """
         GraphQL query to fetch issues with projectV2 fields from a GitHub project.
@@ -99,73 +70,11 @@ class GraphQLQuery:
             items(first: {page_size}, after: "{after_cursor}") {{
                 nodes {{
                 id
-                fieldValues(first: 20) {{
-                    nodes {{
-                    ... on ProjectV2ItemFieldTextValue {{
-                        text
-                        field {{
-                        ... on ProjectV2FieldCommon {{
-                            name
-                        }}
-                        }}
-                    }}
-                    ... on ProjectV2ItemFieldDateValue {{
-                        date
-                        field {{
-                        ... on ProjectV2FieldCommon {{
-                            name
-                        }}
-                        }}
-                    }}
-                    ... on ProjectV2ItemFieldSingleSelectValue {{
-                        name
-                        field {{
-                        ... on ProjectV2FieldCommon {{
-                            name
-                        }}
-                        }}
-                    }}
-                    ... on ProjectV2ItemFieldNumberValue {{
-                        number
-                        field {{
-                        ... on ProjectV2FieldCommon {{
-                            name
-                        }}
-                        }}
-                    }}
-                    ... on ProjectV2ItemFieldIterationValue {{
-                        duration
-                        startDate
-                        title
-                        field {{
-                        ... on ProjectV2FieldCommon {{
-                            name
-                        }}
-                        }}
-                    }}
-                    }}
-                }}
+                updatedAt
+                {self._field_values(20)}
                 content {{
-                    ... on Closable {{
-                        closed
-                        closedAt
-                    }}
                     ... on Issue {{
-                    title
-                    url
-                    state
-                    body
-                    assignees(first: 10) {{
-                        nodes {{
-                        login
-                        }}
-                    }}
-                    labels(first: 10) {{
-                        nodes {{
-                            name
-                            color
-                        }}
-                    }}
+                    {self._issue_content_fields()}
                     }}
                 }}
                 }}
@@ -176,9 +85,103 @@ class GraphQLQuery:
             }}
             }}
         }}
+        {self.RATE_LIMIT}
         }}
         """
 
+    def _issue_fields(self) -> str:
+        """Selection of the issue fields and projectV2 field values, shared by the issue queries."""
+        return f"""
+            {self._issue_content_fields()}
+            projectItems(first: 1) {{
+                nodes {{
+                updatedAt
+                {self._field_values(10)}
+                }}
+            }}"""
+
+    def _issue_content_fields(self) -> str:
+        """
+        Selection of the issue's own fields, projected from the field map.
+        Only the fields used by the sync are requested, plus the issue fields named in the field map,
+        so large text fields such as the body are left out unless they are mapped.
+        """
+        mapped = {GitHubIssue._map_field_name(name) for name in self.github_config.field_map}
+        selections = ['title', 'url', 'updatedAt'] + [
+            selection for name, selection in GitHubIssue.ISSUE_FIELDS.items() if name in mapped]
+        return "\n".join(selections)
+
+    def _field_values(self, first: int) -> str:
+        """
+        Selection of the projectV2 item field values.
+        By default the first field values of the item are selected. With `fieldValuesByName` configured,
+        only the issue type field and the fields in the field map are selected, each under an alias,
+        which avoids both the unused fields and the truncation of projects with more fields than `first`.
+        """
+        if self.github_config.field_values_by_name:
+            names = dict.fromkeys(
+                [self.github_config.issue_type_field, *self.github_config.field_map])
+            return "\n".join(
+                f"""{GitHubIssue.FIELD_VALUE_ALIAS_PREFIX}{index}: fieldValueByName(name: {json.dumps(name)}) {{
+                    {self._field_value_fragments()}
+                }}""" for index, name in enumerate(names))
+
+        return f"""fieldValues(first: {first}) {{
+                    nodes {{
+                    {self._field_value_fragments()}
+                    }}
+                }}"""
+
+    @staticmethod
+    def _field_value_fragments() -> str:
+        """
+        Fragments selecting the value and field name of all supported projectV2 field types.
+        The `__typename` of each value selects its decoder, see `GitHubIssue._handle_field_values`.
+        """
+        return """__typename
+                    ... on ProjectV2ItemFieldTextValue {
+                        text
+                        field {
+                        ... on ProjectV2FieldCommon {
+                            name
+                        }
+                        }
+                    }
+                    ... on ProjectV2ItemFieldDateValue {
+                        date
+                        field {
+                        ... on ProjectV2FieldCommon {
+                            name
+                        }
+                        }
+                    }
+                    ... on ProjectV2ItemFieldSingleSelectValue {
+                        name
+                        field {
+                        ... on ProjectV2FieldCommon {
+                            name
+                        }
+                        }
+                    }
+                    ... on ProjectV2ItemFieldNumberValue {
+                        number
+                        field {
+                        ... on ProjectV2FieldCommon {
+                            name
+                        }
+                        }
+                    }
+                    ... on ProjectV2ItemFieldIterationValue {
+                        duration
+                        startDate
+                        title
+                        field {
+                        ... on ProjectV2FieldCommon {
+                            name
+                        }
+                        }
+                    }"""
+
     def project(self) -> str:
         """GraphQL query to fetch all projects from a GitHub repository."""
         return f"""
@@ -191,6 +194,7 @@ class GraphQLQuery:
             }}
             }}
         }}
+        {self.RATE_LIMIT}
         }}
         """
 
@@ -1,34 +1,88 @@
 from datetime import datetime
-from enum import Enum
 import re
+import sys
 from ..custom_logger import CustomLogger
 
 logger = CustomLogger(__name__)
 
 
-class FieldType(Enum):
-    """Enumeration of projectV2 field types."""
-    Text = "TEXT"
-    Number = "NUMBER"
-    Date = "DATE"
-    SingleSelect = "SINGLE_SELECT"
-    Iteration = "ITERATION"
-
-
 class GitHubIssue:
-    """Class to represent an issue in GitHub."""
+    """
+    Class to represent an issue in GitHub.
+    Slotted, as a sync holds one per project item: the issue number is parsed once when the URL is set.
+    """
+    __slots__ = ('_url', '_issue_number', 'title', 'body', 'fields', 'updated_at')
+
+    """Issue fields that can be mapped besides the projectV2 fields, mapped field name to GraphQL field."""
+    ISSUE_FIELDS = {
+        'body': 'body',
+        'state': 'state',
+        'closed': 'closed',
+        'closed_at': 'closedAt',
+    }
+
+    """Prefix of the aliased field values, when fields are selected by name instead of as a list."""
+    FIELD_VALUE_ALIAS_PREFIX = 'fieldValue_'
+
+    """Decoders of the projectV2 field values by GraphQL type name"""
+    _FIELD_VALUE_DECODERS = {
+        'ProjectV2ItemFieldTextValue': lambda value: value['text'],
+        'ProjectV2ItemFieldNumberValue': lambda value: float(value['number']),
+        'ProjectV2ItemFieldDateValue': lambda value: GitHubIssue._parse_date(value['date']),
+        'ProjectV2ItemFieldSingleSelectValue': lambda value: GitHubIssue._intern(value['name']),
+        'ProjectV2ItemFieldIterationValue':
+            lambda value: f"{value['title']}({value['startDate']} - {value['duration']})",
+    }
+
+    """Normalised field names by project field name"""
+    _field_names = {}
+
+    """Parsed dates by date string, the dates repeat across the items"""
+    _dates = {}
+
+    """Type names of the unsupported field values already warned about, to warn once per type"""
+    _unsupported_typenames = set()
+
+    """Pattern of the issue number in the issue URL"""
+    _ISSUE_NUMBER_PATTERN = re.compile(r'/issues/(\d+)')
 
     def __init__(self, url: str):
         self.url = url
+        self.title = None
+        self.body = None
         self.fields = {}
+        self.updated_at = None
+
+    @property
+    def url(self) -> str:
+        """URL of the issue."""
+        return self._url
+
+    @url.setter
+    def url(self, url: str):
+        self._url = url
+        match = self._ISSUE_NUMBER_PATTERN.search(url) if url else None
+        self._issue_number = int(match.group(1)) if match else None
 
     def load_fields(self, base_data: dict, fields: dict):
         """Load the issue fields from the data."""
-        fields = fields.get('fieldValues').get('nodes')
+        if 'fieldValues' in fields:
+            field_values = fields['fieldValues'].get('nodes', [])
+        else:
+            # Aliased field values, null if the field has no value for the item
+            field_values = [value for key, value in fields.items()
+                            if key.startswith(GitHubIssue.FIELD_VALUE_ALIAS_PREFIX) and value]
         self.url = base_data.get('url', self.url)
         self.title = base_data.get('title')
         self.body = base_data.get('body')
-        self._handle_field_values(fields)
+        # Latest change of either the issue itself or its project item field values
+        self.updated_at = max(
+            filter(None, [base_data.get('updatedAt'), fields.get('updatedAt')]), default=None)
+        self._handle_field_values(field_values)
+        # Issue fields are only in the data if the field map requested them
+        for name, key in GitHubIssue.ISSUE_FIELDS.items():
+            if key in base_data and name not in self.fields:
+                self.fields[name] = base_data[key]
 
     def __str__(self):
         """
@@ -41,16 +95,7 @@ class GitHubIssue:
         body = (body if body else "").strip()
         body = body.splitlines()[0] if body else ""
         body = body[:50] if body else ""
-        lines = []
-
-        for attr in self.__dict__:
-            if attr in ['url', 'title', 'body']:
-                val = self.__dict__[attr]
-                if attr == 'body':
-                    val = body
-
-                lines.append(f"{attr}: {val}")
-
+        lines = [f"url: {self.url}", f"title: {self.title}", f"body: {body}"]
         lines.extend([f"{name}: {value}" for name,
                      value in self.fields.items()])
 
@@ -59,79 +104,62 @@ class GitHubIssue:
 
     @property
     def is_epic(self) -> bool:
-        """
-        If the issue is an epic type.
-        Ignore irrelevant text such as emojis for easier comparison
-        remove non-alphanum chars and leading/trailing spaces
-        e.g. "🚀 Epic" -> "Epic"
-        """
-        issue_type = self.fields.get('issue_type', '')
-        issue_type = re.sub(r'[^a-zA-Z0-9 ]', '', issue_type).strip()
+        """If the issue is an epic type, the issue type value compared as is."""
         return self.fields.get('issue_type') == 'Epic'
 
     def _handle_field_values(self, field_values: dict):
-        """Handle the field values and add them to the issue."""
+        """
+        Decode the field values and add them to the issue, in a single pass.
+        Each value is decoded by its GraphQL `__typename`, a value with a missing or unknown type name is
+        unsupported and left empty.
+        """
         for field_value in field_values:
-            field = field_value.get('field', {})
-            field_name = field.get('name')
-            field_type = None
+            field_name = field_value.get('field', {}).get('name')
             if not field_name:
                 continue
-            if 'text' in field_value:
-                field_type = FieldType.Text
-                value = field_value['text']
-            elif 'duration' in field_value and 'startDate' in field_value and 'title' in field_value:
-                field_type = FieldType.Iteration
-                value = f"{field_value['title']}({field_value['startDate']} - {field_value['duration']})"
-            elif 'number' in field_value:
-                field_type = FieldType.Number
-                value = float(field_value['number'])
-            elif 'date' in field_value:
-                field_type = FieldType.Date
-                value = field_value['date']
-            elif 'name' in field_value:
-                field_type = FieldType.SingleSelect
-                value = field_value['name']
+            typename = field_value.get('__typename')
+            decode = GitHubIssue._FIELD_VALUE_DECODERS.get(typename)
+            if decode:
+                value = decode(field_value)
             else:
-                logger.warning(f"unknown field type: {field_value}")
+                if typename not in GitHubIssue._unsupported_typenames:
+                    GitHubIssue._unsupported_typenames.add(typename)
+                    logger.warning(f"unsupported field value type {typename} of field {field_name}, left empty")
                 value = None
 
-            self._add_field(field_name, value, field_type)
+            name = GitHubIssue._map_field_name(field_name)
+            if name in ["title", "url"]:
+                setattr(self, name, value)
+            else:
+                self.fields[name] = value
+
+    @staticmethod
+    def _intern(value: str) -> str:
+        """Share one string per single select value, as the values repeat across the items."""
+        return sys.intern(value) if value else value
 
     @staticmethod
     def _parse_date(date_str):
-        """Parses the date string and returns a datetime object."""
+        """Parses the date string and returns a datetime object, parsed once per date string."""
+        if date_str in GitHubIssue._dates:
+            return GitHubIssue._dates[date_str]
         try:
-            return datetime.strptime(date_str, '%Y-%m-%d')
+            date = datetime.strptime(date_str, '%Y-%m-%d')
         except ValueError:
-            return None
+            date = None
+        GitHubIssue._dates[date_str] = date
+        return date
 
     @staticmethod
     def _map_field_name(field_name):
-        """Maps the field name to an attribute name."""
-        return field_name.lower().replace(" ", "_").replace("-", "_")
-
-    @staticmethod
-    def _map_field_value(field_type, value):
-        """Maps the field value to a standard value."""
-        if field_type == FieldType.Date:
-            return GitHubIssue._parse_date(value)
-
-        return value
-
-    def _add_field(self, field_name, value, field_type):
-        """ Add field to the issue """
-        name = GitHubIssue._map_field_name(field_name)
-        if name in ["title", "url"]:
-            self.__dict__[name] = value
-            return
-        value = GitHubIssue._map_field_value(field_type, value)
-        self.fields[name] = value
+        """Maps the field name to an attribute name, normalised once per project field name."""
+        name = GitHubIssue._field_names.get(field_name)
+        if name is None:
+            name = GitHubIssue._field_names[field_name] = sys.intern(
+                field_name.lower().replace(" ", "_").replace("-", "_"))
+        return name
 
     @property
     def issue_number(self):
-        """Extracts the issue number from the URL."""
-        if self.url:
-            match = re.search(r'/issues/(\d+)', self.url)
-            if match:
-                return int(match.group(1))
+        """The issue number in the URL, None if the URL is not an issue URL."""
+        return self._issue_number
@@ -0,0 +1,176 @@
+import math
+import time
+from datetime import datetime
+import requests
+from .transport import GraphQLTransport, TransportStats
+from ..custom_logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+
+class RateLimitScheduler:
+    """
+    Request scheduler on top of the GraphQL transport that keeps within GitHub's point budget.
+    Every query selects the `rateLimit` object, from which the scheduler tracks the budget across the run:
+    it paces the requests when the budget runs low, waits for the reset rather than exhausting it,
+    retries on secondary rate limits, and picks page sizes that the remaining budget can afford.
+    """
+
+    """Fraction of the budget below which requests are spread evenly until the reset"""
+    PACING_THRESHOLD = 0.1
+    """Smallest page size picked when the budget is low"""
+    MIN_PAGE_SIZE = 10
+    """Number of retries on secondary rate limits"""
+    MAX_RETRIES = 3
+
+    def __init__(self, transport: GraphQLTransport, reserve: int = 100, min_interval: float = 0.0,
+                 sleep=time.sleep, clock=time.time):
+        """
+        Initialize the scheduler.
+        Args:
+            transport (GraphQLTransport): The transport sending the requests.
+            reserve (int, optional): Points left untouched, e.g. for other tools sharing the token. Defaults to 100.
+            min_interval (float, optional): Minimum seconds between two requests. Defaults to 0.
+            sleep (callable, optional): Sleep function, replaceable in tests.
+            clock (callable, optional): Clock returning the epoch time in seconds, replaceable in tests.
+        """
+        self.transport = transport
+        self.reserve = reserve
+        self.min_interval = min_interval
+        self._sleep = sleep
+        self._clock = clock
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.last_cost = None
+        self.used = 0
+        self.requests = 0
+        self.waited = 0.0
+        self._cost_per_item = None
+        self._last_request_at = None
+
+    @property
+    def stats(self) -> TransportStats:
+        """Request, connection and transfer counters of the underlying transport."""
+        return self.transport.stats
+
+    def counters(self) -> tuple:
+        """The points used, requests sent and seconds waited so far, to tell those of one run by difference."""
+        return self.used, self.requests, self.waited
+
+    def summary(self, since: tuple = None) -> str:
+        """
+        Summary of the budget spent and what is left.
+        Args:
+            since (tuple, optional): Counters taken earlier, to only count what was spent after. Everything if omitted.
+        """
+        used, requests, waited = (now - start for now, start in zip(self.counters(), since or (0, 0, 0.0)))
+        if self.remaining is None:
+            return f"{requests} request(s), budget unknown"
+        reset_at = datetime.fromtimestamp(self.reset_at).isoformat(timespec='seconds')
+        return (f"{used} point(s) used by {requests} request(s), "
+                f"{self.remaining}/{self.limit} left, resets at {reset_at}, waited {waited:.1f}s")
+
+    def __str__(self):
+        """Summary of the budget spent by the client and what is left."""
+        return self.summary()
+
+    def execute(self, query: str, variables: dict = None) -> dict:
+        """
+        Send a query once the budget and pacing allow it, and track the budget from the response.
+        Args:
+            query (str): The GraphQL query, selecting `rateLimit`.
+            variables (dict, optional): The query variables.
+        Returns:
+            dict: The JSON response.
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._wait_for_budget()
+            self._pace()
+            self._last_request_at = self._clock()
+            try:
+                response = self.transport.execute(query, variables)
+            except requests.HTTPError as e:
+                delay = self._secondary_limit_delay(e.response)
+                if delay is None or attempt == self.MAX_RETRIES:
+                    raise
+                logger.warning(f"GitHub secondary rate limit hit, retrying in {delay:.0f}s")
+                self._wait(delay)
+                continue
+            self.requests += 1
+            self._update(response)
+            return response
+
+    def page_size(self, preferred: int) -> int:
+        """
+        Largest page size up to `preferred` that the remaining budget can afford.
+        Larger pages cost fewer points per item and fewer round-trips, so the preferred (maximum)
+        size is used unless the estimated cost of a page would dig into the reserve.
+        """
+        if self.remaining is None or not self._cost_per_item:
+            return preferred
+        affordable = math.floor((self.remaining - self.reserve) / self._cost_per_item)
+        return max(self.MIN_PAGE_SIZE, min(preferred, affordable))
+
+    def record_page(self, items: int):
+        """Record the number of items in the last page, to estimate the cost per item of the next page."""
+        if self.last_cost is not None and items:
+            self._cost_per_item = self.last_cost / items
+
+    def _update(self, response: dict):
+        """Update the budget from the `rateLimit` object in the response."""
+        rate_limit = (response.get('data') or {}).get('rateLimit')
+        if not rate_limit:
+            return
+        self.limit = rate_limit.get('limit')
+        self.remaining = rate_limit.get('remaining')
+        self.last_cost = rate_limit.get('cost', 0)
+        self.used += self.last_cost
+        self.reset_at = datetime.fromisoformat(
+            rate_limit['resetAt'].replace('Z', '+00:00')).timestamp()
+        logger.verbose(
+            f"GitHub rate limit: cost {self.last_cost}, {self.remaining}/{self.limit} points left, "
+            f"resets at {rate_limit['resetAt']}")
+
+    def _wait_for_budget(self):
+        """Wait for the reset if the next request would dig into the reserve."""
+        if self.remaining is None or self.remaining - (self.last_cost or 1) >= self.reserve:
+            return
+        delay = self.reset_at - self._clock()
+        if delay > 0:
+            logger.warning(
+                f"GitHub rate limit budget low ({self.remaining} points left), waiting {delay:.0f}s for the reset")
+            self._wait(delay)
+        self.remaining = None
+
+    def _pace(self):
+        """
+        Keep a minimum interval between requests, spreading the requests evenly until the reset
+        once the budget falls below the pacing threshold.
+        """
+        if self._last_request_at is None:
+            return
+        interval = self.min_interval
+        if self.remaining is not None and self.limit and self.remaining < self.limit * self.PACING_THRESHOLD:
+            requests_left = max(1, (self.remaining - self.reserve) // max(self.last_cost or 1, 1))
+            interval = max(interval, (self.reset_at - self._clock()) / requests_left)
+        delay = self._last_request_at + interval - self._clock()
+        if delay > 0:
+            self._wait(delay)
+
+    def _secondary_limit_delay(self, response) -> float:
+        """Seconds to wait before retrying a request rejected by a secondary rate limit, None if not rate limited."""
+        if response is None or response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            return float(retry_after)
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            reset = response.headers.get('X-RateLimit-Reset')
+            return max(0.0, float(reset) - self._clock()) if reset else 60.0
+        return None
+
+    def _wait(self, delay: float):
+        """Sleep and account for the time waited."""
+        self.waited += delay
+        self._sleep(delay)
@@ -0,0 +1,129 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPSConnectionPool
+
+
+class TransportStats:
+    """Counters of the requests sent and the connections opened by a transport."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.connect_time = 0.0
+        self.response_bytes = 0
+        self.wire_bytes = 0
+        self._lock = threading.Lock()
+
+    def add_connection(self, connect_time: float):
+        """Record a new connection and the time spent on connecting, including the TLS handshake."""
+        with self._lock:
+            self.connections += 1
+            self.connect_time += connect_time
+
+    def add_request(self, response_bytes: int, wire_bytes: int):
+        """Record a request with its decoded response size and the (compressed) size read from the wire."""
+        with self._lock:
+            self.requests += 1
+            self.response_bytes += response_bytes
+            self.wire_bytes += wire_bytes
+
+    def counters(self) -> tuple:
+        """The counters so far, to summarize a part of them, e.g. one run of a daemon, by difference."""
+        with self._lock:
+            return self.requests, self.connections, self.connect_time, self.response_bytes, self.wire_bytes
+
+    def summary(self, since: tuple = None) -> str:
+        """
+        Summary of the requests, connections and bytes transferred.
+        Args:
+            since (tuple, optional): Counters taken earlier, to only summarize what came after. Everything if omitted.
+        """
+        requests, connections, connect_time, response_bytes, wire_bytes = (
+            now - start for now, start in zip(self.counters(), since or (0, 0, 0.0, 0, 0)))
+        average = connect_time / connections if connections else 0
+        return (f"{requests} request(s) over {connections} connection(s), "
+                f"connect+TLS {connect_time * 1000:.0f}ms total ({average * 1000:.0f}ms avg), "
+                f"{wire_bytes} bytes received for {response_bytes} bytes of response")
+
+    def __str__(self):
+        """Summary of the requests, connections and bytes transferred."""
+        return self.summary()
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """HTTP adapter whose HTTPS connections report their connect time to the transport stats."""
+
+    def __init__(self, stats: TransportStats, **kwargs):
+        # Set before the base class initializes the pool manager
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self._stats
+
+        class TimedHTTPSConnection(HTTPSConnection):
+            def connect(self):
+                start = time.perf_counter()
+                super().connect()
+                stats.add_connection(time.perf_counter() - start)
+
+        class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = TimedHTTPSConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            **self.poolmanager.pool_classes_by_scheme, 'https': TimedHTTPSConnectionPool}
+
+
+class GraphQLTransport:
+    """
+    Keep-alive HTTP transport for GraphQL requests.
+    A single pooled session is shared by all the queries in a run, so the TLS handshake is paid
+    once per pooled connection instead of once per request, and responses are gzip compressed.
+    """
+
+    def __init__(self, endpoint: str, headers: dict, pool_size: int = 4,
+                 connect_timeout: float = 5, read_timeout: float = 30):
+        """
+        Initialize the transport.
+        Args:
+            endpoint (str): The GraphQL endpoint URL.
+            headers (dict): Headers sent with every request, e.g. the authorization header.
+            pool_size (int, optional): Maximum number of connections kept alive. Defaults to 4.
+            connect_timeout (float, optional): Connect timeout in seconds. Defaults to 5.
+            read_timeout (float, optional): Read timeout in seconds. Defaults to 30.
+        """
+        self.endpoint = endpoint
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats = TransportStats()
+        self.session = requests.Session()
+        self.session.headers.update({**headers, 'Accept-Encoding': 'gzip, deflate'})
+        self.session.mount('https://', _TimedHTTPAdapter(
+            self.stats, pool_connections=1, pool_maxsize=pool_size))
+
+    def execute(self, query: str, variables: dict = None) -> dict:
+        """
+        Send a GraphQL query and return the decoded JSON response.
+        Args:
+            query (str): The GraphQL query.
+            variables (dict, optional): The query variables.
+        Returns:
+            dict: The JSON response, including `data` and/or `errors`.
+        Raises:
+            requests.HTTPError: If the response status is an HTTP error.
+        """
+        body = {'query': query}
+        if variables:
+            body['variables'] = variables
+
+        response = self.session.post(self.endpoint, json=body, timeout=self.timeout)
+        self.stats.add_request(len(response.content), response.raw.tell())
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
@@ -5,12 +5,25 @@ from .custom_logger import CustomLogger
 from .github.config import GitHubConfig
 from .airtable.config import AirtableConfig
 from .airtable_sync import AirtableSync
+from .daemon import SyncDaemon
+from .sync_config import SyncConfig
 
 logger = CustomLogger(__name__)
 
+"""Seconds between the syncs in daemon mode, unless given with --interval"""
+DEFAULT_INTERVAL = 3600
+
+"""Hours the daemon reuses the project ID and the table schema for, unless configured otherwise"""
+DAEMON_CACHE_TTL_HOURS = 24
+
 
 def parse_arguments():
-    """Parse the command line arguments."""
+    """
+    Parse the command line arguments.
+    Returns:
+        tuple: The logging level, whether to log asynchronously, and the seconds between the runs in
+               daemon mode, None to run once.
+    """
     # Set up argument parser
     parser = argparse.ArgumentParser(
         description="A script that logs at different levels.")
@@ -25,6 +38,12 @@ def parse_arguments():
                        help="Set logging level to INFO")
     group.add_argument('-w', '--warning', action='store_true',
                        help="Set logging level to WARNING")
+    parser.add_argument('--async-log', action='store_true',
+                        help="Write the log output from a background thread")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Keep running and sync every --interval seconds")
+    parser.add_argument('--interval', type=float,
+                        help=f"Seconds between the syncs in daemon mode (default {DEFAULT_INTERVAL})")
 
     # Parse the arguments
     args = parser.parse_args()
@@ -35,7 +54,13 @@ def parse_arguments():
         'error'  # Default to ERROR
     )
 
-    return log_level
+    interval = getattr(args, 'interval', None)
+    if not getattr(args, 'daemon', False):
+        if interval is not None:
+            parser.error("--interval requires --daemon")
+    elif interval is None:
+        interval = DEFAULT_INTERVAL
+    return log_level, getattr(args, 'async_log', False), interval
 
 
 def get_config_file_path() -> str:
@@ -64,21 +89,39 @@ def get_config_file_path() -> str:
 
 
 def main():
-    log_level = parse_arguments()
-    CustomLogger.setup_logging(log_level)
+    log_level, async_log, interval = parse_arguments()
+    CustomLogger.setup_logging(log_level, queued=async_log)
 
     try:
         with open(get_config_file_path()) as config_file:
             config_json = json.load(config_file)
             airtable_config = AirtableConfig(config_json.get('airtable'))
             github_config = GitHubConfig(config_json.get('github'))
+            sync_config = SyncConfig(config_json.get('sync'))
     except Exception as e:
         logger.error(f"Error reading configuration file: {e}")
         return
 
+    if interval is not None:
+        sync_json = config_json.get('sync') or {}
+        if 'incremental' not in sync_json:
+            # Only the changes since the previous run are synced on each tick, unless configured otherwise
+            sync_config.incremental = True
+        if 'cacheTtlHours' not in sync_json:
+            # The ticks reuse the project ID and the table schema until they expire, unless configured otherwise
+            sync_config.cache_ttl = DAEMON_CACHE_TTL_HOURS
+        elif not sync_config.cache_ttl:
+            logger.warning("The cache is disabled (cacheTtlHours is 0), "
+                           "every run looks up the project and fetches the table schema again")
+
     # Initialize the AirtableSync class and read records
-    airtable_sync = AirtableSync(airtable_config, github_config)
-    airtable_sync.sync()
+    airtable_sync = AirtableSync(airtable_config, github_config, sync_config)
+    if interval is None:
+        airtable_sync.sync()
+        return
+
+    # The same AirtableSync, with its clients and caches, is reused by every run
+    SyncDaemon(airtable_sync.sync, interval).run_forever()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+import queue
+import threading
+from typing import Callable, Iterable
+
+
+class Prefetcher:
+    """
+    Runs a generator in a background thread, producing up to `maxsize` items ahead of the consumer.
+    The bounded queue applies backpressure: the producer waits while the consumer is `maxsize` items behind.
+    An exception raised by the producer is re-raised in the consumer, and when the consumer leaves the
+    context early the producer is stopped before producing its next item.
+    Usage:
+        with Prefetcher(client.iter_pages) as pages:
+            for page in pages:
+                ...
+    """
+
+    """Marker of the end of the items produced"""
+    _DONE = object()
+
+    def __init__(self, source: Callable[[threading.Event], Iterable], maxsize: int = 1, name: str = 'prefetch'):
+        """
+        Initialize the prefetcher, the producer starts when entering the context.
+        Args:
+            source (callable): Called with a stop event, returns the iterable to consume in the background.
+                               The iterable should stop when the event is set, e.g. before its next request.
+            maxsize (int, optional): Number of items buffered ahead of the consumer. Defaults to 1.
+            name (str, optional): Name of the producer thread.
+        """
+        self.source = source
+        self.stop_event = threading.Event()
+        self._buffer = queue.Queue(maxsize=maxsize)
+        self._producer = threading.Thread(target=self._produce, name=name, daemon=True)
+
+    def __enter__(self):
+        self._producer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self._producer.join()
+
+    def __iter__(self):
+        """Yield the items of the iterable in order, waiting for each one to be produced."""
+        while True:
+            item, error = self._buffer.get()
+            if item is self._DONE:
+                if error:
+                    raise error
+                return
+            yield item
+
+    def _produce(self):
+        """Consume the source iterable into the buffer, ending with the done marker and the error if any."""
+        try:
+            for item in self.source(self.stop_event):
+                if not self._put((item, None)):
+                    return
+        except BaseException as e:
+            self._put((self._DONE, e))
+            return
+        self._put((self._DONE, None))
+
+    def _put(self, entry: tuple) -> bool:
+        """Put an entry in the buffer, waiting for room unless stopped. Returns False if stopped."""
+        while not self.stop_event.is_set():
+            try:
+                self._buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import sqlite3
+from .custom_logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+
+class SnapshotStore:
+    """
+    SQLite store of the state left by the last sync of each record, used to skip unchanged records.
+    For each issue number it keeps a hash of the mapped GitHub field values and a hash of the
+    Airtable values after the sync. A record whose hashes both match has not changed on either side
+    since, so comparing its fields would find nothing to update.
+    The snapshots of several syncs (e.g. different repos or tables) can share one file, each under its own key.
+    """
+
+    def __init__(self, path: str, key: str, field_map: dict):
+        """
+        Initialize the store, creating the database if needed.
+        Args:
+            path (str): Path of the SQLite database file.
+            key (str): Key of this sync in the database.
+            field_map (dict): Map of the GitHub fields to the Airtable fields synced.
+                              The snapshots are rebuilt if the field map changes, as their hashes no longer apply.
+        """
+        self.path = path
+        self.key = key
+        self.field_map = field_map
+        self._connection = None
+        self._pending = []
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection to the database, opened and checked on first use."""
+        if self._connection is None:
+            self._connection = self._open()
+        return self._connection
+
+    def _open(self) -> sqlite3.Connection:
+        """Open the database, starting from an empty one if the file is unreadable."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        try:
+            connection = self._connect()
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"Rebuilding unreadable snapshot store {self.path}: {e}")
+            os.remove(self.path)
+            connection = self._connect()
+
+        field_map_hash = self.hash_values(self.field_map)
+        row = connection.execute(
+            "SELECT field_map_hash FROM sync_keys WHERE sync_key = ?", (self.key,)).fetchone()
+        if row and row[0] != field_map_hash:
+            logger.verbose("Field map changed, rebuilding the snapshot store")
+            self._delete_snapshots(connection)
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sync_keys (sync_key, field_map_hash) VALUES (?, ?)",
+                (self.key, field_map_hash))
+        return connection
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connect to the database and create the tables if they don't exist."""
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS sync_keys ("
+                    "sync_key TEXT PRIMARY KEY, field_map_hash TEXT NOT NULL)")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS snapshots ("
+                    "sync_key TEXT NOT NULL, issue_number INTEGER NOT NULL, "
+                    "github_hash TEXT NOT NULL, airtable_hash TEXT NOT NULL, "
+                    "PRIMARY KEY (sync_key, issue_number))")
+        except sqlite3.DatabaseError:
+            connection.close()
+            raise
+        return connection
+
+    def load(self) -> dict:
+        """
+        Load the snapshots of this sync.
+        Returns:
+            dict: The GitHub and Airtable hashes by issue number.
+        """
+        rows = self.connection.execute(
+            "SELECT issue_number, github_hash, airtable_hash FROM snapshots WHERE sync_key = ?", (self.key,))
+        return {issue_number: (github_hash, airtable_hash) for issue_number, github_hash, airtable_hash in rows}
+
+    def put(self, issue_number: int, github_hash: str, airtable_hash: str):
+        """Add or replace the snapshot of a record, written on `commit`."""
+        self._pending.append((self.key, issue_number, github_hash, airtable_hash))
+
+    def commit(self):
+        """Write the snapshots added since the last commit in a single transaction."""
+        if not self._pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO snapshots (sync_key, issue_number, github_hash, airtable_hash) "
+                "VALUES (?, ?, ?, ?)", self._pending)
+        self._pending = []
+
+    def compact(self, issue_numbers: set) -> int:
+        """
+        Delete the snapshots of the records no longer synced and reclaim the space they used.
+        Args:
+            issue_numbers (set): The issue numbers of all the records synced, after a full sync.
+        Returns:
+            int: The number of snapshots deleted.
+        """
+        stale = [(self.key, issue_number) for issue_number in self.load() if issue_number not in issue_numbers]
+        if not stale:
+            return 0
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM snapshots WHERE sync_key = ? AND issue_number = ?", stale)
+        self.connection.execute("VACUUM")
+        return len(stale)
+
+    def rebuild(self):
+        """Delete all the snapshots of this sync, so that the next sync compares every record."""
+        self._pending = []
+        self._delete_snapshots(self.connection)
+        self.connection.execute("VACUUM")
+
+    def _delete_snapshots(self, connection: sqlite3.Connection):
+        """Delete all the snapshots of this sync."""
+        with connection:
+            connection.execute("DELETE FROM snapshots WHERE sync_key = ?", (self.key,))
+
+    def close(self):
+        """Close the database connection."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    @staticmethod
+    def hash_values(values: dict) -> str:
+        """Content hash of the values, independent of their order."""
+        serialized = json.dumps(values, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest()
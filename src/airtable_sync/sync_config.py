@@ -0,0 +1,34 @@
+import os
+
+
+class SyncConfig:
+    """Class that handles the configuration of the sync run itself."""
+
+    """Directory for the state persisted between runs, e.g. the incremental sync watermark"""
+    state_dir: str
+    """Only fetch and reconcile items changed since the last sync"""
+    incremental: bool
+    """Hours after which an incremental sync falls back to a full sync"""
+    full_sync_interval: float
+    """Hours the GitHub project ID and the Airtable table schema are cached for, 0 disables the cache"""
+    cache_ttl: float
+    """Keep a snapshot of the synced state to skip the records unchanged since the last sync"""
+    snapshot: bool
+    """Delete the snapshots before the first run, so that every record is compared again"""
+    rebuild_snapshot: bool
+    """Compare and write the records page by page as the GitHub project is fetched"""
+    streaming: bool
+    """Upsert the epics by issue number and link without reading the Airtable table, creating missing records"""
+    upsert: bool
+
+    def __init__(self, config_json: dict):
+        config_json = config_json or {}
+        self.state_dir = os.path.expanduser(
+            config_json.get('stateDir', '.airtable_sync'))
+        self.incremental = config_json.get('incremental', False)
+        self.full_sync_interval = config_json.get('fullSyncIntervalHours', 24)
+        self.cache_ttl = config_json.get('cacheTtlHours', 24)
+        self.snapshot = config_json.get('snapshot', False)
+        self.rebuild_snapshot = config_json.get('rebuildSnapshot', False)
+        self.streaming = config_json.get('streaming', False)
+        self.upsert = config_json.get('upsert', False)
@@ -0,0 +1,86 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from .custom_logger import CustomLogger
+
+logger = CustomLogger(__name__)
+
+
+class Watermark:
+    """
+    Persisted high-water marks of the last successful sync, used by incremental syncs.
+    The marks of several syncs (e.g. different repos or tables) can share one file, each under its own key.
+    """
+
+    """Latest `updatedAt` seen on the GitHub project items, ISO 8601 string"""
+    github_updated_at: str
+    """Time the Airtable records were last read, compared with LAST_MODIFIED_TIME(), ISO 8601 string"""
+    airtable_modified_at: str
+    """Time of the last full sync, ISO 8601 string"""
+    full_sync_at: str
+
+    def __init__(self, path: str, key: str):
+        """
+        Initialize the watermark and load it if the file exists.
+        Args:
+            path (str): Path of the watermark file.
+            key (str): Key of this sync in the watermark file.
+        """
+        self.path = path
+        self.key = key
+        self.github_updated_at = None
+        self.airtable_modified_at = None
+        self.full_sync_at = None
+        self.load()
+
+    def load(self):
+        """Load the watermark from the file, a missing or unreadable file leaves it unset."""
+        entry = self._read_file().get(self.key, {})
+        self.github_updated_at = entry.get('githubUpdatedAt')
+        self.airtable_modified_at = entry.get('airtableModifiedAt')
+        self.full_sync_at = entry.get('fullSyncAt')
+
+    def save(self):
+        """Write the watermark to the file, keeping the entries of other keys."""
+        entries = self._read_file()
+        entries[self.key] = {
+            'githubUpdatedAt': self.github_updated_at,
+            'airtableModifiedAt': self.airtable_modified_at,
+            'fullSyncAt': self.full_sync_at,
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(entries, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    @property
+    def is_set(self) -> bool:
+        """If the watermark holds the marks of a previous sync."""
+        return bool(self.github_updated_at and self.airtable_modified_at and self.full_sync_at)
+
+    def full_sync_due(self, interval_hours: float, now: datetime = None) -> bool:
+        """
+        Check if a full sync is due, either because the watermark is missing or the interval has elapsed.
+        Args:
+            interval_hours (float): Hours between full syncs.
+            now (datetime, optional): Current time, defaults to the current UTC time.
+        Returns:
+            bool: True if the next sync should be a full sync.
+        """
+        if not self.is_set:
+            return True
+        now = now or datetime.now(timezone.utc)
+        last_full_sync = datetime.fromisoformat(self.full_sync_at)
+        return now - last_full_sync >= timedelta(hours=interval_hours)
+
+    def _read_file(self) -> dict:
+        """Read all the entries in the watermark file."""
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable watermark file {self.path}: {e}")
+            return {}
@@ -1,7 +1,11 @@
 import json
+import re
 import unittest
 from unittest.mock import MagicMock, patch
+import requests
+from pyairtable.models.schema import parse_field_schema
 from src.airtable_sync.airtable.client import AirtableClient
+from src.airtable_sync.airtable.record import AirtableRecord
 from src.airtable_sync.airtable.config import AirtableConfig
 import os
 
@@ -18,7 +22,13 @@ class TestAirtableClient(unittest.TestCase):
         }
         self.config = AirtableConfig(config_json)
         self.client = AirtableClient(self.config)
-        self.client.table = MagicMock()
+        self.client.table = self.client.write_table = MagicMock()
+
+    def test_write_api_without_retries(self):
+        # Rate limited writes are retried by the batch writer, not by the session, the reads by the session
+        client = AirtableClient(self.config)
+        self.assertEqual(client.write_table.api.session.adapters['https://'].max_retries.total, 0)
+        self.assertGreater(client.api.session.adapters['https://'].adapter.max_retries.total, 0)
 
     def test_table_schema(self):
         """
@@ -30,6 +40,46 @@ class TestAirtableClient(unittest.TestCase):
         self.assertEqual(schema, expected_schema)
         self.client.table.schema.assert_called_once()
 
+    def test_table_schema_cached(self):
+        """
+        AirtableClient.table_schema from the cache
+        """
+        script_dir = os.path.dirname(__file__)
+        with open(os.path.join(script_dir, 'github_sync_base_table_schema.json')) as f:
+            cached_schema = json.load(f)
+        cache = MagicMock()
+        cache.get.return_value = cached_schema
+        self.client._cache = cache
+        self.assertTrue(self.client.field_in_schema('Issue Number'))
+        self.assertTrue(self.client.schema_cached)
+        self.client.table.schema.assert_not_called()
+
+        self.client.refresh_schema()
+        cache.invalidate.assert_called_once()
+        cache.get.return_value = None
+        self.client.table.schema.return_value.dict.return_value = cached_schema
+        self.assertIsNotNone(self.client.table_schema)
+        self.assertFalse(self.client.schema_cached)
+        self.client.table.schema.assert_called_once_with(force=True)
+        cache.set.assert_called_once_with(cache.invalidate.call_args.args[0], cached_schema)
+
+    def test_reset(self):
+        self.client._table_schema = MagicMock()
+        self.client.current_repo = 'repo1'
+        self.client.records = [MagicMock(id='rec1', issue_number=1, repo_name='repo1')]
+        self.client.reset()
+        self.assertEqual(self.client.records, [])
+        self.assertEqual(self.client.get_records_by_issue_number(1), [])
+
+        # The schema is taken from the cache again, and fetched once it has expired
+        cache = MagicMock()
+        cache.get.return_value = None
+        self.client._cache = cache
+        self.client.table.schema.return_value = MagicMock()
+        self.assertIs(self.client.table_schema, self.client.table.schema.return_value)
+        self.assertFalse(self.client.schema_cached)
+        cache.get.assert_called_once()
+
     def test_table_fields_schema(self):
         """
         AirtableClient.table_fields_schema
@@ -59,6 +109,22 @@ class TestAirtableClient(unittest.TestCase):
         self.assertTrue(self.client.field_in_schema('Field1'))
         self.assertFalse(self.client.field_in_schema('Field2'))
 
+    def test_schema_index_built_once(self):
+        """
+        AirtableClient.schema_index
+        """
+        mock_field_schema = MagicMock()
+        mock_field_schema.name = 'Field1'
+        mock_schema = MagicMock()
+        mock_schema.fields = [mock_field_schema]
+        self.client.table.schema.return_value = mock_schema
+
+        index = self.client.schema_index
+        self.assertIs(self.client.schema_index, index)
+        self.assertIs(self.client.field_schema('Field1'), mock_field_schema)
+        self.assertIsNone(self.client.field_schema('Field2'))
+        self.client.table.schema.assert_called_once()
+
     def test_fields_in_schema_with_json(self):
         """
         AirtableClient.field_in_schema
@@ -95,7 +161,7 @@ class TestAirtableClient(unittest.TestCase):
         """
         AirtableClient.read_records
         """
-        self.client.table.all.return_value = [{'id': 'rec1'}, {'id': 'rec2'}]
+        self.client.table.iterate.return_value = [[{'id': 'rec1'}], [{'id': 'rec2'}]]
         self.client.read_records()
         self.assertEqual(len(self.client.records), 2)
         MockAirtableRecord.assert_any_call({'id': 'rec1'})
@@ -129,6 +195,156 @@ class TestAirtableClient(unittest.TestCase):
         found_record = self.client.get_record_by_id('rec1')
         self.assertEqual(found_record, record)
 
+    def test_get_records_by_issue_number(self):
+        """
+        AirtableClient.get_records_by_issue_number
+        """
+        record_a = MagicMock(id='recA', repo_name='repo1', issue_number=5)
+        record_b = MagicMock(id='recB', repo_name='repo1', issue_number=5)
+        self.client.current_repo = 'repo1'
+        self.client.records = [record_a, record_b]
+        self.assertEqual(self.client.get_records_by_issue_number(5), [record_a, record_b])
+        self.assertEqual(self.client.get_records_by_issue_number(6), [])
+
+        # Only the records in the current repository
+        self.client.records = [record_a, MagicMock(id='recC', repo_name='repo2', issue_number=6)]
+        self.assertEqual(self.client.get_records_by_issue_number(6), [])
+        self.assertIsNone(self.client.get_record_by_id('recC'))
+
+    def test_read_records_builds_index(self):
+        """
+        AirtableClient.read_records indexes the records in the current repository
+        """
+        def entry(id, repo, issue_number):
+            return {'id': id, 'fields': {
+                'Title': f'Issue {issue_number}',
+                'Issue Link': f'https://github.com/owner/{repo}/issues/{issue_number}',
+                'Issue Number': issue_number}}
+        self.client.table.iterate.return_value = [
+            [entry('rec1', 'repo1', 1), entry('rec2', 'repo2', 2)], [entry('rec3', 'repo1', 3)]]
+        self.client.current_repo = 'repo1'
+        self.client.read_records()
+        self.assertEqual(
+            [record.id for record in self.client.records_in_current_repo], ['rec1', 'rec3'])
+        self.assertEqual(self.client.get_record_by_id('rec3').issue_number, 3)
+        self.assertEqual([record.id for record in self.client.get_records_by_issue_number(1)], ['rec1'])
+        self.assertEqual(self.client.get_records_by_issue_number(2), [])
+
+    def test_read_records_filtered(self):
+        """
+        AirtableClient.read_records requests only the records of the current repo and the given fields
+        """
+        self.client.table.iterate.return_value = []
+        self.client.read_records()
+        self.client.table.iterate.assert_called_once_with(view=self.config.view_name)
+
+        self.client.current_repo = 'repo1'
+        self.client.read_records(fields=['Title', 'Issue Link'])
+        self.client.table.iterate.assert_called_with(
+            view=self.config.view_name, formula="FIND('/repo1/issues/', {Issue Link})",
+            fields=['Title', 'Issue Link'])
+
+    def _partitioned_table(self, entries):
+        """Table mock whose iterate filters the entries by the partition formula, in pages of 2."""
+        def iterate(view, formula=None, fields=None):
+            match = re.search(r"MOD\(\{Issue Number\}, (\d+)\) = (\d+)", formula or '')
+            selected = [entry for entry in entries if not match
+                        or entry['fields']['Issue Number'] % int(match[1]) == int(match[2])]
+            return [selected[start:start + 2] for start in range(0, len(selected), 2)]
+        self.client.table.iterate.side_effect = iterate
+
+    def test_read_records_partitioned(self):
+        """
+        AirtableClient.read_records in partitions reads the same records as a sequential read
+        """
+        entries = [{'id': f'rec{n}', 'fields': {
+            'Issue Link': f'https://github.com/owner/repo1/issues/{n}', 'Issue Number': n}} for n in range(1, 12)]
+        self._partitioned_table(entries)
+        self.client.current_repo = 'repo1'
+        self.client.read_records()
+        sequential = {record.id for record in self.client.records_in_current_repo}
+
+        self.config.read_partitions = 3
+        self.client.read_records()
+        self.assertEqual({record.id for record in self.client.records_in_current_repo}, sequential)
+        self.assertEqual(len(self.client.records), 11)
+        self.assertEqual([record.id for record in self.client.get_records_by_issue_number(7)], ['rec7'])
+        formulas = [call.kwargs['formula'] for call in self.client.table.iterate.call_args_list[1:]]
+        self.assertIn("AND(OR(MOD({Issue Number}, 3) = 0, {Issue Number} = BLANK()), "
+                      "FIND('/repo1/issues/', {Issue Link}))", formulas)
+
+        # No more partitions than keep the rate limit busy
+        self.config.read_partitions = 8
+        self.client.table.iterate.reset_mock()
+        self.client.read_records()
+        self.assertEqual(self.client.table.iterate.call_count, self.client.max_read_partitions)
+        self.assertEqual({record.id for record in self.client.records_in_current_repo}, sequential)
+
+    def test_read_records_rate_limited(self):
+        """
+        AirtableClient.read_records takes a token for each request sent, none for the end of the pages
+        """
+        client = AirtableClient(self.config)
+        client.current_repo = 'repo1'
+        throttled = client.api.session.get_adapter('https://')
+        throttled.rate_limiter = MagicMock()
+        fields = {'Issue Link': 'https://github.com/owner/repo1/issues/1', 'Issue Number': 1}
+        pages = [{'records': [{'id': 'rec1', 'createdTime': '2024-10-01T00:00:00.000Z', 'fields': fields}],
+                  'offset': 'next'},
+                 {'records': []}]
+
+        def send(request, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps(pages.pop(0)).encode()
+            return response
+
+        throttled.adapter = MagicMock(send=MagicMock(side_effect=send))
+        client.read_records()
+        self.assertEqual(len(client.records_in_current_repo), 1)
+        self.assertEqual(throttled.adapter.send.call_count, 2)
+        self.assertEqual(throttled.rate_limiter.acquire.call_count, 2)
+
+    def test_read_records_partitioned_error(self):
+        """
+        AirtableClient.read_records in partitions re-raises the error of a partition
+        """
+        self.config.read_partitions = 2
+
+        def iterate(view, formula=None, fields=None):
+            if '= 1' in formula:
+                raise Exception('partition failed')
+            return [[{'id': 'rec2', 'fields': {'Issue Number': 2}}]]
+        self.client.table.iterate.side_effect = iterate
+        with self.assertRaisesRegex(Exception, 'partition failed'):
+            self.client.read_records()
+
+    def test_read_records_by_issue_numbers(self):
+        """
+        AirtableClient.read_records_by_issue_numbers
+        """
+        def entry(id, repo, issue_number):
+            return {'id': id, 'fields': {
+                'Title': f'Issue {issue_number}',
+                'Issue Link': f'https://github.com/owner/{repo}/issues/{issue_number}',
+                'Issue Number': issue_number}}
+        self.client.current_repo = 'repo1'
+        self.client.table.iterate.return_value = [[entry('rec1', 'repo1', 1)]]
+        self.client.read_records(formula='TRUE()')
+        self.client.table.iterate.assert_called_once_with(
+            view=self.config.view_name, formula="AND(FIND('/repo1/issues/', {Issue Link}), TRUE())")
+
+        self.client.table.all.return_value = [
+            entry('rec2', 'repo1', 2), entry('rec3', 'repo2', 2)]
+        added = self.client.read_records_by_issue_numbers([1, 2], fields=['Title'])
+        self.assertEqual(added, 1)
+        self.client.table.all.assert_called_once_with(
+            view=self.config.view_name,
+            formula="AND(FIND('/repo1/issues/', {Issue Link}), OR({Issue Number} = 2))", fields=['Title'])
+        self.assertEqual([record.id for record in self.client.get_records_by_issue_number(2)], ['rec2'])
+        self.assertEqual(len(self.client.records_in_current_repo), 2)
+        self.assertEqual(len(self.client.records), 3)
+
     @patch('src.airtable_sync.airtable.client.UpdateResult')
     def test_batch_update(self, MockUpdateResult):
         """
@@ -148,6 +364,103 @@ class TestAirtableClient(unittest.TestCase):
         self.assertEqual(result, mock_result)
         mock_result.add_record_status.assert_called_once()
 
+    def test_batch_update_failed_chunk(self):
+        """
+        AirtableClient.batch_update with a chunk failing, the other chunks are still committed
+        """
+        records = [MagicMock(id=f'rec{i}', issue_number=i, repo_name='repo1') for i in range(12)]
+        for record in records:
+            record.commit_changes.return_value = ({'field1': {'old': 1, 'new': 2}}, None)
+        self.client._records = records
+        self.client.current_repo = 'repo1'
+
+        def batch_update(chunk):
+            if chunk[0]['id'] == 'rec10':
+                raise Exception('boom')
+            return chunk
+
+        self.client.table.batch_update.side_effect = batch_update
+        result = self.client.batch_update([{'id': record.id, 'fields': {}} for record in records])
+        self.assertEqual(len(result.updated), 10)
+        self.assertEqual([failed['issue_number'] for failed in result.failed], [10, 11])
+        self.assertIn('boom', result.failed[0]['error'])
+
+    def test_batch_update_schema_error(self):
+        """
+        AirtableClient.batch_update with a chunk rejected against a stale schema, retried once with the schema fetched again
+        """
+        record = AirtableRecord({'id': 'rec1', 'fields': {
+            'Issue Number': 1, 'Issue Link': 'https://github.com/owner/repo1/issues/1', 'Status': 'Todo'}})
+        self.client.records = [record]
+        self.client.current_repo = 'repo1'
+        record.stage_field('Status', ' Done ', 'Todo')
+        record.stage_field('Removed', 'x', None)
+        response = requests.Response()
+        response.status_code = 422
+        error = requests.HTTPError('422 Client Error', repr({'type': 'UNKNOWN_FIELD_NAME'}), response=response)
+        sent = []
+
+        def batch_update(chunk):
+            sent.append(json.loads(json.dumps(chunk)))
+            if len(sent) == 1:
+                raise error
+            return chunk
+
+        self.client.table.batch_update.side_effect = batch_update
+        self.client.refresh_schema = MagicMock()
+        status_schema = parse_field_schema({'id': 'fld1', 'name': 'Status', 'type': 'singleSelect', 'options': {
+            'choices': [{'id': 'sel1', 'name': 'Done', 'color': 'blue'}]}})
+        self.client.field_schema = lambda name: status_schema if name == 'Status' else None
+
+        result = self.client.batch_update([record.updated_fields])
+        self.client.refresh_schema.assert_called_once()
+        self.assertEqual(sent[1], [{'id': 'rec1', 'fields': {'Status': 'Done'}}])
+        self.assertEqual(len(result.updated), 1)
+        self.assertEqual(result.failed, [])
+        self.assertEqual(record.fields['Status'], 'Done')
+
+    def test_batch_update_schema_error_once(self):
+        """
+        AirtableClient.batch_update with a chunk still rejected after fetching the schema again fails
+        """
+        self.client.records = [MagicMock(id='rec1', issue_number=1, repo_name='repo1')]
+        self.client.current_repo = 'repo1'
+        response = requests.Response()
+        response.status_code = 422
+        self.client.table.batch_update.side_effect = requests.HTTPError(
+            '422 Client Error', repr({'type': 'INVALID_VALUE_FOR_COLUMN'}), response=response)
+        self.client.refresh_schema = MagicMock()
+        self.client.field_schema = MagicMock(return_value=None)
+
+        result = self.client.batch_update([{'id': 'rec1', 'fields': {}}])
+        self.assertEqual(self.client.table.batch_update.call_count, 2)
+        self.assertEqual([failed['issue_number'] for failed in result.failed], [1])
+
+    def test_batch_upsert(self):
+        """
+        AirtableClient.batch_upsert, the records created and updated are told apart from the response
+        """
+        self.client.current_repo = 'repo1'
+        links = {i: f'https://github.com/owner/repo1/issues/{i}' for i in range(12)}
+
+        def batch_upsert(chunk, key_fields):
+            if chunk[0]['fields']['Issue Number'] == 10:
+                raise Exception('boom')
+            records = [{'id': f"rec{upserted['fields']['Issue Number']}", 'fields': upserted['fields']}
+                       for upserted in chunk]
+            return {'createdRecords': ['rec1'], 'updatedRecords': [r['id'] for r in records[1:]], 'records': records}
+
+        self.client.table.batch_upsert.side_effect = batch_upsert
+        result = self.client.batch_upsert(
+            [{'fields': {'Issue Number': i, 'Issue Link': link, 'Priority': 'High'}} for i, link in links.items()])
+        self.assertEqual(self.client.table.batch_upsert.call_args.kwargs['key_fields'], ['Issue Number', 'Issue Link'])
+        self.assertEqual([created['id'] for created in result.created], ['rec1'])
+        self.assertEqual(len(result.updated), 9)
+        self.assertEqual(result.created[0]['changes']['Priority'], {'new': 'High'})
+        self.assertEqual([failed['issue_number'] for failed in result.failed], [10, 11])
+        self.assertEqual([record.id for record in self.client.get_records_by_issue_number(1)], ['rec1'])
+        self.assertEqual(len(self.client.records_in_current_repo), 10)
+
 
 if __name__ == '__main__':
     unittest.main()
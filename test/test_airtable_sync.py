@@ -1,3 +1,6 @@
+import os
+import tempfile
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 from src.airtable_sync.airtable_sync import AirtableSync
@@ -5,6 +8,9 @@ from src.airtable_sync.github.config import GitHubConfig
 from src.airtable_sync.airtable.config import AirtableConfig
 from src.airtable_sync.airtable.record import AirtableRecord
 from src.airtable_sync.github.issue import GitHubIssue
+from src.airtable_sync.airtable.update_result import UpdateResult
+from src.airtable_sync.snapshot_store import SnapshotStore
+from src.airtable_sync.sync_config import SyncConfig
 
 
 class TestAirtableSync(unittest.TestCase):
@@ -24,13 +30,17 @@ class TestAirtableSync(unittest.TestCase):
             "fieldMap": {"priority": "Priority"}
         }
         github_config = GitHubConfig(github_config_json)
+        self.configs = airtable_config, github_config
         self.sync = AirtableSync(airtable_config, github_config)
         self.sync.airtable = MagicMock()
         self.sync.github = MagicMock()
 
     def test_read_records(self):
+        self.sync.airtable.field_in_schema = MagicMock(return_value=True)
         self.sync.read_records()
         self.sync.airtable.read_records.assert_called_once()
+        self.assertEqual(self.sync.airtable.read_records.call_args.kwargs['fields'],
+                         ['Title', 'Issue Link', 'Issue Number', 'Priority'])
 
     def test_read_issues(self):
         self.sync.read_issues()
@@ -45,6 +55,15 @@ class TestAirtableSync(unittest.TestCase):
         self.sync.airtable.field_in_schema = MagicMock(return_value=True)
         self.assertTrue(self.sync._verify_sync_fields())
 
+    def test_sync_field_map(self):
+        self.sync._field_map = {"priority": "Priority", "size": "Size"}
+        self.sync.airtable.field_in_schema = MagicMock(
+            side_effect=lambda name: name == "Priority")
+        self.assertEqual(self.sync.sync_field_map, {"priority": "Priority"})
+        self.assertEqual(self.sync.sync_field_map, {"priority": "Priority"})
+        # Resolved once, not per access
+        self.assertEqual(self.sync.airtable.field_in_schema.call_count, 2)
+
     @patch('src.airtable_sync.airtable_sync.AirtableRecord.validate_schema')
     def test_verify_record_field(self, mock_validate_schema):
         mock_validate_schema.return_value = (True, None)
@@ -72,6 +91,158 @@ class TestAirtableSync(unittest.TestCase):
         self.sync.airtable.batch_update.assert_called_once()
         self.sync._log_sync_result.assert_called_once()
 
+    def test_field_plan_follows_schema(self):
+        self.sync.airtable.field_in_schema = MagicMock(return_value=True)
+        self.sync.airtable.field_schema = MagicMock(return_value=None)
+        self.sync.airtable.schema_index = MagicMock()
+        plan = self.sync.field_plan
+        plan.avoided_fields = 2
+        self.assertIs(self.sync.field_plan, plan)
+
+        # Fetched again during the run, the plan is compiled again keeping its counts
+        self.sync.airtable.schema_index = MagicMock()
+        self.assertIsNot(self.sync.field_plan, plan)
+        self.assertEqual(self.sync.field_plan.avoided_fields, 2)
+
+    def test_rebuild_snapshot(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            sync = AirtableSync(*self.configs, SyncConfig({'stateDir': state_dir, 'snapshot': True}))
+            sync.snapshot.put(1, 'g', 'a')
+            sync.snapshot.commit()
+            sync.snapshot.close()
+            sync = AirtableSync(*self.configs, SyncConfig({'stateDir': state_dir, 'snapshot': True}))
+            self.assertEqual(list(sync.snapshot.load()), [1])
+            sync.snapshot.close()
+
+            sync = AirtableSync(*self.configs, SyncConfig(
+                {'stateDir': state_dir, 'snapshot': True, 'rebuildSnapshot': True}))
+            self.assertEqual(sync.snapshot.load(), {})
+            sync.snapshot.close()
+
+    def test_sync_skips_issue_not_found(self):
+        self.sync._prep_sync = MagicMock()
+        self.sync.github.fetch_issue = MagicMock(return_value=None)
+        self.sync._update_fields = MagicMock()
+        self.sync.airtable.batch_update = MagicMock(return_value=UpdateResult())
+        self.sync._log_sync_result = MagicMock()
+        self.sync.airtable.records_in_current_repo = [AirtableRecord({"id": "rec1", "fields": {"Issue Number": 1}})]
+
+        self.sync.sync()
+
+        self.sync._update_fields.assert_not_called()
+        self.sync.airtable.batch_update.assert_called_once_with([])
+
+    def test_sync_skips_unchanged_records(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            self.sync.sync_config = SyncConfig({'stateDir': state_dir, 'snapshot': True})
+            self.sync.snapshot = SnapshotStore(
+                os.path.join(state_dir, 'snapshot.db'), 'key', self.sync.field_map)
+            self.sync._prep_sync = MagicMock()
+            self.sync.airtable.field_in_schema = MagicMock(return_value=True)
+            issue = GitHubIssue(url="https://github.com/user/repo/issues/1")
+            issue.fields['priority'] = 'High'
+            self.sync._get_issue = MagicMock(return_value=issue)
+            self.sync.airtable.batch_update = MagicMock(return_value=UpdateResult())
+            record = AirtableRecord({"id": "rec1", "fields": {"Issue Number": 1, "Priority": "High"}})
+            self.sync.airtable.records_in_current_repo = [record]
+
+            self.sync.sync()
+            self.assertEqual(len(self.sync.airtable.batch_update.call_args.args[0]), 1)
+            self.assertEqual(list(self.sync.snapshot.load()), [1])
+
+            self.sync._update_fields = MagicMock(return_value=None)
+            self.sync.sync()
+            self.sync._update_fields.assert_not_called()
+            self.assertEqual(self.sync.airtable.batch_update.call_args.args[0], [])
+
+            # Changed in Airtable since the last sync
+            record.fields['Priority'] = 'Low'
+            self.sync.sync()
+            self.sync._update_fields.assert_called_once()
+            self.sync.snapshot.close()
+
+    def test_sync_upsert(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            self.sync.sync_config = SyncConfig({'stateDir': state_dir, 'snapshot': True, 'upsert': True})
+            self.sync.snapshot = SnapshotStore(
+                os.path.join(state_dir, 'snapshot.db'), 'key', self.sync.field_map)
+            self.sync._start_run = MagicMock()
+            self.sync.airtable.field_in_schema = MagicMock(return_value=True)
+            issues = {n: GitHubIssue(url=f"https://github.com/user/repo/issues/{n}") for n in (1, 2)}
+            for n, issue in issues.items():
+                issue.title = f"Epic {n}"
+                issue.fields['priority'] = 'High'
+            self.sync.github.epic_issues = list(issues.values())
+            records = [AirtableRecord({"id": f"rec{n}", "fields": {"Issue Number": n, "Priority": "High"}})
+                       for n in issues]
+            self.sync.airtable.records_in_current_repo = records
+            self.sync.airtable.batch_upsert = MagicMock(side_effect=lambda upserts, result: result)
+
+            self.sync.sync()
+            self.sync.airtable.read_records.assert_not_called()
+            upserts = self.sync.airtable.batch_upsert.call_args.args[0]
+            self.assertEqual(upserts[0], {'fields': {
+                'Title': 'Epic 1', 'Issue Link': issues[1].url, 'Issue Number': 1, 'Priority': 'High'}})
+            self.assertEqual(len(upserts), 2)
+            self.assertEqual(sorted(self.sync.snapshot.load()), [1, 2])
+
+            # Only the epic changed in GitHub since the last sync is upserted
+            issues[2].fields['priority'] = 'Low'
+            self.sync.sync()
+            upserts = self.sync.airtable.batch_upsert.call_args.args[0]
+            self.assertEqual([upsert['fields']['Issue Number'] for upsert in upserts], [2])
+            result = self.sync.airtable.batch_upsert.call_args.args[1]
+            self.assertEqual([unchanged['issue_number'] for unchanged in result.unchanged], [1])
+            self.sync.snapshot.close()
+
+    @patch('src.airtable_sync.airtable_sync.BatchWriter.CHUNK_SIZE', 1)
+    def test_sync_streaming(self):
+        self.sync.sync_config = SyncConfig({'streaming': True})
+        self.sync.airtable_config.write_workers = 1
+        self.sync._start_run = MagicMock()
+        self.sync.read_records = MagicMock()
+        records = {n: AirtableRecord({"id": f"rec{n}", "fields": {"Issue Number": n}}) for n in (1, 2, 3)}
+        self.sync.airtable.records_in_current_repo = list(records.values())
+        self.sync.airtable.get_records_by_issue_number = lambda n: [records[n]] if n in records else []
+        issues = {n: GitHubIssue(url=f"https://github.com/user/repo/issues/{n}") for n in (1, 2, 3, 4)}
+        self.sync.github.iter_project_issues = lambda stop_event: iter([[issues[1]], [issues[4], issues[2]]])
+        self.sync._get_issue = MagicMock(return_value=issues[3])
+        self.sync._update_fields = MagicMock(
+            side_effect=lambda record, issue: {"id": record.id, "fields": {"Issue": issue.issue_number}})
+        self.sync._log_sync_result = MagicMock()
+
+        self.sync.sync()
+
+        self.sync.read_records.assert_called_once()
+        self.sync.github.fetch_issues.assert_called_once_with([3])
+        written = [call.args[0] for call in self.sync.airtable.batch_update.call_args_list]
+        self.assertEqual(written, [[{"id": f"rec{n}", "fields": {"Issue": n}}] for n in (1, 2, 3)])
+        result = self.sync._log_sync_result.call_args.args[0]
+        self.assertTrue(all(call.args[1] is result for call in self.sync.airtable.batch_update.call_args_list))
+
+    def test_sync_streaming_duplicate_records(self):
+        self.sync.sync_config = SyncConfig({'streaming': True})
+        self.sync.airtable_config.write_workers = 1
+        self.sync._start_run = MagicMock()
+        self.sync.read_records = MagicMock()
+        records = [AirtableRecord({"id": f"rec{x}", "fields": {"Issue Number": 5}}) for x in 'AB']
+        self.sync.airtable.records_in_current_repo = records
+        self.sync.airtable.get_records_by_issue_number = lambda n: records if n == 5 else []
+        issue = GitHubIssue(url="https://github.com/user/repo/issues/5")
+        self.sync.github.iter_project_issues = lambda stop_event: iter([[issue]])
+        self.sync._get_issue = MagicMock()
+        self.sync._update_fields = MagicMock(
+            side_effect=lambda record, issue: {"id": record.id, "fields": {"Issue": issue.issue_number}})
+        self.sync._log_sync_result = MagicMock()
+
+        self.sync.sync()
+
+        # Both records of the issue are compared with it, none is left unmatched
+        self.sync.github.fetch_issues.assert_called_once_with([])
+        self.sync._get_issue.assert_not_called()
+        written = [update for call in self.sync.airtable.batch_update.call_args_list for update in call.args[0]]
+        self.assertEqual(written, [{"id": f"rec{x}", "fields": {"Issue": 5}} for x in 'AB'])
+
     def test_prep_sync(self):
         self.sync._verify_sync_fields = MagicMock(return_value=True)
         self.sync._verify_record_field = MagicMock(return_value=True)
@@ -85,6 +256,120 @@ class TestAirtableSync(unittest.TestCase):
         self.sync.read_records.assert_called_once()
         self.sync.read_issues.assert_called_once()
 
+    def test_prep_sync_stale_schema(self):
+        self.sync._verify_sync_fields = MagicMock(side_effect=[False, True])
+        self.sync._verify_record_field = MagicMock(return_value=True)
+        self.sync.read_records = MagicMock()
+        self.sync.read_issues = MagicMock()
+        self.sync.airtable.schema_cached = True
+
+        self.sync._prep_sync()
+
+        self.sync.airtable.refresh_schema.assert_called_once()
+        self.assertEqual(self.sync._verify_sync_fields.call_count, 2)
+        self.sync.read_records.assert_called_once()
+
+    def test_prep_sync_missing_fields(self):
+        self.sync._verify_sync_fields = MagicMock(return_value=False)
+        self.sync._verify_record_field = MagicMock(return_value=True)
+        self.sync.airtable.schema_cached = False
+
+        with self.assertRaises(Exception):
+            self.sync._prep_sync()
+        self.sync.airtable.refresh_schema.assert_not_called()
+
+    def test_fetch_missing_issues(self):
+        records = [AirtableRecord({"id": f"rec{n}", "fields": {"Issue Number": n}})
+                   for n in (1, 2, 3)]
+        self.sync.airtable.records_in_current_repo = records
+        self.sync.github.has_issue = MagicMock(side_effect=lambda n: n == 2)
+
+        self.sync._fetch_missing_issues()
+
+        self.sync.github.fetch_issues.assert_called_once_with([1, 3])
+
+    def test_read_concurrently(self):
+        self.sync.read_records = MagicMock()
+        self.sync.read_issues = MagicMock()
+
+        self.sync._read_concurrently()
+
+        self.sync.read_records.assert_called_once()
+        self.sync.read_issues.assert_called_once()
+
+    def test_read_concurrently_error(self):
+        stopped = []
+        started = threading.Event()
+
+        def read_records(stop_event):
+            started.wait(timeout=5)
+            raise Exception("Airtable read failed")
+
+        def read_issues(stop_event):
+            # Page until the failing read stops us
+            started.set()
+            stopped.append(stop_event.wait(timeout=5))
+
+        self.sync.read_records = read_records
+        self.sync.read_issues = read_issues
+
+        with self.assertRaisesRegex(Exception, "Airtable read failed"):
+            self.sync._read_concurrently()
+        self.assertEqual(stopped, [True])
+
+    def _enable_incremental(self, state_dir):
+        self.sync.sync_config = SyncConfig(
+            {'stateDir': state_dir, 'incremental': True, 'fullSyncIntervalHours': 24})
+        self.sync.watermark.path = os.path.join(state_dir, 'watermark.json')
+
+    def test_incremental_sync(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            self._enable_incremental(state_dir)
+            watermark = self.sync.watermark
+            watermark.github_updated_at = '2024-10-01T10:00:00Z'
+            watermark.airtable_modified_at = '2024-10-01T11:00:00+00:00'
+            watermark.full_sync_at = '2099-01-01T00:00:00+00:00'
+            self.sync._verify_sync_fields = MagicMock(return_value=True)
+            self.sync._verify_record_field = MagicMock(return_value=True)
+            self.sync.github.issue_numbers_updated_since.return_value = [1, 2]
+
+            self.sync._prep_sync()
+
+            self.sync.airtable.read_records.assert_called_once()
+            self.assertEqual(
+                self.sync.airtable.read_records.call_args.kwargs['formula'],
+                "IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('2024-10-01T11:00:00+00:00'))")
+            self.sync.github.issue_numbers_updated_since.assert_called_once_with(
+                '2024-10-01T10:00:00Z')
+            self.sync.airtable.read_records_by_issue_numbers.assert_called_once_with(
+                [1, 2], fields=['Title', 'Issue Link', 'Issue Number', 'Priority'])
+
+    def test_full_sync_without_watermark(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            self._enable_incremental(state_dir)
+            self.sync._verify_sync_fields = MagicMock(return_value=True)
+            self.sync._verify_record_field = MagicMock(return_value=True)
+
+            self.sync._prep_sync()
+
+            self.assertIsNone(
+                self.sync.airtable.read_records.call_args.kwargs['formula'])
+            self.sync.airtable.read_records_by_issue_numbers.assert_not_called()
+
+    def test_save_watermark(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            self._enable_incremental(state_dir)
+            self.sync.github.latest_update = '2024-10-02T10:00:00Z'
+            self.sync._read_started_at = '2024-10-02T11:00:00+00:00'
+
+            self.sync._save_watermark(MagicMock(failed=[{'id': 'rec1'}]))
+            self.assertFalse(os.path.exists(self.sync.watermark.path))
+
+            self.sync._save_watermark(MagicMock(failed=[]))
+            self.sync.watermark.load()
+            self.assertEqual(self.sync.watermark.github_updated_at, '2024-10-02T10:00:00Z')
+            self.assertEqual(self.sync.watermark.full_sync_at, '2024-10-02T11:00:00+00:00')
+
     def test_get_issue(self):
         record_dict = {"id": "rec123", "fields": {"Issue Number": 1}}
         record = AirtableRecord(record_dict)
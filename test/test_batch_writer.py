@@ -0,0 +1,159 @@
+import unittest
+from unittest.mock import MagicMock
+import json
+import requests
+from pyairtable import Api
+from src.airtable_sync.airtable.batch_writer import BatchWriter, TokenBucket
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(response=response)
+
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """Transport answering the requests with the given status codes in turn, echoing the records."""
+
+    def __init__(self, status_codes):
+        super().__init__()
+        self.status_codes = list(status_codes)
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = self.status_codes.pop(0)
+        records = [{**record, 'createdTime': '2024-10-01T10:00:00.000Z'}
+                   for record in json.loads(request.body)['records']]
+        body = {'records': records} if response.status_code == 200 else {}
+        response._content = json.dumps(body).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.sleeps = []
+
+        def sleep(delay):
+            self.sleeps.append(delay)
+            self.now += delay
+
+        self.bucket = TokenBucket(5, sleep=sleep, clock=lambda: self.now)
+
+    def test_spaces_requests(self):
+        for _ in range(3):
+            self.bucket.acquire()
+        self.assertEqual(len(self.sleeps), 2)
+        for delay in self.sleeps:
+            self.assertAlmostEqual(delay, 0.2)
+
+    def test_refills(self):
+        self.bucket.acquire()
+        self.now += 10
+        self.bucket.acquire()
+        self.assertEqual(self.sleeps, [])
+
+
+class TestBatchWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.table = MagicMock()
+        self.table.batch_update.side_effect = lambda chunk: chunk
+        self.sleeps = []
+        self.writer = BatchWriter(self.table, TokenBucket(1000), workers=3,
+                                  backoff=0.5, sleep=self.sleeps.append)
+
+    def test_write_chunks(self):
+        updates = [{'id': f'rec{i}', 'fields': {}} for i in range(25)]
+        outcomes = list(self.writer.write(updates))
+        self.assertEqual(self.table.batch_update.call_count, 3)
+        self.assertEqual(sorted(len(chunk) for chunk, _, _ in outcomes), [5, 10, 10])
+        written = [record for _, records, _ in outcomes for record in records]
+        self.assertCountEqual(written, updates)
+        self.assertTrue(all(error is None for _, _, error in outcomes))
+
+    def test_upsert_chunks(self):
+        self.table.batch_upsert.side_effect = lambda chunk, key_fields: {'records': chunk}
+        records = [{'fields': {'Issue Number': i}} for i in range(15)]
+        outcomes = list(self.writer.upsert(records, ['Issue Number']))
+        self.assertEqual(self.table.batch_upsert.call_count, 2)
+        self.assertEqual(self.table.batch_upsert.call_args.kwargs['key_fields'], ['Issue Number'])
+        self.assertCountEqual([record for _, result, _ in outcomes for record in result['records']], records)
+        self.table.batch_update.assert_not_called()
+
+    def test_write_nothing(self):
+        self.assertEqual(list(self.writer.write([])), [])
+        self.table.batch_update.assert_not_called()
+
+    def test_retries_rate_limited_chunk(self):
+        updates = [{'id': 'rec1', 'fields': {}}]
+        self.table.batch_update.side_effect = [http_error(429), http_error(503), updates]
+        [(chunk, records, error)] = self.writer.write(updates)
+        self.assertEqual(records, updates)
+        self.assertIsNone(error)
+        self.assertEqual(self.sleeps, [0.5, 1.0])
+
+    def test_failed_chunk(self):
+        updates = [{'id': f'rec{i}', 'fields': {}} for i in range(15)]
+
+        def batch_update(chunk):
+            if chunk[0]['id'] == 'rec10':
+                raise http_error(422)
+            return chunk
+
+        self.table.batch_update.side_effect = batch_update
+        outcomes = {chunk[0]['id']: (records, error) for chunk, records, error in self.writer.write(updates)}
+        self.assertEqual(len(outcomes['rec0'][0]), 10)
+        self.assertIsNone(outcomes['rec10'][0])
+        self.assertEqual(outcomes['rec10'][1].response.status_code, 422)
+        self.assertEqual(self.sleeps, [])
+
+    def test_gives_up_after_retries(self):
+        self.table.batch_update.side_effect = http_error(500)
+        [(_, records, error)] = self.writer.write([{'id': 'rec1', 'fields': {}}])
+        self.assertIsNone(records)
+        self.assertIsInstance(error, requests.HTTPError)
+        self.assertEqual(self.table.batch_update.call_count, 4)
+
+
+class TestBatchWriterTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.api = Api('key', retry_strategy=None)
+        self.sleeps = []
+        self.writer = BatchWriter(self.api.table('app', 'tbl'), TokenBucket(1000), backoff=0.5,
+                                  sleep=self.sleeps.append)
+
+    def mount(self, status_codes):
+        adapter = ReplayAdapter(status_codes)
+        self.api.session.mount('https://', adapter)
+        return adapter
+
+    def test_retries_rate_limited_request(self):
+        adapter = self.mount([429, 200])
+        updates = [{'id': 'rec1', 'fields': {'Title': 'Issue'}}]
+        [(_, records, error)] = self.writer.write(updates)
+        self.assertIsNone(error)
+        self.assertEqual([record['fields'] for record in records], [{'Title': 'Issue'}])
+        self.assertEqual(adapter.sent, 2)
+        self.assertEqual(self.sleeps, [0.5])
+
+    def test_gives_up_on_rate_limit(self):
+        adapter = self.mount([429] * 4)
+        [(_, records, error)] = self.writer.write([{'id': 'rec1', 'fields': {}}])
+        self.assertIsNone(records)
+        self.assertIsInstance(error, requests.HTTPError)
+        self.assertEqual(error.response.status_code, 429)
+        self.assertEqual(adapter.sent, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import io
+import logging
+import unittest
+from unittest.mock import MagicMock, patch
+from src.airtable_sync.custom_logger import CustomLogger
+
+
+class Caller:
+    def log(self, logger, message):
+        logger.verbose(message)
+
+
+class TestCustomLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = CustomLogger('test.custom_logger')
+
+    def test_caller_info(self):
+        with self.assertLogs('test.custom_logger', level=CustomLogger.VERBOSE) as logs:
+            Caller().log(self.logger, 'hello')
+        self.assertRegex(logs.records[0].getMessage(),
+                         r'^test_custom_logger\.py:\d+ Caller\.log\(\) - hello$')
+
+    def test_caller_info_function(self):
+        def log():
+            self.logger.info('hello')
+
+        with self.assertLogs('test.custom_logger', level=logging.INFO) as logs:
+            log()
+        self.assertRegex(logs.records[0].getMessage(), r'^test_custom_logger\.py:\d+ log\(\) - hello$')
+
+    def test_lazy_message(self):
+        message = MagicMock(return_value='expensive')
+        with self.assertLogs('test.custom_logger', level=logging.DEBUG) as logs:
+            self.logger.debug(message)
+        self.assertTrue(logs.records[0].getMessage().endswith('- expensive'))
+        message.assert_called_once()
+
+    def test_disabled_level(self):
+        message = MagicMock(return_value='expensive')
+        self.logger.logger.setLevel(logging.ERROR)
+        try:
+            self.logger.debug(message)
+        finally:
+            self.logger.logger.setLevel(logging.NOTSET)
+        message.assert_not_called()
+
+    @patch('src.airtable_sync.custom_logger.atexit.register')
+    @patch('src.airtable_sync.custom_logger.logging.basicConfig')
+    def test_setup_queued_logging(self, mock_basic_config, mock_register):
+        stream = io.StringIO()
+        with patch('sys.stderr', stream):
+            CustomLogger.setup_logging('verbose', queued=True, queue_size=2)
+        self.assertEqual(mock_basic_config.call_args.kwargs['level'], CustomLogger.VERBOSE)
+        [handler] = mock_basic_config.call_args.kwargs['handlers']
+        stop_listener = mock_register.call_args.args[0]
+
+        for i in range(5):
+            handler.handle(logging.makeLogRecord({'msg': 'record %d', 'args': (i,), 'levelno': logging.INFO}))
+        stop_listener()
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual([line.split(' ', 3)[3] for line in lines],
+                         [f'record {i}' for i in range(5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from src.airtable_sync.daemon import SyncDaemon
+
+
+class TestSyncDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.starts = []
+        self.waits = []
+
+    def make_daemon(self, durations: list, jitter: float = 0.0) -> SyncDaemon:
+        def run():
+            self.starts.append(self.now)
+            self.now += durations.pop(0)
+            if isinstance(durations and durations[0], Exception):
+                raise durations.pop(0)
+            if not durations:
+                daemon.stop()
+
+        def wait(timeout):
+            self.waits.append(timeout)
+            self.now += timeout
+            return False
+
+        daemon = SyncDaemon(run, interval=10, jitter=jitter, clock=lambda: self.now, rand=lambda: 0.5)
+        daemon.stop_event.wait = wait
+        return daemon
+
+    def test_runs_on_ticks(self):
+        daemon = self.make_daemon([2, 3, 1])
+        daemon.run_forever()
+        self.assertEqual(self.starts, [0, 10, 20])
+        self.assertEqual(daemon.runs, 3)
+
+    def test_jitter(self):
+        daemon = self.make_daemon([2, 3], jitter=0.2)
+        daemon.run_forever()
+        self.assertEqual(self.waits, [9.0])
+        self.assertEqual(self.starts, [0, 11])
+
+    def test_overrun_skips_ticks(self):
+        daemon = self.make_daemon([25, 1, 1])
+        daemon.run_forever()
+        self.assertEqual(self.starts, [0, 30, 40])
+
+    def test_failed_run(self):
+        daemon = self.make_daemon([1, Exception('boom'), 1])
+        daemon.run_forever()
+        self.assertEqual(self.starts, [0, 10])
+        self.assertEqual(daemon.runs, 2)
+
+    def test_second_stop_interrupts(self):
+        daemon = SyncDaemon(lambda: None, interval=10)
+        daemon.stop()
+        with self.assertRaises(KeyboardInterrupt):
+            daemon.stop()
+
+    def test_invalid_interval(self):
+        with self.assertRaises(Exception):
+            SyncDaemon(lambda: None, interval=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
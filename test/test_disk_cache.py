@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from src.airtable_sync.disk_cache import DiskCache
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'state', 'cache.json')
+        self.now = 1000.0
+        self.cache = DiskCache(self.path, ttl_hours=1, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_missing(self):
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_set_and_get(self):
+        self.cache.set('key', {'id': 'PVT_1'})
+        self.cache.set('other', 'value')
+        cache = DiskCache(self.path, ttl_hours=1, clock=lambda: self.now)
+        self.assertEqual(cache.get('key'), {'id': 'PVT_1'})
+        self.assertEqual(cache.get('other'), 'value')
+
+    def test_expired(self):
+        self.cache.set('key', 'value')
+        self.now += 3599
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.now += 1
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_invalidate(self):
+        self.cache.set('key', 'value')
+        self.cache.set('other', 'value')
+        self.cache.invalidate('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('other'), 'value')
+
+    def test_disabled(self):
+        cache = DiskCache(self.path, ttl_hours=0)
+        cache.set('key', 'value')
+        self.assertIsNone(cache.get('key'))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_unreadable_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as file:
+            file.write('{not json')
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from datetime import datetime
+from pyairtable.models.schema import parse_field_schema
+from src.airtable_sync.airtable.field_plan import FieldPlan
+from src.airtable_sync.airtable.record import AirtableRecord
+
+
+class TestFieldPlan(unittest.TestCase):
+
+    def setUp(self):
+        schemas = [
+            {'id': 'fld1', 'name': 'Start Date', 'type': 'date', 'options': {'dateFormat': {'name': 'iso', 'format': 'YYYY-MM-DD'}}},
+            {'id': 'fld2', 'name': 'Estimate', 'type': 'number', 'options': {'precision': 0}},
+            {'id': 'fld3', 'name': 'Status', 'type': 'singleSelect', 'options': {'choices': []}},
+        ]
+        self.plan = FieldPlan(
+            {'start_date': 'Start Date', 'estimate': 'Estimate', 'status': 'Status'},
+            {schema['name']: parse_field_schema(schema) for schema in schemas})
+
+    def test_compile(self):
+        self.assertEqual([(step.source, step.target, step.field_type) for step in self.plan.steps], [
+            ('start_date', 'Start Date', 'date'), ('estimate', 'Estimate', 'number'), ('status', 'Status', 'singleSelect')])
+        self.assertEqual(self.plan.steps[0].convert(datetime(2024, 10, 1)), '2024-10-01')
+        self.assertEqual(self.plan.steps[1].convert(5.0), 5)
+
+    def test_convert(self):
+        self.assertEqual(self.plan.convert({'start_date': datetime(2024, 10, 1), 'estimate': 5.0, 'status': None}),
+                         {'Start Date': '2024-10-01', 'Estimate': 5})
+
+    def test_apply(self):
+        record = AirtableRecord({'id': 'rec1', 'fields': {
+            'Issue Number': 1, 'Start Date': '2024-10-01', 'Estimate': 3, 'Status': 'Todo'}})
+        updated = self.plan.apply(record, {'start_date': datetime(2024, 10, 1), 'estimate': 5.0, 'status': 'Done'})
+        self.assertEqual(updated, {'id': 'rec1', 'fields': {'Estimate': 5, 'Status': 'Done'}})
+        self.assertEqual(self.plan.avoided_fields, 0)
+
+    def test_apply_avoids_spurious_writes(self):
+        record = AirtableRecord({'id': 'rec1', 'fields': {'Issue Number': 1, 'Estimate': 5, 'Status': 'Done'}})
+        updated = self.plan.apply(record, {'estimate': 5.2, 'status': ' Done '})
+        self.assertEqual(updated, {'id': 'rec1', 'fields': {}})
+        self.assertEqual((self.plan.avoided_fields, self.plan.avoided_records), (2, 1))
+        self.assertIn('Avoided 1 record write(s) and 2 field write(s)', self.plan.report)
+
+    def test_apply_normalizes_record_value(self):
+        record = AirtableRecord({'id': 'rec1', 'fields': {'Issue Number': 1, 'Start Date': '2024-10-01T00:00:00.000Z'}})
+        self.assertEqual(self.plan.apply(record, {'start_date': '2024-10-01'}), {'id': 'rec1', 'fields': {}})
+        self.assertEqual((self.plan.avoided_fields, self.plan.avoided_records), (1, 1))
+
+        record = AirtableRecord({'id': 'rec2', 'fields': {'Issue Number': 2, 'Start Date': '2024-10-01'}})
+        self.assertEqual(self.plan.apply(record, {'start_date': datetime(2024, 10, 1)}), {'id': 'rec2', 'fields': {}})
+        self.assertEqual((self.plan.avoided_fields, self.plan.avoided_records), (1, 1))
+
+    def test_apply_unchanged(self):
+        record = AirtableRecord({'id': 'rec1', 'fields': {'Issue Number': 1, 'Estimate': 5, 'Status': 'Done'}})
+        updated = self.plan.apply(record, {'estimate': 5, 'status': 'Done'})
+        self.assertEqual(updated, {'id': 'rec1', 'fields': {}})
+        self.assertEqual((self.plan.avoided_fields, self.plan.avoided_records), (0, 0))
+
+    def test_apply_type_mismatch(self):
+        record = AirtableRecord({'id': 'rec1', 'fields': {'Issue Number': 1, 'Status': 1}})
+        self.assertEqual(self.plan.apply(record, {'status': 'Done'}), {'id': 'rec1', 'fields': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
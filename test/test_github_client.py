@@ -1,7 +1,9 @@
+import threading
 import unittest
 from unittest.mock import MagicMock
 from src.airtable_sync.github.client import GitHubClient
 from src.airtable_sync.github.config import GitHubConfig
+from src.airtable_sync.github.graphqlquery import GraphQLQuery
 from src.airtable_sync.github.issue import GitHubIssue
 
 
@@ -17,7 +19,6 @@ class TestGitHubClient(unittest.TestCase):
         self.client = GitHubClient(self.config)
         self.client._client = MagicMock()
         self.client._query = MagicMock()
-        self.client.epic_issues = []
 
     def test_fetch_project_id(self):
         self.config.project_name = 'Test Project'
@@ -42,6 +43,45 @@ class TestGitHubClient(unittest.TestCase):
         with self.assertRaises(Exception):
             self.client.fetch_project_id()
 
+    def test_fetch_project_id_cached(self):
+        self.config.project_name = 'Test Project'
+        cache = MagicMock()
+        cache.get.return_value = 'PVT_cached'
+        self.client._cache = cache
+        self.client.fetch_project_id()
+        self.assertEqual(self.config.project_id, 'PVT_cached')
+        self.client._client.execute.assert_not_called()
+
+        # Fetched again once the cache no longer holds it, e.g. by the next run of a daemon
+        self.client.reset()
+        cache.get.return_value = None
+        self.client._client.execute.return_value = {'data': {'repository': {'projectsV2': {
+            'nodes': [{'title': 'Test Project', 'id': '12345'}]}}}}
+        self.client.fetch_project_id()
+        self.assertEqual(self.config.project_id, '12345')
+        cache.set.assert_called_once_with(cache.get.call_args.args[0], '12345')
+
+    def test_reset(self):
+        self.client.add_issue(GitHubIssue(url='https://github.com/owner/repo/issues/1'))
+        self.client.reset()
+        self.assertFalse(self.client.has_issue(1))
+
+    def test_fetch_project_items_stale_project_id(self):
+        self.config.project_name = 'Test Project'
+        cache = MagicMock()
+        cache.get.return_value = 'PVT_stale'
+        self.client._cache = cache
+        self.client.fetch_project_id()
+        self.client._client.execute.side_effect = [
+            {'data': {'node': None}, 'errors': [{'type': 'NOT_FOUND'}]},
+            {'data': {'repository': {'projectsV2': {'nodes': [{'title': 'Test Project', 'id': '12345'}]}}}},
+            {'data': {'node': {'items': {'nodes': [], 'pageInfo': {'hasNextPage': False, 'endCursor': None}}}}},
+        ]
+        self.client.fetch_project_items()
+        self.assertEqual(self.config.project_id, '12345')
+        cache.invalidate.assert_called_once()
+        cache.set.assert_called_once_with(cache.get.call_args.args[0], '12345')
+
     def test_fetch_project_items(self):
         self.config.project_id = '12345'
         response = {
@@ -61,6 +101,45 @@ class TestGitHubClient(unittest.TestCase):
         self.client.fetch_project_items()
         self.assertEqual(len(self.client.epic_issues), 0)
 
+    def test_fetch_project_items_stopped(self):
+        self.config.project_id = '12345'
+        stop_event = threading.Event()
+        stop_event.set()
+        self.client.fetch_project_items(stop_event=stop_event)
+        self.client._client.execute.assert_not_called()
+
+    @staticmethod
+    def _epic_page(issue_number, has_next_page):
+        return {'data': {'node': {'items': {
+            'nodes': [{
+                'updatedAt': f'2024-10-0{issue_number}T10:00:00Z',
+                'content': {'url': f'https://github.com/owner/repo/issues/{issue_number}', 'title': 'Epic'},
+                'fieldValues': {'nodes': [{'__typename': 'ProjectV2ItemFieldSingleSelectValue',
+                                           'field': {'name': 'Issue Type'}, 'name': 'Epic'}]}}],
+            'pageInfo': {'hasNextPage': has_next_page, 'endCursor': 'cursor'}}}}}
+
+    def test_fetch_project_items_prefetch(self):
+        self.config.project_id = '12345'
+        self.config.prefetch_pages = True
+        self.client._client.execute.side_effect = [
+            self._epic_page(n, n < 3) for n in (1, 2, 3)]
+        self.client.fetch_project_items()
+        self.assertEqual([issue.issue_number for issue in self.client.epic_issues], [1, 2, 3])
+
+        stop_event = threading.Event()
+        stop_event.set()
+        self.client._client.execute.reset_mock()
+        self.client.fetch_project_items(stop_event=stop_event)
+        self.client._client.execute.assert_not_called()
+
+    def test_iter_project_issues(self):
+        page = self._epic_page
+        self.client._client.execute.side_effect = [page(1, True), page(2, False)]
+        pages = [[issue.issue_number for issue in issues] for issues in self.client.iter_project_issues()]
+        self.assertEqual(pages, [[1], [2]])
+        self.assertFalse(self.client.has_issue(1))
+        self.assertEqual(self.client.latest_update, '2024-10-02T10:00:00Z')
+
     def test_fetch_issue(self):
         issue_number = 1
         response = {
@@ -73,7 +152,7 @@ class TestGitHubClient(unittest.TestCase):
                                 {
                                     'fieldValues': {
                                         'nodes': [
-                                            {'field': {'name': 'Issue Type'},
+                                            {'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'Issue Type'},
                                                 'text': 'Epic'}
                                         ]
                                     }
@@ -89,13 +168,95 @@ class TestGitHubClient(unittest.TestCase):
         self.assertIsInstance(issue, GitHubIssue)
         self.assertEqual(issue.url, 'https://github.com/test/repo/issues/1')
 
+    def test_fetch_issues(self):
+        self.config.issue_batch_size = 2
+        self.client._query = GraphQLQuery(self.config)
+        self.client.add_issue(
+            GitHubIssue(url='https://github.com/test/repo/issues/1'))
+
+        def issue_node(issue_number):
+            return {
+                'url': f'https://github.com/test/repo/issues/{issue_number}',
+                'title': f'Issue {issue_number}',
+                'projectItems': {'nodes': []}
+            }
+
+        self.client._client.execute.side_effect = [
+            {'data': {'repository': {'issue_2': issue_node(2), 'issue_3': issue_node(3)}}},
+            {'data': {'repository': {'issue_4': None}},
+             'errors': [{'type': 'NOT_FOUND'}]},
+        ]
+        fetched = self.client.fetch_issues([1, 2, 3, 3, 4])
+
+        self.assertEqual(fetched, 2)
+        self.assertEqual(self.client._client.execute.call_count, 2)
+        first_query = self.client._client.execute.call_args_list[0].kwargs['query']
+        self.assertIn('issue_2: issue(number: 2)', first_query)
+        self.assertIn('issue_3: issue(number: 3)', first_query)
+        self.assertNotIn('issue(number: 1)', first_query)
+        self.assertEqual(self.client.get_issue(3).title, 'Issue 3')
+        self.assertFalse(self.client.has_issue(4))
+
+        # Not queried again, neither in bulk nor alone
+        self.assertTrue(self.client.issue_not_found(4))
+        self.assertEqual(self.client.fetch_issues([4]), 0)
+        self.assertIsNone(self.client.fetch_issue(4))
+        self.assertEqual(self.client._client.execute.call_count, 2)
+
+    def test_fetch_issue_not_found(self):
+        self.client._client.execute.return_value = {
+            'data': {'repository': {'issue': None}}, 'errors': [{'type': 'NOT_FOUND'}]}
+        self.assertIsNone(self.client.fetch_issue(7))
+        self.assertIsNone(self.client.fetch_issue(7))
+        self.client._client.execute.assert_called_once()
+        self.client.reset()
+        self.assertFalse(self.client.issue_not_found(7))
+
+    def test_fetch_issues_error(self):
+        self.client._query = GraphQLQuery(self.config)
+        self.client._client.execute.return_value = {
+            'errors': ['Some error']}
+        with self.assertRaises(Exception):
+            self.client.fetch_issues([1])
+
     def test_get_issue(self):
         issue_number = 1
         issue = GitHubIssue(
             url=f'https://github.com/test/repo/issues/{issue_number}')
-        self.client.epic_issues.append(issue)
+        self.assertTrue(self.client.add_issue(issue))
         found_issue = self.client.get_issue(issue_number)
         self.assertEqual(found_issue, issue)
+        self.assertIsNone(self.client.get_issue(2))
+
+    def test_add_issue_duplicate(self):
+        issue = GitHubIssue(url='https://github.com/test/repo/issues/1')
+        duplicate = GitHubIssue(url='https://github.com/test/repo/issues/1')
+        self.assertTrue(self.client.add_issue(issue))
+        self.assertFalse(self.client.add_issue(duplicate))
+        self.assertIs(self.client.get_issue(1), issue)
+        self.assertFalse(self.client.add_issue(GitHubIssue(url=None)))
+
+    def test_issue_numbers_updated_since(self):
+        for issue_number, updated_at in [(1, '2024-10-01T10:00:00Z'), (2, '2024-10-03T10:00:00Z'), (3, None)]:
+            issue = GitHubIssue(
+                url=f'https://github.com/test/repo/issues/{issue_number}')
+            issue.updated_at = updated_at
+            self.client.add_issue(issue)
+        self.assertEqual(self.client.issue_numbers_updated_since(
+            '2024-10-02T00:00:00Z'), [2])
+        self.assertEqual(self.client.latest_update, '2024-10-03T10:00:00Z')
+
+    def test_has_issue(self):
+        self.assertFalse(self.client.has_issue(1))
+        self.client.add_issue(
+            GitHubIssue(url='https://github.com/test/repo/issues/1'))
+        self.assertTrue(self.client.has_issue(1))
+
+    def test_fetch_issue_from_index(self):
+        issue = GitHubIssue(url='https://github.com/test/repo/issues/1')
+        self.client.add_issue(issue)
+        self.assertIs(self.client.fetch_issue(1), issue)
+        self.client._client.execute.assert_not_called()
 
     def test_handle_issues_data(self):
         def make_issue(issue_number, is_epic):
@@ -105,7 +266,7 @@ class TestGitHubClient(unittest.TestCase):
                 },
                 'fieldValues': {
                     'nodes': [
-                        {'field': {'name': 'Issue Type'}, 'text': (
+                        {'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'Issue Type'}, 'text': (
                             'Epic' if is_epic else 'Task')}
                     ]
                 }
@@ -126,6 +287,11 @@ class TestGitHubClient(unittest.TestCase):
         self.assertIn(2, epic_issue_numbers)
         self.assertIn(4, epic_issue_numbers)
         self.assertIn(6, epic_issue_numbers)
+        self.assertFalse(self.client.has_issue(1))
+
+        # Items seen again on a later page are not indexed twice
+        self.client._handle_issues_data([make_issue(2, True)])
+        self.assertEqual(len(self.client.epic_issues), 3)
 
 
 if __name__ == '__main__':
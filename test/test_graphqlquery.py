@@ -0,0 +1,60 @@
+import unittest
+from src.airtable_sync.github.config import GitHubConfig
+from src.airtable_sync.github.graphqlquery import GraphQLQuery
+
+
+class TestGraphQLQuery(unittest.TestCase):
+
+    def make_query(self, field_map: dict, **options) -> GraphQLQuery:
+        config = GitHubConfig({
+            "owner": "owner",
+            "repo": "repo",
+            "token": "fake_token",
+            "fieldMap": field_map,
+            **options
+        })
+        config.project_id = 'PVT_1'
+        return GraphQLQuery(config)
+
+    def test_issues_projected(self):
+        query = self.make_query({"Start Date": "Engineering Start Date"}).issues(
+            after_cursor='abc', page_size=50)
+        self.assertIn('items(first: 50, after: "abc")', query)
+        for field in ('title', 'url', 'updatedAt', 'fieldValues(first: 20)', '__typename'):
+            self.assertIn(field, query)
+        for field in ('body', 'assignees', 'labels', 'state', 'closedAt'):
+            self.assertNotIn(field, query)
+
+    def test_issues_mapped_issue_fields(self):
+        query = self.make_query({"Body": "Description", "Closed At": "Closed"}).issues(
+            after_cursor='abc')
+        self.assertIn('body', query)
+        self.assertIn('closedAt', query)
+        self.assertNotIn('state', query)
+
+    def test_issue_projected(self):
+        query = self.make_query({}).issue(7)
+        self.assertIn('issue(number: 7)', query)
+        self.assertIn('projectItems(first: 1)', query)
+        self.assertNotIn('body', query)
+
+    def test_issues_field_values_by_name(self):
+        query = self.make_query(
+            {"Start Date": "Engineering Start Date", "Size": "Size"},
+            fieldValuesByName=True, issueTypeField="Issue type").issues(after_cursor='abc')
+        self.assertNotIn('fieldValues(first:', query)
+        self.assertIn('fieldValue_0: fieldValueByName(name: "Issue type")', query)
+        self.assertIn('fieldValue_1: fieldValueByName(name: "Start Date")', query)
+        self.assertIn('fieldValue_2: fieldValueByName(name: "Size")', query)
+
+        query = self.make_query({}, fieldValuesByName=True).issue(7)
+        self.assertIn('fieldValue_0: fieldValueByName(name: "Issue Type")', query)
+
+    def test_issues_by_number(self):
+        query = self.make_query({}).issues_by_number([3, 5])
+        self.assertIn('issue_3: issue(number: 3)', query)
+        self.assertIn('issue_5: issue(number: 5)', query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,8 @@
 import unittest
-from src.airtable_sync.github.issue import FieldType, GitHubIssue
+from src.airtable_sync.github.issue import GitHubIssue
 from datetime import datetime
 
 
-class TestFieldType(unittest.TestCase):
-    def test_field_type_enum(self):
-        self.assertEqual(FieldType.Text.value, "TEXT")
-        self.assertEqual(FieldType.Number.value, "NUMBER")
-        self.assertEqual(FieldType.Date.value, "DATE")
-        self.assertEqual(FieldType.SingleSelect.value, "SINGLE_SELECT")
-        self.assertEqual(FieldType.Iteration.value, "ITERATION")
-
-
 class TestGitHubIssue(unittest.TestCase):
     def setUp(self):
         self.issue = GitHubIssue(url="https://github.com/user/repo/issues/1")
@@ -34,9 +25,9 @@ class TestGitHubIssue(unittest.TestCase):
         fields = {
             'fieldValues': {
                 'nodes': [
-                    {'field': {'name': 'Priority'}, 'text': 'High'},
-                    {'field': {'name': 'Estimate'}, 'number': 5},
-                    {'field': {'name': 'Due Date'}, 'date': '2023-10-01'}
+                    {'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'Priority'}, 'text': 'High'},
+                    {'__typename': 'ProjectV2ItemFieldNumberValue', 'field': {'name': 'Estimate'}, 'number': 5},
+                    {'__typename': 'ProjectV2ItemFieldDateValue', 'field': {'name': 'Due Date'}, 'date': '2023-10-01'}
                 ]
             }
         }
@@ -50,6 +41,39 @@ class TestGitHubIssue(unittest.TestCase):
         self.assertEqual(self.issue.fields['due_date'], datetime.strptime(
             '2023-10-01', '%Y-%m-%d'))
 
+    def test_load_fields_updated_at(self):
+        base_data = {'url': 'https://github.com/user/repo/issues/2',
+                     'updatedAt': '2024-10-01T10:00:00Z'}
+        fields = {'updatedAt': '2024-10-02T10:00:00Z',
+                  'fieldValues': {'nodes': []}}
+        self.issue.load_fields(base_data, fields)
+        self.assertEqual(self.issue.updated_at, '2024-10-02T10:00:00Z')
+
+        self.issue.load_fields({}, {})
+        self.assertIsNone(self.issue.updated_at)
+
+    def test_load_fields_issue_fields(self):
+        base_data = {'url': 'https://github.com/user/repo/issues/2',
+                     'state': 'CLOSED', 'closedAt': '2024-10-01T10:00:00Z'}
+        self.issue.load_fields(base_data, {'fieldValues': {'nodes': []}})
+        self.assertEqual(self.issue.fields['state'], 'CLOSED')
+        self.assertEqual(self.issue.fields['closed_at'], '2024-10-01T10:00:00Z')
+        self.assertNotIn('body', self.issue.fields)
+
+    def test_load_fields_by_name(self):
+        fields = {
+            'updatedAt': '2024-10-02T10:00:00Z',
+            'fieldValue_0': {'__typename': 'ProjectV2ItemFieldSingleSelectValue',
+                             'field': {'name': 'Issue Type'}, 'name': 'Epic'},
+            'fieldValue_1': {'__typename': 'ProjectV2ItemFieldDateValue',
+                             'field': {'name': 'Start Date'}, 'date': '2023-10-01'},
+            'fieldValue_2': None,
+        }
+        self.issue.load_fields({'title': 'Issue title'}, fields)
+        self.assertTrue(self.issue.is_epic)
+        self.assertEqual(self.issue.fields['start_date'], datetime(2023, 10, 1))
+        self.assertEqual(len(self.issue.fields), 2)
+
     def test_is_epic(self):
         self.issue.fields['issue_type'] = 'Epic'
         self.assertTrue(self.issue.is_epic)
@@ -79,31 +103,50 @@ class TestGitHubIssue(unittest.TestCase):
         issue = GitHubIssue(url=None)
         self.assertEqual(issue.issue_number, None)
 
+    def test_issue_number_follows_url(self):
+        self.issue.load_fields({'url': 'https://github.com/user/repo/issues/2'}, {})
+        self.assertEqual(self.issue.issue_number, 2)
+        self.issue._handle_field_values([{'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'URL'},
+                                          'text': 'https://github.com/user/repo/issues/3'}])
+        self.assertEqual(self.issue.issue_number, 3)
+        self.assertFalse(hasattr(self.issue, '__dict__'))
+
+    def test_single_select_interned(self):
+        issue = GitHubIssue(url="https://github.com/user/repo/issues/2")
+        for target in (self.issue, issue):
+            target._handle_field_values([{'__typename': 'ProjectV2ItemFieldSingleSelectValue',
+                                          'field': {'name': 'Status'}, 'name': ''.join(['In ', 'progress'])}])
+        self.assertIs(self.issue.fields['status'], issue.fields['status'])
+
     def test_parse_date(self):
         self.assertEqual(self.issue._parse_date('2023-10-01'),
                          datetime(2023, 10, 1))
 
         self.assertIsNone(self.issue._parse_date('2023-10.01'))
 
-    def test_map_field_value(self):
-        self.assertEqual(self.issue._map_field_value(
-            FieldType.Text, 'value'), 'value')
-        self.assertEqual(self.issue._map_field_value(
-            FieldType.Number, 5), 5)
-        self.assertEqual(self.issue._map_field_value(
-            FieldType.Date, '2023-10-01'), datetime(2023, 10, 1))
-        self.assertEqual(self.issue._map_field_value(
-            FieldType.SingleSelect, 'value'), 'value')
-        self.assertEqual(self.issue._map_field_value(
-            FieldType.Iteration, 'value'), 'value')
+    def test_field_value_decoders(self):
+        field_values = [
+            {'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'Text'}, 'text': 'value'},
+            {'__typename': 'ProjectV2ItemFieldNumberValue', 'field': {'name': 'Number'}, 'number': 5},
+            {'__typename': 'ProjectV2ItemFieldDateValue', 'field': {'name': 'Date'}, 'date': '2023-10-01'},
+            {'__typename': 'ProjectV2ItemFieldSingleSelectValue', 'field': {'name': 'Select'}, 'name': 'value'},
+            {'__typename': 'ProjectV2ItemFieldIterationValue', 'field': {'name': 'Iteration'},
+             'title': 'value', 'startDate': '2023-10-01', 'duration': 14},
+        ]
+        self.issue._handle_field_values(field_values)
+        self.assertEqual(self.issue.fields, {
+            'text': 'value', 'number': 5.0, 'date': datetime(2023, 10, 1), 'select': 'value',
+            'iteration': 'value(2023-10-01 - 14)'})
+        self.assertIsInstance(self.issue.fields['number'], float)
 
     def test_handle_field_values(self):
         field_values = [
-            {'field': {'name': 'Priority'}, 'text': 'High'},
-            {'field': {'name': 'Estimate'}, 'number': 5},
-            {'field': {'name': 'Due Date'}, 'date': '2023-10-01'},
-            {'field': {'name': 'Issue type'}, 'name': 'Epic'},
-            {'field': {'name': 'Stroll'}, 'title': 'w32',
+            {'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'Priority'}, 'text': 'High'},
+            {'__typename': 'ProjectV2ItemFieldNumberValue', 'field': {'name': 'Estimate'}, 'number': 5},
+            {'__typename': 'ProjectV2ItemFieldDateValue', 'field': {'name': 'Due Date'}, 'date': '2023-10-01'},
+            {'__typename': 'ProjectV2ItemFieldSingleSelectValue', 'field': {'name': 'Issue type'},
+             'name': 'Epic'},
+            {'__typename': 'ProjectV2ItemFieldIterationValue', 'field': {'name': 'Stroll'}, 'title': 'w32',
                 'startDate': '2023-10-01', 'duration': '2 weeks'},
             {'field': {'name': 'Unknown'}, 'temp': 1},
             {'field': {'alias': 'Tower'}, 'text': 'High'},
@@ -119,24 +162,45 @@ class TestGitHubIssue(unittest.TestCase):
         self.assertIsNone(self.issue.fields['unknown'])
         self.assertIsNone(self.issue.fields.get('tower'))
 
-    def test_add_field(self):
-        self.issue._add_field('Priority', 'High', FieldType.Text)
-        self.assertEqual(self.issue.fields['priority'], 'High')
-
-        self.issue._add_field('Estimate', 5, FieldType.Number)
-        self.assertEqual(self.issue.fields['estimate'], 5)
-
-        self.issue._add_field('Due Date', '2023-10-01', FieldType.Date)
-        self.assertEqual(self.issue.fields['due_date'], datetime.strptime(
-            '2023-10-01', '%Y-%m-%d'))
-
-        self.issue._add_field('Issue type', 'Epic', FieldType.SingleSelect)
-        self.assertEqual(self.issue.fields['issue_type'], 'Epic')
+    def test_handle_field_values_by_typename(self):
+        field_values = [
+            {'__typename': 'ProjectV2ItemFieldSingleSelectValue', 'field': {'name': 'Team'}, 'name': 'Core'},
+            {'__typename': 'ProjectV2ItemFieldIterationValue', 'field': {'name': 'Sprint'},
+             'title': 'w32', 'startDate': '2023-10-01', 'duration': 14},
+            {'__typename': 'ProjectV2ItemFieldDateValue', 'field': {'name': 'Due Date'}, 'date': '2023-10-01'},
+            {'__typename': 'ProjectV2ItemFieldLabelValue'},
+        ]
+        self.issue._handle_field_values(field_values)
+        self.assertEqual(self.issue.fields, {
+            'team': 'Core', 'sprint': 'w32(2023-10-01 - 14)', 'due_date': datetime(2023, 10, 1)})
 
-        self.issue._add_field('title', 'value', FieldType.Text)
+    def test_handle_field_values_unsupported(self):
+        GitHubIssue._unsupported_typenames.clear()
+        field_values = [
+            {'field': {'name': 'Priority'}, 'text': 'High'},
+            {'__typename': 'ProjectV2ItemFieldUserValue', 'field': {'name': 'Owner'}, 'users': {}},
+            {'__typename': 'ProjectV2ItemFieldUserValue', 'field': {'name': 'Reviewer'}, 'users': {}},
+        ]
+        with self.assertLogs('src.airtable_sync.github.issue', level='WARNING') as logs:
+            self.issue._handle_field_values(field_values)
+            self.issue._handle_field_values(field_values)
+        self.assertEqual(self.issue.fields, {'priority': None, 'owner': None, 'reviewer': None})
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('ProjectV2ItemFieldUserValue', logs.output[1])
+
+    def test_map_field_name(self):
+        self.assertEqual(GitHubIssue._map_field_name('Start-Date Time'), 'start_date_time')
+        self.assertIs(GitHubIssue._map_field_name('Start-Date Time'),
+                      GitHubIssue._map_field_name(''.join(['Start-Date', ' Time'])))
+
+    def test_handle_field_values_title_url(self):
+        self.issue._handle_field_values([
+            {'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'Priority'}, 'text': 'High'},
+            {'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'title'}, 'text': 'value'},
+            {'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'url'}, 'text': 'http://'},
+        ])
+        self.assertEqual(self.issue.fields, {'priority': 'High'})
         self.assertEqual(self.issue.title, 'value')
-
-        self.issue._add_field('url', 'http://', FieldType.Text)
         self.assertEqual(self.issue.url, 'http://')
 
 
@@ -10,23 +10,42 @@ class TestMain(unittest.TestCase):
     def test_parse_arguments(self, mock_parse_args):
         mock_parse_args.return_value = argparse.Namespace(
             debug=True, verbose=False, info=False, warning=False)
-        self.assertEqual(parse_arguments(), 'debug')
+        self.assertEqual(parse_arguments(), ('debug', False, None))
 
         mock_parse_args.return_value = argparse.Namespace(
             debug=False, verbose=True, info=False, warning=False)
-        self.assertEqual(parse_arguments(), 'verbose')
+        self.assertEqual(parse_arguments(), ('verbose', False, None))
 
         mock_parse_args.return_value = argparse.Namespace(
             debug=False, verbose=False, info=True, warning=False)
-        self.assertEqual(parse_arguments(), 'info')
+        self.assertEqual(parse_arguments(), ('info', False, None))
 
         mock_parse_args.return_value = argparse.Namespace(
             debug=False, verbose=False, info=False, warning=True)
-        self.assertEqual(parse_arguments(), 'warning')
+        self.assertEqual(parse_arguments(), ('warning', False, None))
 
         mock_parse_args.return_value = argparse.Namespace(
             debug=False, verbose=False, info=False, warning=False)
-        self.assertEqual(parse_arguments(), 'error')
+        self.assertEqual(parse_arguments(), ('error', False, None))
+
+        mock_parse_args.return_value = argparse.Namespace(
+            debug=False, verbose=True, info=False, warning=False, async_log=True)
+        self.assertEqual(parse_arguments(), ('verbose', True, None))
+
+        mock_parse_args.return_value = argparse.Namespace(
+            debug=False, verbose=False, info=False, warning=False, daemon=True, interval=60.0)
+        self.assertEqual(parse_arguments(), ('error', False, 60.0))
+
+        mock_parse_args.return_value = argparse.Namespace(
+            debug=False, verbose=False, info=False, warning=False, daemon=True, interval=None)
+        self.assertEqual(parse_arguments(), ('error', False, 3600))
+
+    @patch('argparse.ArgumentParser.parse_args')
+    def test_parse_arguments_interval_without_daemon(self, mock_parse_args):
+        mock_parse_args.return_value = argparse.Namespace(
+            debug=False, verbose=False, info=False, warning=False, daemon=False, interval=60.0)
+        with patch('sys.stderr'), self.assertRaises(SystemExit):
+            parse_arguments()
 
     @patch('os.path.isfile')
     @patch('os.getcwd')
@@ -57,7 +76,8 @@ class TestMain(unittest.TestCase):
     @patch('src.airtable_sync.main.AirtableConfig')
     @patch('src.airtable_sync.main.GitHubConfig')
     @patch('src.airtable_sync.main.AirtableSync')
-    def test_main(self, mock_airtable_sync, mock_github_config, mock_airtable_config, mock_get_config_file_path, mock_setup_logging, mock_json_load, mock_open):
+    @patch('src.airtable_sync.main.SyncConfig')
+    def test_main(self, mock_sync_config, mock_airtable_sync, mock_github_config, mock_airtable_config, mock_get_config_file_path, mock_setup_logging, mock_json_load, mock_open):
         mock_get_config_file_path.return_value = '/path/to/config.json'
         mock_json_load.return_value = {'airtable': {}, 'github': {}}
 
@@ -67,15 +87,53 @@ class TestMain(unittest.TestCase):
         with patch('argparse.ArgumentParser.parse_args', return_value=argparse.Namespace(debug=True)):
             main()
 
-        mock_setup_logging.assert_called_once_with('debug')
+        mock_setup_logging.assert_called_once_with('debug', queued=False)
         mock_open.assert_called_once_with('/path/to/config.json')
         mock_json_load.assert_called_once()
         mock_airtable_config.assert_called_once_with({})
         mock_github_config.assert_called_once_with({})
+        mock_sync_config.assert_called_once_with(None)
         mock_airtable_sync.assert_called_once_with(
-            mock_airtable_config(), mock_github_config())
+            mock_airtable_config(), mock_github_config(), mock_sync_config())
         mock_airtable_sync_instance.sync.assert_called_once()
 
+    @patch('builtins.open', new_callable=mock_open)
+    @patch('json.load', return_value={'airtable': {}, 'github': {}, 'sync': {}})
+    @patch('src.airtable_sync.main.CustomLogger.setup_logging')
+    @patch('src.airtable_sync.main.get_config_file_path')
+    @patch('src.airtable_sync.main.AirtableConfig')
+    @patch('src.airtable_sync.main.GitHubConfig')
+    @patch('src.airtable_sync.main.AirtableSync')
+    @patch('src.airtable_sync.main.SyncDaemon')
+    def test_main_daemon(self, mock_daemon, mock_airtable_sync, *mocks):
+        args = argparse.Namespace(debug=False, verbose=False, info=False, warning=False, daemon=True, interval=60.0)
+        with patch('argparse.ArgumentParser.parse_args', return_value=args):
+            main()
+
+        sync_config = mock_airtable_sync.call_args.args[2]
+        self.assertTrue(sync_config.incremental)
+        self.assertEqual(sync_config.cache_ttl, 24)
+        mock_daemon.assert_called_once_with(mock_airtable_sync.return_value.sync, 60.0)
+        mock_daemon.return_value.run_forever.assert_called_once()
+        mock_airtable_sync.return_value.sync.assert_not_called()
+
+    @patch('builtins.open', new_callable=mock_open)
+    @patch('json.load', return_value={'airtable': {}, 'github': {}, 'sync': {'cacheTtlHours': 0}})
+    @patch('src.airtable_sync.main.CustomLogger.setup_logging')
+    @patch('src.airtable_sync.main.get_config_file_path')
+    @patch('src.airtable_sync.main.AirtableConfig')
+    @patch('src.airtable_sync.main.GitHubConfig')
+    @patch('src.airtable_sync.main.AirtableSync')
+    @patch('src.airtable_sync.main.SyncDaemon')
+    def test_main_daemon_cache_disabled(self, mock_daemon, mock_airtable_sync, *mocks):
+        args = argparse.Namespace(debug=False, verbose=False, info=False, warning=False, daemon=True, interval=60.0)
+        with patch('argparse.ArgumentParser.parse_args', return_value=args), \
+                self.assertLogs('src.airtable_sync.main', level='WARNING') as logs:
+            main()
+
+        self.assertEqual(mock_airtable_sync.call_args.args[2].cache_ttl, 0)
+        self.assertIn('cacheTtlHours is 0', logs.output[0])
+
 
 if __name__ == '__main__':
     unittest.main()
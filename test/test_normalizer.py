@@ -0,0 +1,52 @@
+import unittest
+from datetime import datetime, timezone
+from pyairtable.models.schema import parse_field_schema
+from src.airtable_sync.airtable.normalizer import ValueNormalizer
+
+
+class TestValueNormalizer(unittest.TestCase):
+
+    @staticmethod
+    def normalizer(field_type: str, options: dict = None):
+        schema = {'id': 'fld1', 'name': 'Field', 'type': field_type}
+        if options is not None:
+            schema['options'] = options
+        return ValueNormalizer.for_field(parse_field_schema(schema))
+
+    def test_number(self):
+        normalize = self.normalizer('number', {'precision': 1})
+        self.assertEqual(normalize(5.04), 5)
+        self.assertIsInstance(normalize(5.0), int)
+        self.assertEqual(normalize(5.26), 5.3)
+        self.assertIsNone(normalize(None))
+        self.assertEqual(self.normalizer('percent', {'precision': 0})(0.504), 0.5)
+        self.assertEqual(self.normalizer('rating', {'max': 5, 'icon': 'star', 'color': 'yellowBright'})(3.0), 3)
+
+    def test_date(self):
+        normalize = self.normalizer('date', {'dateFormat': {'name': 'iso', 'format': 'YYYY-MM-DD'}})
+        self.assertEqual(normalize(datetime(2024, 10, 1)), '2024-10-01')
+        self.assertEqual(normalize('2024-10-01T10:00:00Z'), '2024-10-01')
+        self.assertEqual(normalize('next week'), 'next week')
+
+    def test_date_time(self):
+        normalize = ValueNormalizer.date_time
+        self.assertEqual(normalize('2024-10-01T10:00:00Z'), '2024-10-01T10:00:00.000Z')
+        self.assertEqual(normalize('2024-10-01T10:00:00.000Z'), '2024-10-01T10:00:00.000Z')
+        self.assertEqual(normalize('2024-10-01T12:00:00+02:00'), '2024-10-01T10:00:00.000Z')
+        self.assertEqual(normalize(datetime(2024, 10, 1)), '2024-10-01T00:00:00.000Z')
+        self.assertEqual(normalize(datetime(2024, 10, 1, tzinfo=timezone.utc)), '2024-10-01T00:00:00.000Z')
+
+    def test_text_and_select(self):
+        self.assertEqual(ValueNormalizer.text('a\r\nb'), 'a\nb')
+        self.assertEqual(ValueNormalizer.text(datetime(2024, 10, 1)), '2024-10-01')
+        self.assertEqual(ValueNormalizer.single_select(' Done '), 'Done')
+        self.assertFalse(ValueNormalizer.checkbox(None))
+
+    def test_unknown_type(self):
+        normalize = ValueNormalizer.for_field(None)
+        self.assertEqual(normalize(datetime(2024, 10, 1)), '2024-10-01')
+        self.assertEqual(normalize(5.0), 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import threading
+import unittest
+from src.airtable_sync.pipeline import Prefetcher
+
+
+class TestPrefetcher(unittest.TestCase):
+
+    def test_items_in_order(self):
+        with Prefetcher(lambda stop_event: iter(range(10)), maxsize=2) as items:
+            self.assertEqual(list(items), list(range(10)))
+
+    def test_backpressure(self):
+        produced = []
+
+        def source(stop_event):
+            for i in range(10):
+                produced.append(i)
+                yield i
+
+        with Prefetcher(source, maxsize=2) as items:
+            iterator = iter(items)
+            self.assertEqual(next(iterator), 0)
+            # Item 0 consumed, 2 buffered, and the producer waiting to put the next one
+            threading.Event().wait(0.3)
+            self.assertLessEqual(len(produced), 4)
+
+    def test_error(self):
+        def source(stop_event):
+            yield 1
+            raise ValueError("page failed")
+
+        with self.assertRaisesRegex(ValueError, "page failed"):
+            with Prefetcher(source) as items:
+                list(items)
+
+    def test_stop_early(self):
+        def source(stop_event):
+            i = 0
+            while True:
+                yield i
+                i += 1
+
+        with Prefetcher(source) as prefetcher:
+            for item in prefetcher:
+                if item == 3:
+                    break
+        self.assertFalse(prefetcher._producer.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+import requests
+from src.airtable_sync.github.rate_limit import RateLimitScheduler
+
+
+def rate_limit_response(remaining, cost=1, limit=5000, reset_at=1000):
+    reset_at = datetime.fromtimestamp(reset_at, timezone.utc).isoformat().replace('+00:00', 'Z')
+    return {'data': {'rateLimit': {
+        'limit': limit, 'cost': cost, 'remaining': remaining, 'resetAt': reset_at}}}
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.sleeps = []
+
+        def sleep(delay):
+            self.sleeps.append(delay)
+            self.now += delay
+
+        self.transport = MagicMock()
+        self.scheduler = RateLimitScheduler(
+            self.transport, reserve=100, sleep=sleep, clock=lambda: self.now)
+
+    def test_tracks_budget(self):
+        self.transport.execute.return_value = rate_limit_response(4990, cost=2)
+        self.scheduler.execute('query')
+        self.scheduler.execute('query')
+        self.assertEqual(self.scheduler.remaining, 4990)
+        self.assertEqual(self.scheduler.used, 4)
+        self.assertEqual(self.scheduler.reset_at, 1000)
+        self.assertEqual(self.sleeps, [])
+        self.assertIn("4 point(s) used by 2 request(s), 4990/5000 left", str(self.scheduler))
+
+    def test_summary_since(self):
+        self.transport.execute.return_value = rate_limit_response(4990, cost=2)
+        self.scheduler.execute('query')
+        counters = self.scheduler.counters()
+        self.scheduler.execute('query')
+        self.assertIn("2 point(s) used by 1 request(s), 4990/5000 left", self.scheduler.summary(since=counters))
+        self.assertIn("4 point(s) used by 2 request(s)", self.scheduler.summary())
+
+    def test_waits_for_reset(self):
+        self.transport.execute.return_value = rate_limit_response(100)
+        self.scheduler.execute('query')
+        self.scheduler.execute('query')
+        self.assertEqual(self.sleeps, [1000])
+        self.assertEqual(self.scheduler.waited, 1000)
+
+    def test_paces_low_budget(self):
+        # 300 points left below the 10% threshold, 200 usable before the reserve, 1000s to reset
+        self.transport.execute.return_value = rate_limit_response(300)
+        self.scheduler.execute('query')
+        self.scheduler.execute('query')
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertAlmostEqual(self.sleeps[0], 5.0)
+
+    def test_min_interval(self):
+        self.scheduler.min_interval = 0.5
+        self.transport.execute.return_value = {'data': {}}
+        self.scheduler.execute('query')
+        self.scheduler.execute('query')
+        self.assertEqual(self.sleeps, [0.5])
+
+    def test_page_size(self):
+        self.assertEqual(self.scheduler.page_size(100), 100)
+        self.transport.execute.return_value = rate_limit_response(130, cost=2)
+        self.scheduler.execute('query')
+        self.scheduler.record_page(50)
+        # 30 points above the reserve at 0.04 points per item
+        self.assertEqual(self.scheduler.page_size(100), 100)
+        self.scheduler.remaining = 101
+        self.assertEqual(self.scheduler.page_size(100), 25)
+        self.scheduler.remaining = 100
+        self.assertEqual(self.scheduler.page_size(100), RateLimitScheduler.MIN_PAGE_SIZE)
+
+    def test_secondary_rate_limit_retry(self):
+        response = MagicMock(status_code=403, headers={'Retry-After': '30'})
+        self.transport.execute.side_effect = [
+            requests.HTTPError(response=response), rate_limit_response(4000)]
+        self.assertEqual(self.scheduler.execute('query'), rate_limit_response(4000))
+        self.assertEqual(self.sleeps, [30.0])
+
+    def test_http_error_not_retried(self):
+        response = MagicMock(status_code=502, headers={})
+        self.transport.execute.side_effect = requests.HTTPError(response=response)
+        with self.assertRaises(requests.HTTPError):
+            self.scheduler.execute('query')
+        self.assertEqual(self.transport.execute.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -31,6 +31,19 @@ class TestAirtableRecord(unittest.TestCase):
     def test_repo_name(self):
         self.assertEqual(self.record.repo_name, "repo")
 
+    def test_keys_follow_committed_fields(self):
+        self.record.set_fields({"Issue Number": 2})
+        self.record.commit_changes({"id": "rec123", "fields": {"Issue Number": 2}})
+        self.assertEqual(self.record.issue_number, 2)
+        self.assertEqual(AirtableRecord({"id": "rec1", "fields": {}}).issue_number, None)
+        with self.assertRaises(ValueError):
+            AirtableRecord({"id": "rec1", "fields": {"Issue Link": "https://github.com/test/repo"}}).repo_name
+
+    def test_stage_field_number(self):
+        self.record.stage_field("Estimate", 5.5, 5)
+        self.record.stage_field("Title", 5, "Test Issue")
+        self.assertEqual(self.record.updated_fields, {"id": "rec123", "fields": {"Estimate": 5.5}})
+
     def test_updated_fields(self):
         self.assertEqual(self.record.updated_fields, {
                          "id": "rec123", "fields": {}})
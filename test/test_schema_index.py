@@ -0,0 +1,36 @@
+import unittest
+from unittest.mock import MagicMock
+from src.airtable_sync.airtable.schema_index import TableSchemaIndex
+
+
+class TestTableSchemaIndex(unittest.TestCase):
+
+    def setUp(self):
+        def field_schema(id, name, type):
+            field = MagicMock(id=id, type=type)
+            field.name = name
+            return field
+        self.title = field_schema('fld1', 'Title', 'singleLineText')
+        self.start_date = field_schema('fld2', 'Start Date', 'date')
+        self.index = TableSchemaIndex(
+            MagicMock(fields=[self.title, self.start_date]))
+
+    def test_contains(self):
+        self.assertIn('Title', self.index)
+        self.assertNotIn('Priority', self.index)
+
+    def test_field_types(self):
+        self.assertEqual(self.index.field_types, {
+                         'Title': 'singleLineText', 'Start Date': 'date'})
+
+    def test_field_by_name(self):
+        self.assertIs(self.index.field_by_name('Start Date'), self.start_date)
+        self.assertIsNone(self.index.field_by_name('Priority'))
+
+    def test_field_by_id(self):
+        self.assertIs(self.index.field_by_id('fld1'), self.title)
+        self.assertIsNone(self.index.field_by_id('fld3'))
+
+
+if __name__ == '__main__':
+    unittest.main()
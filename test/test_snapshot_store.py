@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from src.airtable_sync.snapshot_store import SnapshotStore
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'state', 'snapshot.db')
+        self.field_map = {'status': 'Status'}
+        self.store = SnapshotStore(self.path, 'key', self.field_map)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_put_and_load(self):
+        self.store.put(1, 'g1', 'a1')
+        self.store.put(2, 'g2', 'a2')
+        self.assertEqual(self.store.load(), {})
+        self.store.commit()
+        self.store.put(2, 'g2b', 'a2b')
+        self.store.commit()
+
+        other = SnapshotStore(self.path, 'other', self.field_map)
+        other.put(1, 'x', 'y')
+        other.commit()
+        other.close()
+
+        self.store.close()
+        self.assertEqual(self.store.load(), {1: ('g1', 'a1'), 2: ('g2b', 'a2b')})
+
+    def test_compact(self):
+        for issue_number in (1, 2, 3):
+            self.store.put(issue_number, 'g', 'a')
+        self.store.commit()
+        self.assertEqual(self.store.compact({1, 3}), 1)
+        self.assertEqual(set(self.store.load()), {1, 3})
+        self.assertEqual(self.store.compact({1, 3}), 0)
+
+    def test_rebuild(self):
+        self.store.put(1, 'g', 'a')
+        self.store.commit()
+        self.store.rebuild()
+        self.assertEqual(self.store.load(), {})
+
+    def test_field_map_changed(self):
+        self.store.put(1, 'g', 'a')
+        self.store.commit()
+        self.store.close()
+        store = SnapshotStore(self.path, 'key', {'status': 'Status', 'priority': 'Priority'})
+        self.assertEqual(store.load(), {})
+        store.close()
+
+    def test_unreadable_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as file:
+            file.write('not a database' * 100)
+        self.store.put(1, 'g', 'a')
+        self.store.commit()
+        self.assertEqual(self.store.load(), {1: ('g', 'a')})
+        self.assertIsInstance(self.store.connection, sqlite3.Connection)
+
+    def test_hash_values(self):
+        self.assertEqual(SnapshotStore.hash_values({'a': 1, 'b': 2}), SnapshotStore.hash_values({'b': 2, 'a': 1}))
+        self.assertNotEqual(SnapshotStore.hash_values({'a': 1}), SnapshotStore.hash_values({'a': 2}))
+
+
+if __name__ == '__main__':
+    unittest.main()
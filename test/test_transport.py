@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import MagicMock
+import requests
+from src.airtable_sync.github.transport import GraphQLTransport, TransportStats
+
+
+class TestGraphQLTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = GraphQLTransport(
+            endpoint='https://api.github.com/graphql',
+            headers={'Authorization': 'Bearer fake_token'},
+            pool_size=2, connect_timeout=1, read_timeout=2)
+        self.response = MagicMock()
+        self.response.content = b'{"data": {}}'
+        self.response.raw.tell.return_value = 8
+        self.response.json.return_value = {'data': {}}
+        self.transport.session.post = MagicMock(return_value=self.response)
+
+    def test_session_headers(self):
+        headers = self.transport.session.headers
+        self.assertEqual(headers['Authorization'], 'Bearer fake_token')
+        self.assertIn('gzip', headers['Accept-Encoding'])
+
+    def test_pooled_adapter(self):
+        adapter = self.transport.session.get_adapter('https://api.github.com/graphql')
+        self.assertEqual(adapter._pool_maxsize, 2)
+        pool_class = adapter.poolmanager.pool_classes_by_scheme['https']
+        self.assertEqual(pool_class.ConnectionCls.__name__, 'TimedHTTPSConnection')
+
+    def test_execute(self):
+        result = self.transport.execute('query { viewer { login } }', {'a': 1})
+        self.assertEqual(result, {'data': {}})
+        self.transport.session.post.assert_called_once_with(
+            'https://api.github.com/graphql',
+            json={'query': 'query { viewer { login } }', 'variables': {'a': 1}},
+            timeout=(1, 2))
+        self.assertEqual(self.transport.stats.requests, 1)
+        self.assertEqual(self.transport.stats.response_bytes, 12)
+        self.assertEqual(self.transport.stats.wire_bytes, 8)
+
+    def test_execute_http_error(self):
+        self.response.raise_for_status.side_effect = requests.HTTPError('502')
+        with self.assertRaises(requests.HTTPError):
+            self.transport.execute('query { viewer { login } }')
+
+
+class TestTransportStats(unittest.TestCase):
+
+    def test_str(self):
+        stats = TransportStats()
+        stats.add_connection(0.1)
+        stats.add_request(100, 40)
+        stats.add_request(100, 40)
+        self.assertEqual(
+            str(stats),
+            "2 request(s) over 1 connection(s), connect+TLS 100ms total (100ms avg), "
+            "80 bytes received for 200 bytes of response")
+
+    def test_summary_since(self):
+        stats = TransportStats()
+        stats.add_connection(0.1)
+        stats.add_request(100, 40)
+        counters = stats.counters()
+        stats.add_request(50, 20)
+        self.assertEqual(
+            stats.summary(since=counters),
+            "1 request(s) over 0 connection(s), connect+TLS 0ms total (0ms avg), "
+            "20 bytes received for 50 bytes of response")
+
+
+if __name__ == '__main__':
+    unittest.main()
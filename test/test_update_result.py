@@ -22,6 +22,18 @@ class TestUpdateResult(unittest.TestCase):
                 'field1': {'old': 'old_value', 'new': 'new_value'}}}, UpdateResult.Status.UPDATED)
         self.assertEqual(self.update_result.summary, "updated: 1")
 
+    def test_summary_with_created_records(self):
+        """
+        UpdateResult.summary and updates with created records
+        """
+        self.update_result.add_record_status(
+            {'id': 'rec1', 'issue_number': 123, 'changes': {'field1': {'new': 'value'}}}, UpdateResult.Status.CREATED)
+        self.update_result.add_record_status(
+            {'id': 'rec2', 'issue_number': 124}, UpdateResult.Status.UNCHANGED)
+        self.assertEqual(self.update_result.summary, "created: 1, unchanged: 1")
+        self.assertEqual(self.update_result.updates,
+                         "  Record - id:rec1 issue_number:123 \n    field1: value")
+
     def test_summary_with_unchanged_records(self):
         """
         UpdateResult.summary with unchanged records
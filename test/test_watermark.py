@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from src.airtable_sync.watermark import Watermark
+
+
+class TestWatermark(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'state', 'watermark.json')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_missing_file(self):
+        watermark = Watermark(self.path, 'key')
+        self.assertFalse(watermark.is_set)
+        self.assertTrue(watermark.full_sync_due(24))
+
+    def test_save_and_load(self):
+        watermark = Watermark(self.path, 'key')
+        watermark.github_updated_at = '2024-10-01T10:00:00Z'
+        watermark.airtable_modified_at = '2024-10-01T11:00:00+00:00'
+        watermark.full_sync_at = '2024-10-01T11:00:00+00:00'
+        watermark.save()
+
+        Watermark(self.path, 'other').save()
+        loaded = Watermark(self.path, 'key')
+        self.assertTrue(loaded.is_set)
+        self.assertEqual(loaded.github_updated_at, '2024-10-01T10:00:00Z')
+        self.assertEqual(loaded.airtable_modified_at, '2024-10-01T11:00:00+00:00')
+        with open(self.path) as file:
+            self.assertEqual(set(json.load(file).keys()), {'key', 'other'})
+
+    def test_full_sync_due(self):
+        watermark = Watermark(self.path, 'key')
+        watermark.github_updated_at = '2024-10-01T10:00:00Z'
+        watermark.airtable_modified_at = '2024-10-01T11:00:00+00:00'
+        watermark.full_sync_at = '2024-10-01T11:00:00+00:00'
+        self.assertFalse(watermark.full_sync_due(
+            24, now=datetime(2024, 10, 2, 10, tzinfo=timezone.utc)))
+        self.assertTrue(watermark.full_sync_due(
+            24, now=datetime(2024, 10, 2, 11, tzinfo=timezone.utc)))
+
+    def test_unreadable_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as file:
+            file.write('not json')
+        self.assertFalse(Watermark(self.path, 'key').is_set)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,409 @@
+"""
+Micro-benchmarks for the sync hot paths.
+
+Usage, from the root of the source package:
+    python tool/benchmark.py <benchmark> [--size N]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import requests  # noqa: E402
+from pyairtable.models.schema import parse_field_schema  # noqa: E402
+from src.airtable_sync.airtable.batch_writer import BatchWriter, TokenBucket  # noqa: E402
+from src.airtable_sync.airtable.client import AirtableClient  # noqa: E402
+from src.airtable_sync.airtable.config import AirtableConfig  # noqa: E402
+from src.airtable_sync.airtable.field_plan import FieldPlan  # noqa: E402
+from src.airtable_sync.airtable.record import AirtableRecord  # noqa: E402
+from src.airtable_sync.custom_logger import CustomLogger  # noqa: E402
+from src.airtable_sync.github.client import GitHubClient  # noqa: E402
+from src.airtable_sync.github.config import GitHubConfig  # noqa: E402
+from src.airtable_sync.github.transport import TransportStats  # noqa: E402
+
+
+def timed(func, *args, repeat: int = 3) -> float:
+    """Run the function `repeat` times and return the best wall-clock time in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_github_client() -> GitHubClient:
+    """GitHub client with a fake configuration, no requests are made."""
+    return GitHubClient(GitHubConfig({'token': 'fake_token', 'owner': 'owner', 'repo': 'repo'}))
+
+
+def make_project_item(issue_number: int, issue_type: str = 'Epic') -> dict:
+    """A project item as returned by the project items query."""
+    return {
+        'content': {
+            'url': f'https://github.com/owner/repo/issues/{issue_number}',
+            'title': f'Issue {issue_number}',
+        },
+        'fieldValues': {
+            'nodes': [
+                {'__typename': 'ProjectV2ItemFieldSingleSelectValue',
+                 'field': {'name': 'Issue Type'}, 'name': issue_type},
+                {'__typename': 'ProjectV2ItemFieldDateValue', 'field': {'name': 'Start Date'}, 'date': '2024-10-01'},
+            ]
+        }
+    }
+
+
+def bench_issue_lookup(size: int):
+    """Look up every loaded epic once, as `AirtableSync.sync` does once per record."""
+    for n in (size // 4, size // 2, size):
+        client = make_github_client()
+        client._handle_issues_data([make_project_item(i) for i in range(1, n + 1)])
+
+        def linear_scan():
+            epic_issues = client.epic_issues
+            for i in range(1, n + 1):
+                next((issue for issue in epic_issues if issue.issue_number == i), None)
+
+        def indexed():
+            for i in range(1, n + 1):
+                client.get_issue(i)
+
+        print(f"{n:>7} epics  linear scan: {timed(linear_scan, repeat=1):8.4f}s"
+              f"  indexed: {timed(indexed):8.4f}s")
+
+
+def make_full_content(issue_number: int) -> dict:
+    """Issue content as selected by the unprojected query, with a typical body, assignees and labels."""
+    return {
+        'closed': False,
+        'closedAt': None,
+        'title': f'Issue {issue_number}',
+        'url': f'https://github.com/owner/repo/issues/{issue_number}',
+        'updatedAt': '2024-10-01T10:00:00Z',
+        'state': 'OPEN',
+        'body': '## Description\n' + 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 40,
+        'assignees': {'nodes': [{'login': f'user{i}'} for i in range(3)]},
+        'labels': {'nodes': [{'name': f'label{i}', 'color': 'ededed'} for i in range(4)]},
+    }
+
+
+def bench_payload(size: int):
+    """Bytes per page of project items, unprojected vs projected from the field map."""
+    page_size = 50
+    pages = max(1, size // page_size)
+    full_page_bytes, projected_page_bytes = 0, 0
+    for page in range(pages):
+        full_items, projected_items = [], []
+        for i in range(page * page_size, (page + 1) * page_size):
+            item = make_project_item(i + 1)
+            content = make_full_content(i + 1)
+            full_items.append({**item, 'content': content})
+            projected_items.append({**item, 'content': {
+                key: content[key] for key in ('title', 'url', 'updatedAt')}})
+        full_page_bytes += len(json.dumps({'data': {'node': {'items': {'nodes': full_items}}}}))
+        projected_page_bytes += len(json.dumps(
+            {'data': {'node': {'items': {'nodes': projected_items}}}}))
+
+    print(f"{pages} page(s) of {page_size} items, bytes per page"
+          f"  unprojected: {full_page_bytes // pages}  projected: {projected_page_bytes // pages}")
+
+
+class FakeTable:
+    """Table whose requests take a fixed round-trip time, like a request to Airtable."""
+
+    def __init__(self, latency: float, entries: list[dict] = None):
+        self.latency = latency
+        self.entries = entries or []
+
+    def batch_update(self, records: list[dict]) -> list[dict]:
+        time.sleep(self.latency)
+        return records
+
+    def iterate(self, view: str, formula: str = None, fields: list[str] = None):
+        """Pages of 100 entries, filtered by the issue number partition in the formula if any."""
+        match = re.search(r"MOD\(\{Issue Number\}, (\d+)\) = (\d+)", formula or '')
+        entries = [entry for entry in self.entries if not match
+                   or entry['fields']['Issue Number'] % int(match[1]) == int(match[2])]
+        for start in range(0, len(entries), 100):
+            time.sleep(self.latency)
+            yield entries[start:start + 100]
+
+
+class FakeAirtableAdapter(requests.adapters.BaseAdapter):
+    """Transport answering the list records requests with pages of 100 entries after a fixed round-trip time."""
+
+    def __init__(self, latency: float, entries: list[dict]):
+        super().__init__()
+        self.latency = latency
+        self.table = FakeTable(latency, entries)
+
+    def send(self, request, **kwargs):
+        params = {key: values[0] for key, values in parse_qs(urlparse(request.url).query).items()}
+        match = re.search(r"MOD\(\{Issue Number\}, (\d+)\) = (\d+)", params.get('filterByFormula', ''))
+        entries = [entry for entry in self.table.entries if not match
+                   or entry['fields']['Issue Number'] % int(match[1]) == int(match[2])]
+        start = int(params.get('offset', 0))
+        body = {'records': [{**entry, 'createdTime': '2024-10-01T00:00:00.000Z'}
+                            for entry in entries[start:start + 100]]}
+        if start + 100 < len(entries):
+            body['offset'] = str(start + 100)
+        time.sleep(self.latency)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200
+        response._content = json.dumps(body).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+def bench_batch_write(size: int):
+    """Update records sequentially in chunks, as pyairtable does, vs concurrently with the batch writer."""
+    latency, rate = 0.5, 5
+    updates = [{'id': f'rec{i}', 'fields': {'Title': f'Issue {i}'}} for i in range(size)]
+    table = FakeTable(latency)
+
+    def sequential():
+        for start in range(0, size, BatchWriter.CHUNK_SIZE):
+            table.batch_update(updates[start:start + BatchWriter.CHUNK_SIZE])
+
+    def concurrent():
+        for _ in BatchWriter(table, TokenBucket(rate)).write(updates):
+            pass
+
+    requests = -(-size // BatchWriter.CHUNK_SIZE)
+    print(f"{size} records in {requests} request(s) of {latency}s, at most {rate} request(s)/s"
+          f"  minimum: {requests / rate:6.2f}s"
+          f"  sequential: {timed(sequential, repeat=1):6.2f}s  concurrent: {timed(concurrent, repeat=1):6.2f}s")
+
+
+def bench_logging(size: int):
+    """Cost of debug and verbose log calls in a loop, at the default ERROR level and with output enabled."""
+    logger = CustomLogger('benchmark')
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    logger.logger.addHandler(handler)
+    logger.logger.propagate = False
+    records = [f'Issue {i}' for i in range(100)]
+
+    class Caller:
+        def log(self):
+            for i in range(size):
+                logger.debug(f"Record {i} fields 'Title': old -> new")
+                logger.verbose(lambda: "\n".join(records))
+
+        def baseline(self):
+            for i in range(size):
+                pass
+
+    caller = Caller()
+    baseline = timed(caller.baseline)
+    for level in (logging.ERROR, logging.DEBUG):
+        logger.logger.setLevel(level)
+        elapsed = timed(caller.log) - baseline
+        print(f"{2 * size} log call(s) at {logging.getLevelName(level):<5}:"
+              f" {elapsed:8.4f}s  {elapsed / (2 * size) * 1e6:8.3f}us per call")
+
+
+class FakeProjectScheduler:
+    """Request scheduler returning pages of project items, generated on request unless replayed."""
+
+    def __init__(self, size: int, page_size: int = 100, latency: float = 0.0, replay: list = None):
+        self.size = size
+        self.page_size_ = page_size
+        self.latency = latency
+        self.replay = list(replay) if replay else None
+        self.stats = TransportStats()
+        self.sent = 0
+
+    def page_size(self, preferred: int) -> int:
+        return self.page_size_
+
+    def record_page(self, items: int):
+        pass
+
+    def execute(self, query: str) -> dict:
+        time.sleep(self.latency)
+        if self.replay:
+            return self.replay.pop(0)
+        start = self.sent
+        self.sent = min(self.size, start + self.page_size_)
+        nodes = [make_project_item(i + 1) for i in range(start, self.sent)]
+        for node in nodes:
+            node['content'].update(make_full_content(int(node['content']['url'].rsplit('/', 1)[1])))
+        return {'data': {'node': {'items': {
+            'nodes': nodes, 'pageInfo': {'hasNextPage': self.sent < self.size, 'endCursor': str(self.sent)}}}}}
+
+
+def bench_streaming(size: int):
+    """Peak memory of loading every project issue into the index vs streaming them page by page."""
+    def peak(func) -> int:
+        client = make_github_client()
+        client._client = FakeProjectScheduler(size)
+        client.github_config.project_id = 'PVT_project'
+        tracemalloc.start()
+        func(client)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    def indexed(client):
+        client.fetch_project_items()
+
+    def streamed(client):
+        for issues in client.iter_project_issues():
+            pass
+
+    print(f"{size} project items  peak memory"
+          f"  indexed: {peak(indexed) // 1024:>7} KiB  streamed: {peak(streamed) // 1024:>7} KiB")
+
+
+def bench_prefetch(size: int):
+    """Fetch and parse the project pages in turn vs prefetching the next page while parsing."""
+    latency = 0.01
+    generator = FakeProjectScheduler(size)
+    pages = []
+    while not pages or pages[-1]['data']['node']['items']['pageInfo']['hasNextPage']:
+        pages.append(generator.execute(''))
+
+    for prefetch_pages in (False, True):
+        def fetch():
+            client = make_github_client()
+            client.github_config.project_id = 'PVT_project'
+            client.github_config.prefetch_pages = prefetch_pages
+            client._client = FakeProjectScheduler(size, latency=latency, replay=pages)
+            client.fetch_project_items()
+
+        print(f"{size} project items, {latency}s per page request  prefetch {'on ' if prefetch_pages else 'off'}:"
+              f" {timed(fetch):6.2f}s")
+
+
+def bench_partitioned_read(size: int):
+    """Read the table page by page sequentially vs in partitions read concurrently."""
+    latency = 0.6
+    entries = [{'id': f'rec{i}', 'fields': {
+        'Title': f'Issue {i}', 'Issue Link': f'https://github.com/owner/repo/issues/{i}', 'Issue Number': i}}
+        for i in range(1, size + 1)]
+    for partitions in (1, 2, 4, 8):
+        client = AirtableClient(AirtableConfig(
+            {'token': 'fake_token', 'baseId': 'app', 'tableId': 'tbl', 'readPartitions': partitions}))
+        # Behind the rate limiter of the client, as the requests to Airtable
+        client.api.session.get_adapter('https://').adapter = FakeAirtableAdapter(latency, entries)
+        client.current_repo = 'repo'
+        elapsed = timed(client.read_records, repeat=1)
+        print(f"{size} records, {latency}s per page of 100  partitions: {partitions}  "
+              f"read: {elapsed:6.2f}s  {len(client.records_in_current_repo)} record(s)")
+
+
+def bench_memory(size: int):
+    """Bytes retained per parsed project issue and per Airtable record, excluding the response data."""
+    def retained(build) -> int:
+        tracemalloc.start()
+        objects = build()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+        return current
+
+    items = [make_project_item(i + 1) for i in range(size)]
+    for item in items:
+        # A distinct string per item, as decoded from the response
+        item['fieldValues']['nodes'].append({'__typename': 'ProjectV2ItemFieldSingleSelectValue',
+                                             'field': {'name': 'Status'}, 'name': ''.join(['In ', 'progress'])})
+    entries = [{'id': f'rec{i}', 'fields': {
+        'Title': f'Issue {i}', 'Issue Link': f'https://github.com/owner/repo/issues/{i}', 'Issue Number': i}}
+        for i in range(1, size + 1)]
+
+    def issues():
+        client = make_github_client()
+        client._handle_issues_data(items)
+        return client
+
+    def records():
+        records = [AirtableRecord(entry) for entry in entries]
+        for record in records:
+            record.issue_number, record.repo_name
+        return records
+
+    print(f"{size} items  bytes per item"
+          f"  issue: {retained(issues) // size:>5}  record: {retained(records) // size:>5}")
+
+
+def bench_parse(size: int):
+    """Parse a large page of project items with typical field values, decoded by type name."""
+    field_values = [
+        {'__typename': 'ProjectV2ItemFieldTextValue', 'field': {'name': 'Team Notes'}, 'text': 'Notes'},
+        {'__typename': 'ProjectV2ItemFieldNumberValue', 'field': {'name': 'Story Points'}, 'number': 5},
+        {'__typename': 'ProjectV2ItemFieldSingleSelectValue', 'field': {'name': 'Status'}, 'name': 'In progress'},
+        {'__typename': 'ProjectV2ItemFieldIterationValue', 'field': {'name': 'Sprint'},
+         'title': 'Sprint 1', 'startDate': '2024-10-01', 'duration': 14},
+        {'__typename': 'ProjectV2ItemFieldDateValue', 'field': {'name': 'Delivery Date'}, 'date': '2024-12-01'},
+    ]
+    items = [make_project_item(i + 1) for i in range(size)]
+    for item in items:
+        item['fieldValues']['nodes'].extend(dict(value) for value in field_values)
+
+    elapsed = timed(GitHubClient._parse_issues, items)
+    print(f"{size} project items, {len(items[0]['fieldValues']['nodes'])} field values each"
+          f"  parse: {elapsed:8.4f}s  {elapsed / size * 1e6:8.2f}us per item")
+
+
+def bench_field_plan(size: int):
+    """Compare the mapped fields of each record with its issue, formatting per value vs with the compiled plan."""
+    field_map = {f'field_{i}': f'Field {i}' for i in range(6)}
+    field_schemas = {target: parse_field_schema({'id': f'fld{i}', 'name': target, 'type': 'date', 'options': {
+        'dateFormat': {'name': 'iso', 'format': 'YYYY-MM-DD'}}} if i % 2 else {
+        'id': f'fld{i}', 'name': target, 'type': 'singleLineText'}) for i, target in enumerate(field_map.values())}
+    source_fields = {source: datetime(2024, 10, i + 1) if i % 2 else f'Value {i}'
+                     for i, source in enumerate(field_map)}
+    entries = [{'id': f'rec{i}', 'fields': {
+        target: source_fields[source].strftime('%Y-%m-%d') if i % 2 else 'Old'
+        for i, (source, target) in enumerate(field_map.items())}} for i in range(size)]
+
+    def formatted():
+        for entry in entries:
+            AirtableRecord(entry).set_fields(
+                {target: value for source, target in field_map.items() if (value := source_fields.get(source))})
+
+    def planned():
+        plan = FieldPlan(field_map, field_schemas)
+        for entry in entries:
+            plan.apply(AirtableRecord(entry), source_fields)
+
+    print(f"{size} records, {len(field_map)} mapped fields"
+          f"  formatted: {timed(formatted):8.4f}s  planned: {timed(planned):8.4f}s")
+
+
+BENCHMARKS = {
+    'issue-lookup': (bench_issue_lookup, 2000),
+    'payload': (bench_payload, 1000),
+    'batch-write': (bench_batch_write, 200),
+    'logging': (bench_logging, 100000),
+    'streaming': (bench_streaming, 5000),
+    'prefetch': (bench_prefetch, 5000),
+    'partitioned-read': (bench_partitioned_read, 2000),
+    'memory': (bench_memory, 20000),
+    'parse': (bench_parse, 20000),
+    'field-plan': (bench_field_plan, 20000),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the sync hot paths.")
+    parser.add_argument('benchmark', choices=BENCHMARKS.keys())
+    parser.add_argument('--size', type=int, help="Number of items to benchmark with")
+    args = parser.parse_args()
+
+    bench, default_size = BENCHMARKS[args.benchmark]
+    bench(args.size or default_size)